@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Department, Position, FactoryPosition
+from .models import User, Department, Position, FactoryPosition, RevokedToken
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 
@@ -8,6 +8,11 @@ class PositionAdmin(admin.ModelAdmin):
     list_display = ('name',)
     search_fields = ('name',)
 
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('jti', 'expires_at', 'revoked_at')
+    search_fields = ('jti',)
+
 @admin.register(FactoryPosition)
 class FactoryPositionAdmin(admin.ModelAdmin):
     list_display = ('name',)
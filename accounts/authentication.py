@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .checks import PROCESS_LOCAL_CACHE_BACKENDS
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    cache_key_prefix = 'accounts:auth_user'
+    uncached_fields = ('password',)
+
+    @classmethod
+    def cache_key(cls, user_id):
+        return f"{cls.cache_key_prefix}:{user_id}"
+
+    @classmethod
+    def forget_user(cls, user_id):
+        key = cls.cache_key(user_id)
+        cache.delete(key)
+        transaction.on_commit(lambda: cache.delete(key))
+
+    def get_user_queryset(self):
+        return self.user_model.objects.select_related(
+            'department', 'position', 'factory_position'
+        ).prefetch_related('top_managed_departments')
+
+    def cache_enabled(self):
+        return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS
+
+    def cached_field_names(self):
+        return [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname not in self.uncached_fields
+        ]
+
+    def load_user(self, user_id):
+        try:
+            return self.get_user_queryset().get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+    def get_cached_user(self, user_id):
+        if not self.cache_enabled():
+            user = self.load_user(user_id)
+            return user, get_md5_hash_password(user.password)
+
+        key = self.cache_key(user_id)
+        cached = cache.get(key)
+        if cached is None:
+            user = self.load_user(user_id)
+            token_version = get_md5_hash_password(user.password)
+            values = {}
+            for name in self.cached_field_names():
+                value = user.__dict__.get(name)
+                values[name] = getattr(value, 'name', value)
+            cache.set(key, {'fields': values, 'token_version': token_version}, settings.AUTH_USER_CACHE_TTL)
+            return user, token_version
+
+        fields = cached['fields']
+        user = self.user_model.from_db(self.user_model.objects.db, list(fields), list(fields.values()))
+        return user, cached['token_version']
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user, token_version = self.get_cached_user(user_id)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != token_version:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG or settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS:
+        return []
+    return [Warning(
+        "Təşkilat strukturu versiyası prosesə bağlı keşdə saxlanılır, dəyişikliklər digər worker-lərə çatmır.",
+        hint="CACHE_BACKEND üçün paylaşılan keş (Redis, Memcached və ya DatabaseCache) təyin edin.",
+        id='accounts.W001',
+    )]
@@ -0,0 +1,616 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+ORG_VERSION_CACHE_KEY = 'accounts:org_version'
+ORG_REBUILD_LOCK_ID = 7140021
+
+
+class OrgGraph:
+    def __init__(self, users, departments, top_management):
+        self.users = users
+        self.departments = departments
+        self.top_management = top_management
+
+        self.led_department = {}
+        self.managed_department = {}
+        self.ceo_department = {}
+        for dept in departments.values():
+            if dept.department_lead_id:
+                self.led_department[dept.department_lead_id] = dept.id
+            if dept.manager_id:
+                self.managed_department[dept.manager_id] = dept.id
+            if dept.ceo_id:
+                self.ceo_department[dept.ceo_id] = dept.id
+
+        self.top_managed_departments = {}
+        for dept_id, user_ids in top_management.items():
+            for user_id in user_ids:
+                self.top_managed_departments.setdefault(user_id, []).append(dept_id)
+
+        self.department_members = {}
+        self.by_role = {}
+        self.by_factory = {}
+        for user in users.values():
+            if user.department_id:
+                self.department_members.setdefault(user.department_id, []).append(user)
+            if user.role:
+                self.by_role.setdefault(user.role, []).append(user)
+            if user.factory_type:
+                self.by_factory.setdefault(user.factory_type, []).append(user)
+
+        self.version = None
+        self.expires_at = 0
+        self.checked_until = 0
+
+    @classmethod
+    def build(cls):
+        from .models import User, Department
+
+        users = {user.pk: user for user in User.objects.order_by('pk')}
+        departments = {dept.pk: dept for dept in Department.objects.all()}
+
+        top_management = {}
+        rows = Department.top_management.through.objects.order_by('user_id').values_list('department_id', 'user_id')
+        for dept_id, user_id in rows:
+            top_management.setdefault(dept_id, []).append(user_id)
+
+        return cls(users, departments, top_management)
+
+    def get(self, user_id):
+        return self.users.get(user_id)
+
+    def department_of(self, user):
+        return self.departments.get(user.department_id) if user.department_id else None
+
+    def _active(self, user_id):
+        user = self.users.get(user_id)
+        if user and user.is_active:
+            return user
+        return None
+
+    def _first(self, users, active_only=True, **attrs):
+        for user in users:
+            if active_only and not user.is_active:
+                continue
+            if all(getattr(user, key) == value for key, value in attrs.items()):
+                return user
+        return None
+
+    def first_with_role(self, role, active_only=True):
+        return self._first(self.by_role.get(role, []), active_only=active_only)
+
+    def first_factory_user(self, factory_type, factory_role):
+        return self._first(self.by_factory.get(factory_type, []), factory_role=factory_role)
+
+    def has_top_management(self, dept):
+        return bool(dept and self.top_management.get(dept.id))
+
+    def first_active_top_management(self, dept):
+        if not dept:
+            return None
+        for user_id in self.top_management.get(dept.id, []):
+            user = self._active(user_id)
+            if user:
+                return user
+        return None
+
+    def department_names(self, user):
+        names = set()
+        dept = self.department_of(user)
+        if dept:
+            names.add(dept.name)
+        for dept_map in (self.managed_department, self.led_department, self.ceo_department):
+            dept_id = dept_map.get(user.id)
+            if dept_id:
+                names.add(self.departments[dept_id].name)
+        for dept_id in self.top_managed_departments.get(user.id, []):
+            names.add(self.departments[dept_id].name)
+        return list(names)
+
+    def superior(self, user):
+        dept = self.department_of(user)
+
+        if user.role == "employee":
+            if not dept:
+                return None
+            return self.users.get(dept.manager_id) or self.users.get(dept.department_lead_id)
+
+        elif user.role == "manager":
+            if dept:
+                return self.users.get(dept.department_lead_id)
+            return None
+
+        elif user.role == "department_lead":
+            return self.first_with_role("top_management", active_only=False)
+
+        elif user.role == "top_management":
+            return self.first_with_role("ceo", active_only=False)
+
+        return None
+
+    def direct_superior(self, user):
+        if user.role in ["ceo", "admin"]:
+            return None
+
+        if user.factory_type and user.factory_role:
+            if user.factory_role == "employee":
+                return (
+                    self.first_factory_user(user.factory_type, "department_lead")
+                    or self.first_factory_user(user.factory_type, "deputy_director")
+                    or self.first_factory_user(user.factory_type, "top_management")
+                )
+
+            if user.factory_role == "department_lead":
+                return (
+                    self.first_factory_user(user.factory_type, "deputy_director")
+                    or self.first_factory_user(user.factory_type, "top_management")
+                )
+
+            if user.factory_role == "deputy_director":
+                return self.first_factory_user(user.factory_type, "top_management")
+
+        dept = self.department_of(user)
+
+        if dept:
+            if user.role == "employee":
+                manager = self._active(dept.manager_id)
+                if manager:
+                    return manager
+
+            if user.role in ["employee", "manager"]:
+                lead = self._active(dept.department_lead_id)
+                if lead:
+                    return lead
+
+        if user.role == "department_lead" and self.has_top_management(dept):
+            return self.first_active_top_management(dept)
+
+        if user.role == "top_management":
+            ceo = self.first_with_role("ceo")
+            if ceo:
+                return ceo
+
+        if user.role in ["employee", "manager", "department_lead"]:
+            if self.has_top_management(dept):
+                return self.first_active_top_management(dept)
+            return self.first_with_role("ceo")
+
+        return None
+
+    def all_superiors(self, user, limit=10):
+        superiors = []
+        current_superior = self.direct_superior(user)
+        count = 0
+        while current_superior and count < limit:
+            superiors.append(current_superior)
+            if current_superior.pk == user.pk:
+                break
+            current_superior = self.direct_superior(current_superior)
+            count += 1
+        return superiors
+
+    def subordinate_ids(self, user):
+        if user.role == 'admin':
+            return {u.id for u in self.users.values() if u.is_active and u.id != user.id}
+
+        if user.factory_type and user.factory_role:
+            factory_users = self.by_factory.get(user.factory_type, [])
+            if user.factory_role == 'top_management':
+                return {u.id for u in factory_users if u.id != user.id}
+            if user.factory_role == 'deputy_director':
+                return {u.id for u in factory_users if u.factory_role in ['department_lead', 'employee']}
+            if user.factory_role == 'department_lead':
+                return {u.id for u in factory_users if u.factory_role == 'employee'}
+
+        if user.role == 'ceo':
+            return {u.id for u in self.users.values() if u.is_active and u.id != user.id and u.role != 'admin'}
+
+        if user.role == 'top_management':
+            dept_ids = self.top_managed_departments.get(user.id)
+            if dept_ids:
+                return self._members(dept_ids, ['department_lead', 'manager', 'employee']) - {user.id}
+
+        if user.role == 'department_lead':
+            dept_id = self.led_department.get(user.id)
+            return self._members([dept_id], ['manager', 'employee']) if dept_id else set()
+
+        if user.role == 'manager':
+            dept_id = self.managed_department.get(user.id)
+            return self._members([dept_id], ['employee']) if dept_id else set()
+
+        return set()
+
+    def _members(self, dept_ids, roles):
+        return {
+            u.id
+            for dept_id in dept_ids
+            for u in self.department_members.get(dept_id, [])
+            if u.is_active and u.role in roles
+        }
+
+    def next_available_superior(self, user):
+        dept = self.department_of(user)
+
+        if user.role == 'employee':
+            manager = self._active(dept.manager_id)
+            if manager:
+                return manager
+            lead = self._active(dept.department_lead_id)
+            if lead:
+                return lead
+            if self.has_top_management(dept):
+                return self.first_active_top_management(dept)
+            return self.first_with_role('ceo')
+
+        elif user.role == 'manager':
+            lead = self._active(dept.department_lead_id)
+            if lead:
+                return lead
+            if self.has_top_management(dept):
+                return self.first_active_top_management(dept)
+            return self.first_with_role('ceo')
+
+        elif user.role == 'department_lead':
+            if self.has_top_management(dept):
+                return self.first_active_top_management(dept)
+            return self.first_with_role('ceo')
+
+        elif user.role == 'top_management':
+            return self.first_with_role('ceo')
+
+        return None
+
+    def kpi_evaluator_by_type(self, user, evaluation_type):
+        dept = self.department_of(user)
+        if user.role in ["admin", "ceo"] or not dept:
+            return None
+
+        if evaluation_type == 'SUPERIOR':
+            return self.next_available_superior(user)
+
+        elif evaluation_type == 'TOP_MANAGEMENT':
+            if user.role not in ['employee', 'manager']:
+                return None
+
+            superior = self.next_available_superior(user)
+            if superior and superior.role in ['manager', 'department_lead'] and self.has_top_management(dept):
+                return self.first_active_top_management(dept)
+            return None
+
+        return None
+
+    def kpi_evaluator_by_type_task(self, user, evaluation_type):
+        dept = self.department_of(user)
+        if user.role in ["admin", "ceo"] or not dept:
+            return None
+
+        if evaluation_type == 'SUPERIOR':
+            return self.next_available_superior(user)
+
+        elif evaluation_type == 'TOP_MANAGEMENT':
+            if user.role not in ['employee', 'manager']:
+                return None
+            if self.has_top_management(dept):
+                return self.first_active_top_management(dept)
+            return None
+
+        return None
+
+    def kpi_evaluator(self, user):
+        if user.role in ["admin", "ceo"]:
+            return None
+
+        dept = self.department_of(user)
+
+        if user.role == 'employee':
+            if dept and dept.manager_id:
+                return self.users.get(dept.manager_id)
+            if dept and dept.department_lead_id:
+                return self.users.get(dept.department_lead_id)
+
+        elif user.role == 'manager':
+            if dept and dept.department_lead_id:
+                return self.users.get(dept.department_lead_id)
+
+        elif user.role == 'department_lead':
+            if self.has_top_management(dept):
+                return self.first_active_top_management(dept)
+
+        elif user.role == 'top_management':
+            return self.first_with_role('ceo')
+
+        if self.has_top_management(dept):
+            return self.first_active_top_management(dept)
+
+        return self.first_with_role('ceo')
+
+    def kpi_superiors(self, user, limit=5):
+        superiors = []
+        current_superior = self.kpi_evaluator(user)
+        count = 0
+        while current_superior and count < limit:
+            if current_superior not in superiors:
+                superiors.append(current_superior)
+                if current_superior.pk == user.pk:
+                    break
+            current_superior = self.kpi_evaluator(current_superior)
+            count += 1
+        return superiors
+
+    def needs_dual_evaluation(self, user):
+        dept = self.department_of(user)
+        if user.role not in ['employee', 'manager'] or not dept:
+            return False
+
+        superior = self.kpi_evaluator_by_type(user, 'SUPERIOR')
+        if not superior:
+            return False
+
+        if superior.role in ['manager', 'department_lead']:
+            return self.has_top_management(dept)
+        return False
+
+    def needs_dual_evaluation_task(self, user):
+        dept = self.department_of(user)
+        if user.role not in ['employee', 'manager'] or not dept:
+            return False
+        return self.has_top_management(dept)
+
+
+    def evaluation_config(self, user):
+        if user.role in ['admin', 'ceo']:
+            return {
+                'requires_self': False,
+                'superior_evaluator': None,
+                'superior_evaluator_name': None,
+                'tm_evaluator': None,
+                'tm_evaluator_name': None,
+                'is_dual_evaluation': False
+            }
+
+        superior = self.kpi_evaluator_by_type(user, 'SUPERIOR')
+        tm_evaluator = self.kpi_evaluator_by_type(user, 'TOP_MANAGEMENT')
+
+        return {
+            'requires_self': True,
+            'superior_evaluator': superior,
+            'superior_evaluator_name': superior.get_full_name() if superior else None,
+            'tm_evaluator': tm_evaluator,
+            'tm_evaluator_name': tm_evaluator.get_full_name() if tm_evaluator else None,
+            'is_dual_evaluation': self.needs_dual_evaluation(user)
+        }
+
+    def evaluation_config_task(self, user):
+        if user.role in ['admin', 'ceo']:
+            return {
+                'requires_self': False,
+                'superior_evaluator': None,
+                'superior_evaluator_name': None,
+                'superior_evaluator_id': None,
+                'tm_evaluator': None,
+                'tm_evaluator_name': None,
+                'tm_evaluator_id': None,
+                'is_dual_evaluation': False
+            }
+
+        superior = self.kpi_evaluator_by_type_task(user, 'SUPERIOR')
+        tm_evaluator = self.kpi_evaluator_by_type_task(user, 'TOP_MANAGEMENT')
+
+        return {
+            'requires_self': True,
+            'superior_evaluator': superior,
+            'superior_evaluator_name': superior.get_full_name() if superior else None,
+            'superior_evaluator_id': superior.id if superior else None,
+            'tm_evaluator': tm_evaluator,
+            'tm_evaluator_name': tm_evaluator.get_full_name() if tm_evaluator else None,
+            'tm_evaluator_id': tm_evaluator.id if tm_evaluator else None,
+            'is_dual_evaluation': self.needs_dual_evaluation_task(user)
+        }
+
+    def routed_evaluation_config(self, requires_self, superior_evaluator_id, tm_evaluator_id, is_dual_evaluation):
+        from .models import User
+
+        evaluators = {user_id: self.get(user_id) for user_id in (superior_evaluator_id, tm_evaluator_id) if user_id}
+        missing_ids = [user_id for user_id, user in evaluators.items() if user is None]
+        if missing_ids:
+            evaluators.update(User.objects.in_bulk(missing_ids))
+
+        superior = evaluators.get(superior_evaluator_id)
+        tm_evaluator = evaluators.get(tm_evaluator_id)
+
+        return {
+            'requires_self': requires_self,
+            'superior_evaluator': superior,
+            'superior_evaluator_name': superior.get_full_name() if superior else None,
+            'superior_evaluator_id': superior_evaluator_id,
+            'tm_evaluator': tm_evaluator,
+            'tm_evaluator_name': tm_evaluator.get_full_name() if tm_evaluator else None,
+            'tm_evaluator_id': tm_evaluator_id,
+            'is_dual_evaluation': is_dual_evaluation
+        }
+
+
+
+def resolve_evaluation_configs(user_ids):
+    from .models import User
+
+    graph = get_org_graph()
+    user_ids = set(user_ids)
+    users = [graph.get(user_id) for user_id in user_ids if graph.get(user_id)]
+
+    missing_ids = user_ids - {user.id for user in users}
+    if missing_ids:
+        users.extend(User.objects.filter(pk__in=missing_ids))
+
+    return {user.id: graph.evaluation_config_task(user) for user in users}
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_pending = threading.local()
+
+
+def _changed_in_transaction():
+    if not transaction.get_connection().in_atomic_block:
+        _pending.changed = False
+    return getattr(_pending, 'changed', False)
+
+
+def get_org_graph():
+    global _snapshot
+    if _changed_in_transaction():
+        return OrgGraph.build()
+
+    now = time.monotonic()
+    snapshot = _snapshot
+    if snapshot is not None and now < snapshot.checked_until and now < snapshot.expires_at:
+        return snapshot
+
+    version = cache.get(ORG_VERSION_CACHE_KEY)
+    if snapshot is not None and snapshot.version == version and now < snapshot.expires_at:
+        snapshot.checked_until = now + settings.ORG_VERSION_CHECK_INTERVAL
+        return snapshot
+
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if snapshot is None or snapshot.version != version or snapshot.expires_at <= now:
+            snapshot = OrgGraph.build()
+            snapshot.version = version
+            snapshot.expires_at = now + settings.ORG_GRAPH_TTL
+            snapshot.checked_until = now + settings.ORG_VERSION_CHECK_INTERVAL
+            _snapshot = snapshot
+    return snapshot
+
+
+def closure_rows(graph, limit=10):
+    rows = {}
+    for user in graph.users.values():
+        depth = 0
+        current_superior = graph.direct_superior(user)
+        while current_superior and depth < limit:
+            depth += 1
+            if current_superior.pk == user.pk:
+                break
+            rows.setdefault((current_superior.pk, user.pk), depth)
+            current_superior = graph.direct_superior(current_superior)
+    return rows
+
+
+def _lock_org_rebuild():
+    connection = transaction.get_connection()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [ORG_REBUILD_LOCK_ID])
+
+
+def rebuild_org_closure(graph=None, user_ids=None):
+    from .models import OrgClosure
+
+    with transaction.atomic():
+        _lock_org_rebuild()
+        wanted = closure_rows(graph or OrgGraph.build())
+        rows = OrgClosure.objects.all()
+        if user_ids is not None:
+            affected = set(user_ids)
+            affected.update(descendant_id for ancestor_id, descendant_id in wanted if ancestor_id in user_ids)
+            affected.update(OrgClosure.objects.filter(ancestor_id__in=user_ids).values_list('descendant_id', flat=True))
+            wanted = {key: depth for key, depth in wanted.items() if key[1] in affected}
+            rows = rows.filter(descendant_id__in=affected)
+        existing = {
+            (ancestor_id, descendant_id): (pk, depth)
+            for pk, ancestor_id, descendant_id, depth in rows.values_list('pk', 'ancestor_id', 'descendant_id', 'depth')
+        }
+
+        stale_ids = [pk for key, (pk, depth) in existing.items() if key not in wanted]
+        moved = [
+            OrgClosure(pk=existing[key][0], ancestor_id=key[0], descendant_id=key[1], depth=depth)
+            for key, depth in wanted.items()
+            if key in existing and existing[key][1] != depth
+        ]
+        added = [
+            OrgClosure(ancestor_id=key[0], descendant_id=key[1], depth=depth)
+            for key, depth in wanted.items()
+            if key not in existing
+        ]
+
+        if stale_ids:
+            OrgClosure.objects.filter(pk__in=stale_ids).delete()
+        if moved:
+            OrgClosure.objects.bulk_update(moved, ['depth'], batch_size=1000)
+        if added:
+            OrgClosure.objects.bulk_create(added, batch_size=1000, ignore_conflicts=True)
+
+    return len(added), len(moved), len(stale_ids)
+
+
+def visibility_rows(graph):
+    rows = set()
+    for user in graph.users.values():
+        if user.role == 'admin' or user.factory_role == 'top_management':
+            continue
+        rows.add((user.pk, user.pk))
+        rows.update((user.pk, visible_id) for visible_id in graph.subordinate_ids(user))
+    return rows
+
+
+def rebuild_user_visibility(graph=None, user_ids=None):
+    from .models import UserVisibility
+
+    with transaction.atomic():
+        _lock_org_rebuild()
+        wanted = visibility_rows(graph or OrgGraph.build())
+        rows = UserVisibility.objects.all()
+        if user_ids is not None:
+            affected = set(user_ids)
+            affected.update(viewer_id for viewer_id, visible_user_id in wanted if visible_user_id in user_ids)
+            affected.update(UserVisibility.objects.filter(visible_user_id__in=user_ids).values_list('viewer_id', flat=True))
+            wanted = {key for key in wanted if key[0] in affected}
+            rows = rows.filter(viewer_id__in=affected)
+        existing = {
+            (viewer_id, visible_user_id): pk
+            for pk, viewer_id, visible_user_id in rows.values_list('pk', 'viewer_id', 'visible_user_id')
+        }
+
+        stale_ids = [pk for key, pk in existing.items() if key not in wanted]
+        added = [
+            UserVisibility(viewer_id=viewer_id, visible_user_id=visible_user_id)
+            for viewer_id, visible_user_id in wanted
+            if (viewer_id, visible_user_id) not in existing
+        ]
+
+        if stale_ids:
+            UserVisibility.objects.filter(pk__in=stale_ids).delete()
+        if added:
+            UserVisibility.objects.bulk_create(added, batch_size=1000, ignore_conflicts=True)
+
+    return len(added), len(stale_ids)
+
+
+def _publish_org_change():
+    global _snapshot
+    _pending.changed = False
+    if not getattr(_pending, 'publish', False):
+        return
+    _pending.publish = False
+    _snapshot = None
+    cache.set(ORG_VERSION_CACHE_KEY, time.time_ns(), None)
+
+
+def rebuild_org_tables(user_ids=None):
+    with transaction.atomic():
+        _lock_org_rebuild()
+        graph = OrgGraph.build()
+        rebuild_org_closure(graph, user_ids)
+        rebuild_user_visibility(graph, user_ids)
+
+
+def org_structure_changed(hierarchy=True, user_ids=None):
+    if transaction.get_connection().in_atomic_block:
+        _pending.changed = True
+    _pending.publish = True
+    transaction.on_commit(_publish_org_change)
+    if hierarchy:
+        rebuild_org_tables(user_ids)
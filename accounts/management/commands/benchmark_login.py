@@ -0,0 +1,62 @@
+import time
+
+from django.contrib.auth import authenticate, login
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from accounts.serializers import MyTokenObtainPairSerializer
+
+
+class Command(BaseCommand):
+    help = 'Giriş (login) axınının bir worker üçün saniyədə neçə girişi emal etdiyini ölçür (köhnə və yeni axın)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        email = 'benchmark-login@example.com'
+        password = 'Benchmark-Login-123'
+
+        with transaction.atomic():
+            user = User.objects.create_user(username=email, email=email, password=password, role='employee')
+            factory = APIRequestFactory()
+
+            def make_request():
+                request = factory.post('/api/accounts/login/')
+                SessionMiddleware(lambda request: None).process_request(request)
+                return request
+
+            def legacy_login():
+                request = make_request()
+                candidate = User.objects.filter(email=email).first()
+                candidate.check_password(password)
+                authenticated = authenticate(request, username=candidate.get_username(), password=password)
+                refresh = RefreshToken.for_user(authenticated)
+                str(refresh.access_token)
+                login(request, candidate)
+                request.session.save()
+
+            def current_login():
+                serializer = MyTokenObtainPairSerializer(
+                    data={'email': email, 'password': password}, context={'request': make_request()}
+                )
+                serializer.is_valid(raise_exception=True)
+
+            for name, flow in (('Köhnə axın (2 hash + sessiya)', legacy_login), ('Yeni axın (1 hash)', current_login)):
+                flow()
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    flow()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{name}: {iterations / elapsed:.2f} giriş/san, {elapsed / iterations * 1000:.1f} ms/giriş"
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Benchmark tamamlandı, test istifadəçisi silindi."))
@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from django.core.management.base import BaseCommand
+
+from accounts.hierarchy import org_structure_changed
+from accounts.models import User
+from accounts.thumbnails import delete_thumbnails, read_photo, render_thumbnails, store_thumbnails, thumbnail_options
+
+
+class Command(BaseCommand):
+    help = 'Mövcud profil şəkilləri üçün miniatürləri paralel proseslərlə yaradır'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--force', action='store_true', help='Miniatürü olan şəkilləri də yenidən emal edir')
+
+    def handle(self, *args, **options):
+        sizes, image_format, quality = thumbnail_options()
+        render = partial(render_thumbnails, sizes=sizes, image_format=image_format, quality=quality)
+
+        users = User.objects.exclude(profile_photo='').exclude(profile_photo__isnull=True).only(
+            'id', 'profile_photo', 'profile_photo_thumbnails'
+        ).order_by('pk')
+        if not options['force']:
+            users = users.filter(profile_photo_thumbnails={})
+
+        processed = skipped = 0
+        batch_size = options['batch_size']
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as executor:
+            last_pk = 0
+            while True:
+                batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+
+                pending = []
+                for user in batch:
+                    try:
+                        pending.append((user, read_photo(user.profile_photo)))
+                    except OSError as e:
+                        skipped += 1
+                        self.stderr.write(f"ID {user.pk} olan istifadəçinin şəkli oxunmadı: {e}")
+
+                for (user, content), rendered in zip(pending, executor.map(render, [content for _, content in pending])):
+                    if not rendered:
+                        skipped += 1
+                        continue
+                    storage = user.profile_photo.storage
+                    names = store_thumbnails(storage, content, rendered, image_format, user.pk)
+                    User.objects.filter(pk=user.pk).update(profile_photo_thumbnails=names)
+                    delete_thumbnails(storage, user.pk, set(user.profile_photo_thumbnails.values()) - set(names.values()))
+                    processed += 1
+
+        if processed:
+            org_structure_changed(hierarchy=False)
+        self.stdout.write(self.style.SUCCESS(f"{processed} şəkil üçün miniatür yaradıldı, {skipped} ötürüldü."))
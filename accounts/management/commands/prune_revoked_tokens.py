@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = 'Vaxtı bitmiş ləğv edilmiş refresh tokenləri hissə-hissə silir'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.REVOKED_TOKEN_PRUNE_BATCH_SIZE)
+        parser.add_argument('--import-legacy', action='store_true', help='Köhnə blacklist cədvəlindəki tokenləri köçürür')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if options['import_legacy']:
+            imported = RevokedToken.import_legacy_blacklist(batch_size)
+            self.stdout.write(self.style.SUCCESS(f"Köhnə blacklist-dən {imported} token köçürüldü."))
+
+        deleted = RevokedToken.prune(batch_size)
+        self.stdout.write(self.style.SUCCESS(f"{deleted} vaxtı bitmiş token silindi."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accounts.hierarchy import rebuild_org_closure, rebuild_user_visibility
+
+
+class Command(BaseCommand):
+    help = 'Tabeçilik zəncirinin (OrgClosure) və görünürlük (UserVisibility) cədvəllərini yenidən qurur'
+
+    def handle(self, *args, **options):
+        added, moved, removed = rebuild_org_closure()
+        self.stdout.write(self.style.SUCCESS(
+            f"OrgClosure yeniləndi: {added} əlavə, {moved} dəyişdirildi, {removed} silindi."
+        ))
+
+        added, removed = rebuild_user_visibility()
+        self.stdout.write(self.style.SUCCESS(
+            f"UserVisibility yeniləndi: {added} əlavə, {removed} silindi."
+        ))
@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.utils.text import slugify
 import itertools
+from functools import partial
 from .validators import validate_file_type
+from .hierarchy import get_org_graph, org_structure_changed
+from .thumbnails import build_profile_thumbnails, delete_thumbnails
 from django.db.models import Q
 
 class Department(models.Model):
@@ -41,9 +45,32 @@ class Department(models.Model):
         limit_choices_to={'role': 'top_management'}
     )
 
+    HIERARCHY_FIELDS = ('manager_id', 'department_lead_id')
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_hierarchy = instance._hierarchy_state()
+        return instance
+
+    def _hierarchy_state(self):
+        return tuple(self.__dict__.get(field) for field in self.HIERARCHY_FIELDS)
+
+    def save(self, *args, **kwargs):
+        loaded_hierarchy = getattr(self, '_loaded_hierarchy', (None,) * len(self.HIERARCHY_FIELDS))
+        super().save(*args, **kwargs)
+        self._loaded_hierarchy = self._hierarchy_state()
+
+        changed_ids = {
+            user_id
+            for old, new in zip(loaded_hierarchy, self._loaded_hierarchy) if old != new
+            for user_id in (old, new) if user_id
+        }
+        org_structure_changed(hierarchy=bool(changed_ids), user_ids=changed_ids)
+
 class Position(models.Model):
     name = models.CharField(
         max_length=255, 
@@ -88,6 +115,11 @@ class User(AbstractUser):
         ("dolum", "Dolum"),
         ("bidon", "Bidon"),
     ]
+
+    NOTIFICATION_DELIVERY_CHOICES = [
+        ("immediate", "Dərhal"),
+        ("digest", "Gündəlik xülasə"),
+    ]
     
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, null=True, blank=True)
     factory_role = models.CharField(max_length=20, choices=FACTORY_ROLE_CHOICES, null=True, blank=True)
@@ -98,6 +130,7 @@ class User(AbstractUser):
         blank=True,
         validators=[validate_file_type] 
     )
+    profile_photo_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     phone_number = models.CharField(max_length=20, blank=True)
 
     position = models.ForeignKey(
@@ -119,12 +152,60 @@ class User(AbstractUser):
         related_name='employees'
     )
     slug = models.SlugField(unique=True, max_length=255, blank=True, null=True)
+    notification_delivery = models.CharField(
+        max_length=10, choices=NOTIFICATION_DELIVERY_CHOICES, default="immediate", verbose_name="Bildiriş rejimi"
+    )
 
+    HIERARCHY_FIELDS = ('role', 'factory_role', 'factory_type', 'department_id', 'is_active')
     
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_hierarchy = instance._hierarchy_state()
+        instance._loaded_profile_photo = instance._profile_photo_name()
+        return instance
+
+    def _hierarchy_state(self):
+        return tuple(self.__dict__.get(field) for field in self.HIERARCHY_FIELDS)
+
+    def _profile_photo_name(self):
+        photo = self.__dict__.get('profile_photo')
+        return getattr(photo, 'name', photo) or ''
+
+    @classmethod
+    def refresh_profile_thumbnails(cls, user_id):
+        user = cls.objects.filter(pk=user_id).only('id', 'profile_photo', 'profile_photo_thumbnails').first()
+        if user is None or not user.profile_photo or user.profile_photo_thumbnails:
+            return {}
+
+        names = build_profile_thumbnails(user.profile_photo, user.pk)
+        with transaction.atomic():
+            current = cls.objects.select_for_update().filter(pk=user.pk).first()
+            if current is None or current._profile_photo_name() != user._profile_photo_name() or current.profile_photo_thumbnails:
+                stale = set(names.values()) - set(current.profile_photo_thumbnails.values() if current else ())
+                transaction.on_commit(partial(delete_thumbnails, user.profile_photo.storage, user.pk, stale))
+                return {}
+            current.profile_photo_thumbnails = names
+            current.save(update_fields=['profile_photo_thumbnails'])
+        return names
+
+    @property
+    def profile_photo_thumbnail_urls(self):
+        storage = self._meta.get_field('profile_photo').storage
+        return {size: storage.url(name) for size, name in self.profile_photo_thumbnails.items()}
+
     def save(self, *args, **kwargs):
+        hierarchy_changed = self._state.adding or getattr(self, '_loaded_hierarchy', None) != self._hierarchy_state()
+        photo_changed = 'profile_photo' in self.__dict__ and getattr(self, '_loaded_profile_photo', '') != self._profile_photo_name()
+        stale_thumbnails = []
+        if photo_changed:
+            stale_thumbnails = list(self.profile_photo_thumbnails.values())
+            self.profile_photo_thumbnails = {}
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'profile_photo_thumbnails'}
         if not self.slug:
             base_slug = slugify(f"{self.first_name}-{self.last_name}") or slugify(self.username)
             slug = base_slug
@@ -136,6 +217,16 @@ class User(AbstractUser):
             self.slug = slug
         super().save(*args, **kwargs)
 
+        self._loaded_hierarchy = self._hierarchy_state()
+        self._loaded_profile_photo = self._profile_photo_name()
+        if stale_thumbnails:
+            storage = self._meta.get_field('profile_photo').storage
+            transaction.on_commit(partial(delete_thumbnails, storage, self.pk, stale_thumbnails))
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) - {'last_login'}:
+            org_structure_changed(hierarchy=hierarchy_changed, user_ids={self.pk})
+
 
     @property
     def assigner_role(self):
@@ -156,24 +247,7 @@ class User(AbstractUser):
         return self.get_role_display()
 
     def get_superior(self):
-        if self.role == "employee":
-            if not self.department:
-                return None
-            return self.department.manager or self.department.department_lead
-
-        elif self.role == "manager":
-            if self.department:
-                return self.department.department_lead
-            return None
-
-        elif self.role == "department_lead":
-            return User.objects.filter(role="top_management").first()
-        
-        elif self.role == "top_management": 
-            return User.objects.filter(role="ceo").first()
-
-        else:
-            return None
+        return get_org_graph().superior(self)
         
     def get_assignable_users(self):
         if self.role == 'admin':
@@ -182,93 +256,52 @@ class User(AbstractUser):
         if self.role == "ceo": 
             return User.objects.filter(role="top_management", is_active=True)
 
+        graph = get_org_graph()
+
         if self.role == "top_management":
-            managed_departments = self.top_managed_departments.all()
-            if managed_departments.exists():
+            managed_department_ids = graph.top_managed_departments.get(self.pk)
+            if managed_department_ids:
                 return User.objects.filter(
-                    department__in=managed_departments,
+                    department_id__in=managed_department_ids,
                     role__in=["department_lead"],       
                     is_active=True
                 )
             return User.objects.none()
         
-        if not self.department:
+        if not self.department_id:
             return User.objects.none()
 
         if self.role == "department_lead":
-            try:
-                led_dept = self.led_department
-                return User.objects.filter(
-                    department=led_dept,
-                    role__in=["manager", "employee"],
-                    is_active=True
-                )
-            except Department.DoesNotExist:
+            led_dept_id = graph.led_department.get(self.pk)
+            if not led_dept_id:
                 return User.objects.none()
+            return User.objects.filter(
+                department_id=led_dept_id,
+                role__in=["manager", "employee"],
+                is_active=True
+            )
             
         if self.role == "manager":
-            try:
-                managed_dept = self.managed_department
-                return User.objects.filter(
-                    department=managed_dept,
-                    role="employee",
-                    is_active=True
-                )
-            except Department.DoesNotExist:
+            managed_dept_id = graph.managed_department.get(self.pk)
+            if not managed_dept_id:
                 return User.objects.none()
+            return User.objects.filter(
+                department_id=managed_dept_id,
+                role="employee",
+                is_active=True
+            )
             
         return User.objects.none()
 
     def get_direct_superior(self):
-        if self.role in ["ceo", "admin"]:
-            return None
-        
-        if self.factory_type and self.factory_role:
-            if self.factory_role == "employee":
-                lead = User.objects.filter(factory_role="department_lead", factory_type=self.factory_type, is_active=True).first()
-                if lead: return lead
-                deputy = User.objects.filter(factory_role="deputy_director", factory_type=self.factory_type, is_active=True).first()
-                return deputy if deputy else User.objects.filter(factory_role="top_management", factory_type=self.factory_type, is_active=True).first()
-            
-            if self.factory_role == "department_lead":
-                deputy = User.objects.filter(factory_role="deputy_director", factory_type=self.factory_type, is_active=True).first()
-                return deputy if deputy else User.objects.filter(factory_role="top_management", factory_type=self.factory_type, is_active=True).first()
-            
-            if self.factory_role == "deputy_director":
-                return User.objects.filter(factory_role="top_management", factory_type=self.factory_type, is_active=True).first()
-
-        if self.department:
-            if self.role == "employee":
-                manager = self.department.manager
-                if manager and manager.is_active:
-                    return manager
-            
-            if self.role in ["employee", "manager"]:
-                lead = self.department.department_lead
-                if lead and lead.is_active:
-                    return lead
-        
-        if self.role == "department_lead":
-             if self.department and self.department.top_management.exists():
-                 return self.department.top_management.filter(is_active=True).first()
-             
+        return get_org_graph().direct_superior(self)
 
-        if self.role in ["employee", "manager", "department_lead", "top_management"]:
-             if self.role == "top_management":
-                 ceo = User.objects.filter(role="ceo", is_active=True).first()
-                 if ceo:
-                     return ceo
-             
-             if self.role in ["employee", "manager", "department_lead"]:
-                if self.department and self.department.top_management.exists():
-                     return self.department.top_management.filter(is_active=True).first()
-                
-                ceo = User.objects.filter(role="ceo", is_active=True).first()
-                if ceo:
-                    return ceo
-
-        return None
+    def is_superior_of(self, other):
+        return OrgClosure.objects.filter(ancestor_id=self.pk, descendant_id=other.pk).exists()
     
+    def get_subordinate_ids(self):
+        return get_org_graph().subordinate_ids(self)
+
     def get_subordinates(self):
         if self.role == 'admin':
             return User.objects.filter(is_active=True).exclude(pk=self.pk).order_by('first_name', 'last_name')
@@ -286,67 +319,46 @@ class User(AbstractUser):
                 Q(pk=self.pk) | Q(role='admin')
             ).order_by('first_name', 'last_name')
 
+        graph = get_org_graph()
+
         if self.role == 'top_management':
-            managed_departments = self.top_managed_departments.all()
-            if managed_departments.exists():
+            managed_department_ids = graph.top_managed_departments.get(self.pk)
+            if managed_department_ids:
                 return User.objects.filter(
-                    department__in=managed_departments,
+                    department_id__in=managed_department_ids,
                     role__in=['department_lead', 'manager', 'employee'],
                     is_active=True
                 ).exclude(pk=self.pk).order_by('first_name', 'last_name')
         
         if self.role == 'department_lead':
-            try:
-                led_dept = self.led_department 
-                return User.objects.filter(
-                    department=led_dept,
-                    role__in=['manager', 'employee'],
-                    is_active=True
-                ).order_by('first_name', 'last_name')
-            except Department.DoesNotExist:
+            led_dept_id = graph.led_department.get(self.pk)
+            if not led_dept_id:
                 return User.objects.none()
+            return User.objects.filter(
+                department_id=led_dept_id,
+                role__in=['manager', 'employee'],
+                is_active=True
+            ).order_by('first_name', 'last_name')
 
         if self.role == 'manager':
-            try:
-                managed_dept = self.managed_department
-                return User.objects.filter(
-                    department=managed_dept,
-                    role='employee',
-                    is_active=True
-                ).order_by('first_name', 'last_name')
-            except Department.DoesNotExist:
+            managed_dept_id = graph.managed_department.get(self.pk)
+            if not managed_dept_id:
                 return User.objects.none()
+            return User.objects.filter(
+                department_id=managed_dept_id,
+                role='employee',
+                is_active=True
+            ).order_by('first_name', 'last_name')
 
         return User.objects.none()
     
 
     def get_all_superiors(self):
-        superiors = []
-        current_superior = self.get_direct_superior()
-        limit = 10 
-        count = 0
-        while current_superior and count < limit:
-            superiors.append(current_superior)
-            if current_superior.pk == self.pk:
-                break
-            current_superior = current_superior.get_direct_superior()
-            count += 1
-        return superiors
+        return get_org_graph().all_superiors(self)
     
 
     def get_kpi_superiors(self):
-        superiors = []
-        current_superior = self.get_kpi_evaluator()
-        limit = 5 
-        count = 0
-        while current_superior and count < limit:
-            if current_superior not in superiors:
-                 superiors.append(current_superior)
-                 if current_superior.pk == self.pk:
-                    break
-            current_superior = current_superior.get_kpi_evaluator()
-            count += 1
-        return superiors
+        return get_org_graph().kpi_superiors(self)
     
 
     def get_kpi_subordinates(self):
@@ -358,30 +370,31 @@ class User(AbstractUser):
         if self.role == 'ceo':
              return User.objects.filter(role='top_management', is_active=True)
 
-        if not self.department:
+        if not self.department_id:
             return User.objects.none()
 
+        graph = get_org_graph()
+
         if self.role == 'top_management':
-            managed_departments = self.top_managed_departments.all()
-            if managed_departments.exists():
+            managed_department_ids = graph.top_managed_departments.get(self.pk)
+            if managed_department_ids:
                 return User.objects.filter(
-                    department__in=managed_departments, 
+                    department_id__in=managed_department_ids, 
                     role='department_lead', 
                     is_active=True
                 )
         
         elif self.role == 'department_lead':
-             try:
-                led_dept = self.led_department
-                return User.objects.filter(department=led_dept, role__in=['manager', 'employee'], is_active=True)
-             except Department.DoesNotExist:
+            led_dept_id = graph.led_department.get(self.pk)
+            if not led_dept_id:
                 return User.objects.none()
+            return User.objects.filter(department_id=led_dept_id, role__in=['manager', 'employee'], is_active=True)
+
         elif self.role == 'manager':
-            try:
-                managed_dept = self.managed_department
-                return User.objects.filter(department=managed_dept, role='employee', is_active=True)
-            except Department.DoesNotExist:
+            managed_dept_id = graph.managed_department.get(self.pk)
+            if not managed_dept_id:
                 return User.objects.none()
+            return User.objects.filter(department_id=managed_dept_id, role='employee', is_active=True)
         
         return User.objects.none()
 
@@ -392,296 +405,152 @@ class User(AbstractUser):
                  Q(id=self.id) | Q(role__in=['admin', 'ceo'])
              )
 
+        graph = get_org_graph()
+
         if self.role == 'ceo': 
-             ceo_subordinates = User.objects.filter(is_active=True).exclude(
-                 Q(pk=self.pk) | Q(role__in=['admin', 'ceo'])
-             )
-             
-             result_ids = set(ceo_subordinates.filter(role='top_management').values_list('id', flat=True))
-             
-             for lead in ceo_subordinates.filter(role='department_lead'):
-                 if lead.department and not lead.department.top_management.exists():
-                     result_ids.add(lead.id)
-             
-             for manager in ceo_subordinates.filter(role='manager'):
-                 if manager.department and not manager.department.department_lead:
-                     result_ids.add(manager.id)
-             
-             for employee in ceo_subordinates.filter(role='employee'):
-                 if employee.department:
-                     if not employee.department.manager and not employee.department.department_lead:
-                         result_ids.add(employee.id)
+             result_ids = set()
+             for user in graph.users.values():
+                 if not user.is_active or user.pk == self.pk or user.role in ['admin', 'ceo']:
+                     continue
+                 dept = graph.department_of(user)
+                 if user.role == 'top_management':
+                     result_ids.add(user.id)
+                 elif user.role == 'department_lead':
+                     if dept and not graph.has_top_management(dept):
+                         result_ids.add(user.id)
+                 elif user.role == 'manager':
+                     if dept and not dept.department_lead_id:
+                         result_ids.add(user.id)
+                 elif user.role == 'employee':
+                     if dept and not dept.manager_id and not dept.department_lead_id:
+                         result_ids.add(user.id)
              
              return User.objects.filter(id__in=result_ids).order_by('first_name', 'last_name')
 
         if self.role == 'top_management':
-            managed_departments = self.top_managed_departments.all()
-            if managed_departments.exists():
+            managed_department_ids = graph.top_managed_departments.get(self.pk)
+            if managed_department_ids:
                 return User.objects.filter(
-                    department__in=managed_departments,
+                    department_id__in=managed_department_ids,
                     role__in=['department_lead', 'manager', 'employee'],
                     is_active=True
                 ).exclude(pk=self.pk).order_by('first_name', 'last_name')
             return User.objects.none()
         
         if self.role == 'department_lead':
-            try:
-                led_dept = self.led_department 
-                return User.objects.filter(
-                    department=led_dept,
-                    role__in=['manager', 'employee'],
-                    is_active=True
-                ).order_by('first_name', 'last_name')
-            except Department.DoesNotExist:
+            led_dept_id = graph.led_department.get(self.pk)
+            if not led_dept_id:
                 return User.objects.none()
+            return User.objects.filter(
+                department_id=led_dept_id,
+                role__in=['manager', 'employee'],
+                is_active=True
+            ).order_by('first_name', 'last_name')
 
         if self.role == 'manager':
-            try:
-                managed_dept = self.managed_department
-                return User.objects.filter(
-                    department=managed_dept,
-                    role='employee',
-                    is_active=True
-                ).order_by('first_name', 'last_name')
-            except Department.DoesNotExist:
+            managed_dept_id = graph.managed_department.get(self.pk)
+            if not managed_dept_id:
                 return User.objects.none()
+            return User.objects.filter(
+                department_id=managed_dept_id,
+                role='employee',
+                is_active=True
+            ).order_by('first_name', 'last_name')
 
         return User.objects.none()
     
     def get_kpi_evaluator_by_type(self, evaluation_type):
-        if self.role in ["admin", "ceo"] or not self.department:
-            return None
-        
-        def find_next_available_superior(user):
-            if user.role == 'employee':
-                if user.department.manager and user.department.manager.is_active:
-                    return user.department.manager
-                if user.department.department_lead and user.department.department_lead.is_active:
-                    return user.department.department_lead
-                if user.department.top_management.exists():
-                    return user.department.top_management.filter(is_active=True).first()
-                return User.objects.filter(role='ceo', is_active=True).first()
-            
-            elif user.role == 'manager':
-                if user.department.department_lead and user.department.department_lead.is_active:
-                    return user.department.department_lead
-                if user.department.top_management.exists():
-                    return user.department.top_management.filter(is_active=True).first()
-                return User.objects.filter(role='ceo', is_active=True).first()
-            
-            elif user.role == 'department_lead':
-                if user.department.top_management.exists():
-                    return user.department.top_management.filter(is_active=True).first()
-                return User.objects.filter(role='ceo', is_active=True).first()
-            
-            elif user.role == 'top_management':
-                return User.objects.filter(role='ceo', is_active=True).first()
-            
-            return None
-
-        if evaluation_type == 'SUPERIOR':
-            superior = find_next_available_superior(self)
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"[get_kpi_evaluator_by_type] {self.get_full_name()} ({self.role}) -> SUPERIOR: {superior.get_full_name() if superior else 'None'} ({superior.role if superior else 'N/A'})")
-            return superior
-        
-        elif evaluation_type == 'TOP_MANAGEMENT':
-            if self.role not in ['employee', 'manager']:
-                return None
-            
-            superior = find_next_available_superior(self)
-            
-            if superior and superior.role in ['manager', 'department_lead']:
-                if self.department and self.department.top_management.exists():
-                    tm = self.department.top_management.filter(is_active=True).first()
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.info(f"[get_kpi_evaluator_by_type] {self.get_full_name()} ({self.role}) -> TOP_MANAGEMENT: {tm.get_full_name() if tm else 'None'} (SUPERIOR is {superior.role})")
-                    return tm
-            
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"[get_kpi_evaluator_by_type] {self.get_full_name()} ({self.role}) -> TOP_MANAGEMENT: None (SUPERIOR is {superior.role if superior else 'N/A'})")
-            return None
-
-        return None
+        return get_org_graph().kpi_evaluator_by_type(self, evaluation_type)
     
     def get_kpi_evaluator_by_type_task(self, evaluation_type):
-        if self.role in ["admin", "ceo"] or not self.department:
-            return None
-        
-        def find_next_available_superior(user):
-            if user.role == 'employee':
-                if user.department.manager and user.department.manager.is_active:
-                    return user.department.manager
-                if user.department.department_lead and user.department.department_lead.is_active:
-                    return user.department.department_lead
-                if user.department.top_management.exists():
-                    return user.department.top_management.filter(is_active=True).first()
-                return User.objects.filter(role='ceo', is_active=True).first()
-            
-            elif user.role == 'manager':
-                if user.department.department_lead and user.department.department_lead.is_active:
-                    return user.department.department_lead
-                if user.department.top_management.exists():
-                    return user.department.top_management.filter(is_active=True).first()
-                return User.objects.filter(role='ceo', is_active=True).first()
-            
-            elif user.role == 'department_lead':
-                if user.department.top_management.exists():
-                    return user.department.top_management.filter(is_active=True).first()
-                return User.objects.filter(role='ceo', is_active=True).first()
-            
-            elif user.role == 'top_management':
-                return User.objects.filter(role='ceo', is_active=True).first()
-            
-            return None
-
-        if evaluation_type == 'SUPERIOR':
-            superior = find_next_available_superior(self)
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"[get_kpi_evaluator_by_type_task] {self.get_full_name()} ({self.role}) -> SUPERIOR: {superior.get_full_name() if superior else 'None'} ({superior.role if superior else 'N/A'})")
-            return superior
-        
-        elif evaluation_type == 'TOP_MANAGEMENT':
-            if self.role not in ['employee', 'manager']:
-                return None
-            
-            if self.department and self.department.top_management.exists():
-                tm = self.department.top_management.filter(is_active=True).first()
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.info(f"[get_kpi_evaluator_by_type_task] {self.get_full_name()} ({self.role}) -> TOP_MANAGEMENT: {tm.get_full_name() if tm else 'None'}")
-                return tm
-            
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"[get_kpi_evaluator_by_type_task] {self.get_full_name()} ({self.role}) -> TOP_MANAGEMENT: None (No TM in department)")
-            return None
-
-        return None
+        return get_org_graph().kpi_evaluator_by_type_task(self, evaluation_type)
 
     def get_kpi_evaluator(self):
-        if self.role in ["admin", "ceo"]:
-            return None
-        
-        if self.role == 'employee':
-            if self.department and self.department.manager:
-                return self.department.manager
-            if self.department and self.department.department_lead:
-                return self.department.department_lead
-        
-        elif self.role == 'manager':
-            if self.department and self.department.department_lead:
-                return self.department.department_lead
-
-        elif self.role == 'department_lead':
-            if self.department and self.department.top_management.exists():
-                return self.department.top_management.filter(is_active=True).first()
-        
-        elif self.role == 'top_management':
-            return User.objects.filter(role='ceo', is_active=True).first()
-
-        if self.department and self.department.top_management.exists():
-             return self.department.top_management.filter(is_active=True).first()
-             
-        return User.objects.filter(role='ceo', is_active=True).first()
+        return get_org_graph().kpi_evaluator(self)
     
     def needs_dual_evaluation(self):
-        if self.role not in ['employee', 'manager']:
-            return False
-        
-        if not self.department:
-            return False
-        
-        superior = self.get_kpi_evaluator_by_type('SUPERIOR')
-        if not superior:
-            return False
-        
-        if superior.role in ['manager', 'department_lead']:
-            has_tm = self.department.top_management.exists()
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"[needs_dual_evaluation] {self.get_full_name()} ({self.role}) -> {has_tm} (SUPERIOR: {superior.role}, TM exists: {has_tm})")
-            return has_tm
-        
-        return False
+        return get_org_graph().needs_dual_evaluation(self)
     
     def needs_dual_evaluation_task(self):
-        if self.role not in ['employee', 'manager']:
-            return False
-        
-        if not self.department:
-            return False
-        
-        has_tm = self.department.top_management.exists()
-        
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"[needs_dual_evaluation_task] {self.get_full_name()} ({self.role}) -> {has_tm} (TM exists: {has_tm})")
-        
-        return has_tm
+        return get_org_graph().needs_dual_evaluation_task(self)
 
     def get_evaluation_config(self):
-        if self.role in ['admin', 'ceo']:
-            return {
-                'requires_self': False,
-                'superior_evaluator': None,
-                'superior_evaluator_name': None,
-                'tm_evaluator': None,
-                'tm_evaluator_name': None,
-                'is_dual_evaluation': False
-            }
-        
-        superior = self.get_kpi_evaluator_by_type('SUPERIOR')
-        tm_evaluator = self.get_kpi_evaluator_by_type('TOP_MANAGEMENT')
-        is_dual = self.needs_dual_evaluation()
-        
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"[get_evaluation_config] {self.get_full_name()} ({self.role}) -> Superior: {superior.get_full_name() if superior else 'None'}, TM: {tm_evaluator.get_full_name() if tm_evaluator else 'None'}, Dual: {is_dual}")
-        
-        return {
-            'requires_self': True,
-            'superior_evaluator': superior,
-            'superior_evaluator_name': superior.get_full_name() if superior else None,
-            'tm_evaluator': tm_evaluator,
-            'tm_evaluator_name': tm_evaluator.get_full_name() if tm_evaluator else None,
-            'is_dual_evaluation': is_dual
-        }
+        return get_org_graph().evaluation_config(self)
     
     def get_evaluation_config_task(self):
-        if self.role in ['admin', 'ceo']:
-            return {
-                'requires_self': False,
-                'superior_evaluator': None,
-                'superior_evaluator_name': None,
-                'superior_evaluator_id': None,
-                'tm_evaluator': None,
-                'tm_evaluator_name': None,
-                'tm_evaluator_id': None,
-                'is_dual_evaluation': False
-            }
-        
-        superior = self.get_kpi_evaluator_by_type_task('SUPERIOR')
-        tm_evaluator = self.get_kpi_evaluator_by_type_task('TOP_MANAGEMENT')
-        is_dual = self.needs_dual_evaluation_task()
-        
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"[get_evaluation_config] {self.get_full_name()} ({self.role}) -> Superior: {superior.get_full_name() if superior else 'None'}, TM: {tm_evaluator.get_full_name() if tm_evaluator else 'None'}, Dual: {is_dual}")
-        
-        return {
-            'requires_self': True,
-            'superior_evaluator': superior,
-            'superior_evaluator_name': superior.get_full_name() if superior else None,
-            'superior_evaluator_id': superior.id if superior else None,
-            'tm_evaluator': tm_evaluator,
-            'tm_evaluator_name': tm_evaluator.get_full_name() if tm_evaluator else None,
-            'tm_evaluator_id': tm_evaluator.id if tm_evaluator else None,
-            'is_dual_evaluation': is_dual
-        }
+        return get_org_graph().evaluation_config_task(self)
+
+
+class OrgClosure(models.Model):
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='closure_descendants')
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name='closure_ancestors')
+    depth = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        indexes = [models.Index(fields=['descendant', 'depth'])]
+
+    def __str__(self):
+        return f"{self.ancestor} -> {self.descendant} ({self.depth})"
+
+
+class UserVisibility(models.Model):
+    viewer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='visible_user_links')
+    visible_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='viewer_links')
+
+    class Meta:
+        unique_together = ('viewer', 'visible_user')
+
+    def __str__(self):
+        return f"{self.viewer} -> {self.visible_user}"
 
 
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
+
+    @classmethod
+    def is_revoked(cls, jti):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        return cls.objects.filter(jti=jti).exists() or BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    @classmethod
+    def revoke(cls, jti, expires_at):
+        cls.objects.bulk_create([cls(jti=jti, expires_at=expires_at)], ignore_conflicts=True)
+
+    @classmethod
+    def prune(cls, batch_size, now=None):
+        now = now or timezone.now()
+        deleted = 0
+        while True:
+            ids = list(
+                cls.objects.filter(expires_at__lt=now).order_by('expires_at').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return deleted
+            deleted += cls.objects.filter(pk__in=ids).delete()[0]
+
+    @classmethod
+    def import_legacy_blacklist(cls, batch_size, now=None):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        now = now or timezone.now()
+        legacy = BlacklistedToken.objects.filter(token__expires_at__gte=now).exclude(
+            token__jti__in=cls.objects.values('jti')
+        ).values_list('token__jti', 'token__expires_at').iterator(chunk_size=batch_size)
+
+        imported = 0
+        batch = []
+        for jti, expires_at in legacy:
+            batch.append(cls(jti=jti, expires_at=expires_at))
+            if len(batch) >= batch_size:
+                imported += len(cls.objects.bulk_create(batch, ignore_conflicts=True))
+                batch = []
+        if batch:
+            imported += len(cls.objects.bulk_create(batch, ignore_conflicts=True))
+        return imported
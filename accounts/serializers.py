@@ -1,10 +1,35 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from .models import User, Department, Position, FactoryPosition
+from .hierarchy import get_org_graph, org_structure_changed
+from .tokens import RevocableRefreshToken
+from django.conf import settings
 from django.contrib.auth import get_user_model, login
+from django.contrib.auth.models import update_last_login
 from django.utils.translation import gettext_lazy as _
+from django.db import transaction
+from functools import partial
 User = get_user_model()
+
+class ProfilePhotoThumbnailsField(serializers.ReadOnlyField):
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'profile_photo_thumbnail_urls')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        if request is None:
+            return value
+        return {size: request.build_absolute_uri(url) for size, url in value.items()}
     
+class ProfileThumbnailsMixin:
+    def save(self, **kwargs):
+        user = super().save(**kwargs)
+        if self.validated_data.get('profile_photo'):
+            transaction.on_commit(partial(User.refresh_profile_thumbnails, user.pk))
+        return user
+
 class FactoryPositionSerializer(serializers.ModelSerializer):
     class Meta:
         model = FactoryPosition
@@ -15,7 +40,7 @@ class PositionSerializer(serializers.ModelSerializer):
         model = Position
         fields = ['id', 'name']
 
-class OfficeUserSerializer(serializers.ModelSerializer):
+class OfficeUserSerializer(ProfileThumbnailsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
     role_display = serializers.SerializerMethodField()
     all_departments = serializers.SerializerMethodField(read_only=True)
@@ -70,34 +95,7 @@ class OfficeUserSerializer(serializers.ModelSerializer):
         return user
     
     def get_all_departments(self, obj):
-        departments = set()
-        
-        if obj.department: 
-            departments.add(obj.department.name)
-        
-        try:
-            if hasattr(obj, 'managed_department') and obj.managed_department: 
-                departments.add(obj.managed_department.name)
-        except Department.DoesNotExist:
-            pass 
-        
-        try:
-            if hasattr(obj, 'led_department') and obj.led_department: 
-                departments.add(obj.led_department.name)
-        except Department.DoesNotExist:
-            pass
-            
-        try:
-             if hasattr(obj, 'ceo_department') and obj.ceo_department: 
-                 departments.add(obj.ceo_department.name)
-        except Department.DoesNotExist:
-             pass
-
-        if hasattr(obj, 'top_managed_departments'):
-            for dept in obj.top_managed_departments.all(): 
-                departments.add(dept.name)
-                
-        return list(departments)
+        return get_org_graph().department_names(obj)
     
     def update(self, instance, validated_data):
         top_departments = validated_data.pop('top_managed_departments', None)
@@ -168,7 +166,7 @@ class OfficeUserSerializer(serializers.ModelSerializer):
             }
         return None
 
-class FactoryUserSerializer(serializers.ModelSerializer):
+class FactoryUserSerializer(ProfileThumbnailsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
     factory_role_display = serializers.CharField(source='get_factory_role_display', read_only=True)
     factory_position = serializers.PrimaryKeyRelatedField(
@@ -233,11 +231,12 @@ class FactoryUserSerializer(serializers.ModelSerializer):
             return obj.get_role_display()
         return None
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ProfileThumbnailsMixin, serializers.ModelSerializer):
     email = serializers.EmailField(required=True)
     all_departments = serializers.SerializerMethodField(read_only=True)
     position_details = serializers.SerializerMethodField()
     profile_photo = serializers.FileField(required=False, allow_null=True, use_url=True)
+    profile_photo_thumbnails = ProfilePhotoThumbnailsField()
     
     password = serializers.CharField(
         write_only=True, required=False, allow_null=True, allow_blank=True
@@ -265,8 +264,8 @@ class UserSerializer(serializers.ModelSerializer):
         fields = [
             "id", "email", "role", "role_display", "all_departments", 'factory_role', 
             'factory_type', 'factory_type_display', 'position', 'factory_position', 
-            'position_details', "department", "first_name", "last_name", "profile_photo", 
-            "phone_number", "password", "top_managed_departments", "user_type"
+            'position_details', "department", "first_name", "last_name", "profile_photo", "profile_photo_thumbnails",
+            "phone_number", "password", "top_managed_departments", "user_type", "notification_delivery"
         ]
         read_only_fields = ['role_display', 'factory_type_display', 'all_departments', 'position_details']
         extra_kwargs = {'username': {'required': False}}
@@ -302,34 +301,7 @@ class UserSerializer(serializers.ModelSerializer):
         if self.get_user_type(obj) == "factory":
             return []
         
-        departments = set()
-        
-        if obj.department: 
-            departments.add(obj.department.name)
-        
-        try:
-            if hasattr(obj, 'managed_department') and obj.managed_department: 
-                departments.add(obj.managed_department.name)
-        except Department.DoesNotExist:
-            pass 
-        
-        try:
-            if hasattr(obj, 'led_department') and obj.led_department: 
-                departments.add(obj.led_department.name)
-        except Department.DoesNotExist:
-            pass
-            
-        try:
-             if hasattr(obj, 'ceo_department') and obj.ceo_department: 
-                 departments.add(obj.ceo_department.name)
-        except Department.DoesNotExist:
-             pass
-
-        if hasattr(obj, 'top_managed_departments'):
-            for dept in obj.top_managed_departments.all(): 
-                departments.add(dept.name)
-                
-        return list(departments)
+        return get_org_graph().department_names(obj)
     
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -381,6 +353,7 @@ class UserSerializer(serializers.ModelSerializer):
                     Department.objects.filter(id=department.id).update(department_lead=user)
                 elif role == 'ceo': 
                     Department.objects.filter(id=department.id).update(ceo=user)
+                org_structure_changed(user_ids={user.pk, department.manager_id, department.department_lead_id} - {None})
         
         return user
 
@@ -475,6 +448,8 @@ class DepartmentSerializer(serializers.ModelSerializer):
 
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RevocableRefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
@@ -499,13 +474,18 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         if not user.is_active:
             raise serializers.ValidationError("İstifadəçi aktiv deyil.")
-            
-        data = super().validate(attrs={self.username_field: user.get_username(), "password": password})
+
+        self.user = user
+        refresh = self.get_token(user)
+        data = {"refresh": str(refresh), "access": str(refresh.access_token)}
+
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
 
         request = self.context.get('request')
         
-        if request:
-            login(request, user)
+        if request and settings.LOGIN_CREATE_SESSION:
+            login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
 
         user_serializer = UserSerializer(self.user)
         data['user'] = user_serializer.data
@@ -516,4 +496,8 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         super().__init__(*args, **kwargs)
         self.fields.pop(self.username_field, None)
         self.fields['email'] = serializers.EmailField()
-        self.fields['password'] = serializers.CharField(write_only=True)
\ No newline at end of file
+        self.fields['password'] = serializers.CharField(write_only=True)
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RevocableRefreshToken
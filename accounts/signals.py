@@ -0,0 +1,46 @@
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from .authentication import CachedJWTAuthentication
+from .hierarchy import org_structure_changed, rebuild_org_tables
+from .models import User, Department, Position, FactoryPosition
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Department)
+def org_member_deleted(sender, instance, **kwargs):
+    org_structure_changed()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def auth_user_changed(sender, instance, **kwargs):
+    CachedJWTAuthentication.forget_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=Department.top_management.through)
+def top_management_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_top_management = set(instance.top_management.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if reverse:
+            user_ids = {instance.pk}
+        elif action == 'post_clear':
+            user_ids = getattr(instance, '_cleared_top_management', set())
+        else:
+            user_ids = pk_set
+        org_structure_changed(hierarchy=bool(user_ids), user_ids=user_ids)
+
+
+@receiver(post_save, sender=Position)
+@receiver(post_save, sender=FactoryPosition)
+@receiver(post_delete, sender=Position)
+@receiver(post_delete, sender=FactoryPosition)
+def position_changed(sender, instance, **kwargs):
+    org_structure_changed(hierarchy=False)
+
+
+@receiver(post_migrate)
+def seed_org_tables(sender, app_config, **kwargs):
+    if app_config.label == 'accounts':
+        rebuild_org_tables()
+
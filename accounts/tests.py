@@ -1,3 +1,452 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import CachedJWTAuthentication
+from .hierarchy import (
+    ORG_VERSION_CACHE_KEY, OrgGraph, closure_rows, get_org_graph, resolve_evaluation_configs, visibility_rows
+)
+from .models import Department, OrgClosure, RevokedToken, User, UserVisibility
+from .serializers import UserSerializer
+from .thumbnails import build_profile_thumbnails
+from .tokens import RevocableRefreshToken
+
+
+def make_user(username, **fields):
+    return User.objects.create(username=username, email=f"{username}@example.com", **fields)
+
+
+class OrgGraphSnapshotTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.department = Department.objects.create(name='Satış')
+        self.manager = make_user('manager', role='manager', department=self.department)
+        self.department.manager = self.manager
+        self.department.save()
+        self.employee = make_user('employee', role='employee', department=self.department)
+
+    def test_rolled_back_changes_do_not_reach_the_snapshot(self):
+        self.assertEqual(get_org_graph().subordinate_ids(self.manager), {self.employee.pk})
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                ghost = make_user('ghost', role='employee', department=self.department)
+                self.assertEqual(get_org_graph().subordinate_ids(self.manager), {self.employee.pk, ghost.pk})
+                raise RuntimeError
+
+        self.assertEqual(get_org_graph().subordinate_ids(self.manager), {self.employee.pk})
+
+    def test_committed_changes_are_visible_in_the_same_process(self):
+        get_org_graph()
+        with transaction.atomic():
+            colleague = make_user('colleague', role='employee', department=self.department)
+        self.assertEqual(get_org_graph().subordinate_ids(self.manager), {self.employee.pk, colleague.pk})
+
+    @override_settings(ORG_VERSION_CHECK_INTERVAL=3600)
+    def test_version_stamp_is_read_once_per_check_interval(self):
+        graph = get_org_graph()
+        cache.set(ORG_VERSION_CACHE_KEY, 'other-worker', None)
+        self.assertIs(get_org_graph(), graph)
+
+        graph.checked_until = 0
+        self.assertIsNot(get_org_graph(), graph)
+
+
+class AllDepartmentsTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.ceo = make_user('ceo', role='ceo')
+        self.sales = Department.objects.create(name='Satış', ceo=self.ceo)
+        self.finance = Department.objects.create(name='Maliyyə')
+        self.lead = make_user('lead', role='department_lead', department=self.finance)
+        self.manager = make_user('manager', role='manager', department=self.finance)
+        self.sales.department_lead = self.lead
+        self.sales.manager = self.manager
+        self.sales.save()
+        self.top_manager = make_user('top-manager', role='top_management')
+        self.finance.top_management.add(self.top_manager)
+        self.employees = [make_user(f"employee-{i}", role='employee', department=self.sales) for i in range(10)]
+
+    def serialize(self, users):
+        users = User.objects.filter(pk__in=[user.pk for user in users]).select_related(
+            'department', 'position', 'factory_position'
+        ).prefetch_related('top_managed_departments').order_by('pk')
+        return {row['id']: sorted(row['all_departments']) for row in UserSerializer(users, many=True).data}
+
+    def test_departments_cover_every_role(self):
+        departments = self.serialize([self.ceo, self.lead, self.manager, self.top_manager, self.employees[0]])
+        self.assertEqual(departments, {
+            self.ceo.pk: ['Satış'],
+            self.lead.pk: ['Maliyyə', 'Satış'],
+            self.manager.pk: ['Maliyyə', 'Satış'],
+            self.top_manager.pk: ['Maliyyə'],
+            self.employees[0].pk: ['Satış'],
+        })
+
+        self.finance.name = 'Maliyyə və uçot'
+        self.finance.save()
+        self.assertEqual(self.serialize([self.top_manager]), {self.top_manager.pk: ['Maliyyə və uçot']})
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self.serialize(self.employees[:1])
+        with CaptureQueriesContext(connection) as one:
+            self.serialize(self.employees[:1])
+        with CaptureQueriesContext(connection) as page:
+            self.serialize(self.employees)
+        self.assertEqual(len(page), len(one))
+
+
+class OrgTablesTests(TestCase):
+    def setUp(self):
+        self.ceo = make_user('ceo', role='ceo')
+        self.sales = Department.objects.create(name='Satış')
+        self.finance = Department.objects.create(name='Maliyyə')
+        self.sales_manager = make_user('sales-manager', role='manager', department=self.sales)
+        self.finance_manager = make_user('finance-manager', role='manager', department=self.finance)
+        self.sales.manager = self.sales_manager
+        self.sales.save()
+        self.finance.manager = self.finance_manager
+        self.finance.save()
+        self.employee = make_user('employee', role='employee', department=self.sales)
+
+    def assertTablesMatchGraph(self):
+        graph = OrgGraph.build()
+        self.assertEqual(
+            {(a, d): depth for a, d, depth in OrgClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')},
+            closure_rows(graph),
+        )
+        self.assertEqual(set(UserVisibility.objects.values_list('viewer_id', 'visible_user_id')), visibility_rows(graph))
+
+    def test_moving_an_employee_updates_both_subtrees(self):
+        self.employee.department = self.finance
+        self.employee.save()
+
+        self.assertTrue(self.finance_manager.is_superior_of(self.employee))
+        self.assertFalse(self.sales_manager.is_superior_of(self.employee))
+        self.assertTrue(UserVisibility.objects.filter(viewer=self.finance_manager, visible_user=self.employee).exists())
+        self.assertFalse(UserVisibility.objects.filter(viewer=self.sales_manager, visible_user=self.employee).exists())
+        self.assertTablesMatchGraph()
+
+    def test_replacing_a_manager_reroutes_the_department(self):
+        new_manager = make_user('new-manager', role='manager', department=self.sales)
+        self.sales.manager = new_manager
+        self.sales.save()
+
+        self.assertTrue(new_manager.is_superior_of(self.employee))
+        self.assertFalse(self.sales_manager.is_superior_of(self.employee))
+        self.assertTablesMatchGraph()
+
+    def test_top_management_changes_are_applied(self):
+        top_manager = make_user('top-manager', role='top_management')
+        self.sales.top_management.add(top_manager)
+        self.assertTrue(top_manager.is_superior_of(self.employee))
+        self.assertTablesMatchGraph()
+
+        self.sales.top_management.clear()
+        self.assertFalse(top_manager.is_superior_of(self.employee))
+        self.assertTablesMatchGraph()
+
+    def test_deactivating_a_manager_and_deleting_a_user(self):
+        self.sales_manager.is_active = False
+        self.sales_manager.save()
+        self.assertTablesMatchGraph()
+
+        self.finance_manager.delete()
+        self.assertTablesMatchGraph()
+
+    def test_unrelated_saves_do_not_touch_the_tables(self):
+        with mock.patch('accounts.hierarchy.rebuild_org_tables') as rebuild:
+            self.sales.name = 'Satış və marketinq'
+            self.sales.save()
+            self.employee.first_name = 'Aysel'
+            self.employee.save()
+            self.sales.save()
+        rebuild.assert_not_called()
+
+
+class OrgChainTestCase(TestCase):
+    def setUp(self):
+        self.ceo = make_user('ceo', role='ceo')
+        self.department = Department.objects.create(name='Satış')
+        self.lead = make_user('lead', role='department_lead', department=self.department)
+        self.manager = make_user('manager', role='manager', department=self.department)
+        self.department.ceo = self.ceo
+        self.department.department_lead = self.lead
+        self.department.manager = self.manager
+        self.department.save()
+        self.employee = make_user('employee', role='employee', department=self.department)
+
+
+class OrgClosureTests(OrgChainTestCase):
+    def reporting_chain(self, user):
+        chain = []
+        superior = user.get_direct_superior()
+        while superior:
+            chain.append(superior.pk)
+            superior = superior.get_direct_superior()
+        return chain
+
+    def test_closure_follows_the_reporting_chain_with_depths(self):
+        chain = self.reporting_chain(self.employee)
+        self.assertEqual(chain, [self.manager.pk, self.lead.pk, self.ceo.pk])
+        self.assertEqual(
+            list(OrgClosure.objects.filter(descendant=self.employee).order_by('depth').values_list('ancestor_id', 'depth')),
+            [(pk, depth) for depth, pk in enumerate(chain, 1)]
+        )
+
+        self.assertTrue(self.ceo.is_superior_of(self.employee))
+        self.assertTrue(self.manager.is_superior_of(self.employee))
+        self.assertFalse(self.employee.is_superior_of(self.manager))
+        self.assertFalse(self.employee.is_superior_of(self.employee))
+
+    def test_rebuild_command_repairs_drift(self):
+        expected = set(OrgClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+        OrgClosure.objects.filter(descendant=self.employee).delete()
+        OrgClosure.objects.create(ancestor=self.employee, descendant=self.ceo, depth=1)
+        UserVisibility.objects.all().delete()
+
+        call_command('rebuild_org_closure', stdout=io.StringIO())
+
+        self.assertEqual(set(OrgClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')), expected)
+        self.assertEqual(set(UserVisibility.objects.values_list('viewer_id', 'visible_user_id')), visibility_rows(OrgGraph.build()))
+
+
+class EvaluationConfigTests(OrgChainTestCase):
+    def setUp(self):
+        super().setUp()
+        self.top_manager = make_user('top-manager', role='top_management')
+        self.department.top_management.add(self.top_manager)
+        self.colleagues = [make_user(f"colleague-{i}", role='employee', department=self.department) for i in range(5)]
+
+    def test_batch_matches_the_per_user_config(self):
+        users = list(User.objects.all())
+        configs = resolve_evaluation_configs(user.pk for user in users)
+
+        self.assertEqual(set(configs), {user.pk for user in users})
+        for user in users:
+            self.assertEqual(configs[user.pk], user.get_evaluation_config_task())
+
+        self.assertEqual(configs[self.employee.pk]['superior_evaluator_id'], self.manager.pk)
+        self.assertEqual(configs[self.employee.pk]['tm_evaluator_id'], self.top_manager.pk)
+        self.assertFalse(configs[self.ceo.pk]['requires_self'])
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        get_org_graph()
+        with CaptureQueriesContext(connection) as one:
+            resolve_evaluation_configs([self.employee.pk])
+        with CaptureQueriesContext(connection) as many:
+            resolve_evaluation_configs([self.employee.pk] + [user.pk for user in self.colleagues])
+        self.assertEqual(len(many), len(one))
+
+
+class RevokedTokenTests(TestCase):
+    def setUp(self):
+        self.user = make_user('token-user', role='employee')
+
+    def test_revoked_token_is_rejected_right_away(self):
+        token = RevocableRefreshToken.for_user(self.user)
+        RevocableRefreshToken(str(token))
+
+        token.blacklist()
+
+        with self.assertRaises(TokenError):
+            RevocableRefreshToken(str(token))
+        self.assertFalse(OutstandingToken.objects.exists())
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        client = APIClient()
+        token = str(RevocableRefreshToken.for_user(self.user))
+
+        response = client.post('/api/accounts/refresh/', {'refresh': token}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['refresh'], token)
+
+        response = client.post('/api/accounts/refresh/', {'refresh': token}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_legacy_blacklist_is_honoured_and_imported_without_deleting_it(self):
+        token = RevocableRefreshToken.for_user(self.user)
+        outstanding = OutstandingToken.objects.create(
+            user=self.user, jti=token['jti'], token=str(token), expires_at=timezone.now() + timedelta(days=1)
+        )
+        BlacklistedToken.objects.create(token=outstanding)
+        OutstandingToken.objects.create(
+            user=self.user, jti='expired', token='expired', expires_at=timezone.now() - timedelta(days=1)
+        )
+
+        with self.assertRaises(TokenError):
+            RevocableRefreshToken(str(token))
+
+        self.assertEqual(RevokedToken.import_legacy_blacklist(batch_size=1), 1)
+        self.assertEqual(RevokedToken.import_legacy_blacklist(batch_size=1), 0)
+        self.assertTrue(RevokedToken.objects.filter(jti=token['jti']).exists())
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+    def test_prune_deletes_only_expired_tokens(self):
+        now = timezone.now()
+        for i in range(5):
+            RevokedToken.revoke(f"expired-{i}", now - timedelta(minutes=i + 1))
+        RevokedToken.revoke('valid', now + timedelta(days=1))
+
+        self.assertEqual(RevokedToken.prune(batch_size=2, now=now), 5)
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['valid'])
+
+
+@mock.patch.object(CachedJWTAuthentication, 'cache_enabled', return_value=True)
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.department = Department.objects.create(name='Satış')
+        self.user = make_user('auth-user', role='manager', department=self.department)
+        self.user.set_password('köhnə-parol')
+        self.user.save()
+        self.token = AccessToken.for_user(self.user)
+        self.authentication = CachedJWTAuthentication()
+
+    def test_cache_holds_column_values_without_the_password_hash(self, cache_enabled):
+        with self.assertNumQueries(2):
+            self.authentication.get_user(self.token)
+        with self.assertNumQueries(0):
+            user = self.authentication.get_user(self.token)
+
+        cached = cache.get(CachedJWTAuthentication.cache_key(self.user.pk))
+        self.assertNotIn('password', cached['fields'])
+        self.assertNotIn(self.user.password, str(cached))
+        self.assertEqual((user.pk, user.role, user.department_id), (self.user.pk, 'manager', self.department.pk))
+
+    def test_saving_the_user_invalidates_the_cache(self, cache_enabled):
+        self.authentication.get_user(self.token)
+
+        self.user.role = 'employee'
+        self.user.save()
+        self.assertEqual(self.authentication.get_user(self.token).role, 'employee')
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+    def test_deleted_user_is_rejected(self, cache_enabled):
+        self.authentication.get_user(self.token)
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+    def test_saving_a_cached_user_keeps_the_password(self, cache_enabled):
+        self.authentication.get_user(self.token)
+        user = self.authentication.get_user(self.token)
+        user.first_name = 'Aysel'
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Aysel')
+        self.assertTrue(self.user.check_password('köhnə-parol'))
+
+
+def make_photo(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 200), color).save(buffer, 'PNG')
+    return SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png')
+
+
+class ProfileThumbnailTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PROFILE_PHOTO_THUMBNAIL_SIZES=[32, 64])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = make_user('photo-user', role='employee')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.storage = User._meta.get_field('profile_photo').storage
+
+    def upload(self, color):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with mock.patch('accounts.models.build_profile_thumbnails', wraps=build_profile_thumbnails) as build:
+                response = self.client.patch('/api/accounts/me/', {'profile_photo': make_photo(color)}, format='multipart')
+                self.assertEqual(response.status_code, 200)
+                build.assert_not_called()
+                self.assertEqual(User.objects.get(pk=self.user.pk).profile_photo_thumbnails, {})
+        self.assertTrue(callbacks)
+        self.user.refresh_from_db()
+        return self.user.profile_photo_thumbnails
+
+    def test_thumbnails_are_generated_after_commit(self):
+        thumbnails = self.upload('red')
+
+        self.assertEqual(set(thumbnails), {'32', '64'})
+        for name in thumbnails.values():
+            self.assertTrue(self.storage.exists(name))
+
+    def test_replaced_and_removed_photos_delete_their_thumbnails(self):
+        old_thumbnails = self.upload('red')
+        new_thumbnails = self.upload('blue')
+
+        self.assertFalse(set(old_thumbnails.values()) & set(new_thumbnails.values()))
+        self.assertFalse(any(self.storage.exists(name) for name in old_thumbnails.values()))
+        self.assertTrue(all(self.storage.exists(name) for name in new_thumbnails.values()))
+
+        user = User.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile_photo = None
+            user.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).profile_photo_thumbnails, {})
+        self.assertFalse(any(self.storage.exists(name) for name in new_thumbnails.values()))
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        self.user = make_user('login-user', role='employee')
+        self.user.set_password('gizli-parol')
+        self.user.save()
+        self.client = APIClient()
+
+    def login(self, password='gizli-parol'):
+        return self.client.post('/api/accounts/login/', {'email': self.user.email, 'password': password}, format='json')
+
+    def test_password_is_checked_once_and_no_session_is_written(self):
+        with mock.patch('django.contrib.auth.base_user.check_password', wraps=check_password) as checked:
+            response = self.login()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(checked.call_count, 1)
+        self.assertEqual(response.data['user']['id'], self.user.pk)
+        self.assertFalse(Session.objects.exists())
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get('/api/accounts/me/').status_code, 200)
+
+    def test_wrong_password_and_inactive_user_are_rejected(self):
+        response = self.login('yanlış')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Şifrə yanlışdır.', str(response.data))
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.login()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('İstifadəçi aktiv deyil.', str(response.data))
@@ -0,0 +1,79 @@
+import hashlib
+import io
+import logging
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'profile_photos/thumbs'
+THUMBNAIL_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+def thumbnail_options():
+    return (
+        settings.PROFILE_PHOTO_THUMBNAIL_SIZES,
+        settings.PROFILE_PHOTO_THUMBNAIL_FORMAT,
+        settings.PROFILE_PHOTO_THUMBNAIL_QUALITY,
+    )
+
+
+def read_photo(photo):
+    if photo._committed:
+        with photo.storage.open(photo.name, 'rb') as f:
+            return f.read()
+    photo.seek(0)
+    content = photo.read()
+    photo.seek(0)
+    return content
+
+
+def render_thumbnails(content, sizes, image_format, quality):
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image.draft('RGB', (max(sizes) * 2, max(sizes) * 2))
+            image = ImageOps.exif_transpose(image)
+            has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+            image = image.convert('RGBA' if has_alpha and image_format != 'JPEG' else 'RGB')
+
+            rendered = {}
+            for size in sizes:
+                thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+                buffer = io.BytesIO()
+                thumbnail.save(buffer, image_format, quality=quality, optimize=True)
+                rendered[size] = buffer.getvalue()
+            return rendered
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        logger.warning(f"Profil şəkli üçün miniatür yaradıla bilmədi: {e}")
+        return {}
+
+
+def thumbnail_prefix(user_id):
+    return f"{THUMBNAIL_DIR}/{user_id}_"
+
+
+def store_thumbnails(storage, content, rendered, image_format, user_id):
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    extension = THUMBNAIL_EXTENSIONS[image_format]
+    names = {}
+    for size, data in rendered.items():
+        name = f"{thumbnail_prefix(user_id)}{digest}_{size}.{extension}"
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(data))
+        names[str(size)] = name
+    return names
+
+
+def build_profile_thumbnails(photo, user_id):
+    content = read_photo(photo)
+    sizes, image_format, quality = thumbnail_options()
+    return store_thumbnails(
+        photo.storage, content, render_thumbnails(content, sizes, image_format, quality), image_format, user_id
+    )
+
+
+def delete_thumbnails(storage, user_id, names):
+    for name in names:
+        if name.startswith(thumbnail_prefix(user_id)):
+            storage.delete(name)
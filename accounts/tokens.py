@@ -0,0 +1,22 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from .models import RevokedToken
+
+
+class RevocableRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        return super(BlacklistMixin, cls).for_user(user)
+
+    def check_blacklist(self):
+        if RevokedToken.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        return RevokedToken.revoke(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload["exp"]))
+
+    def outstand(self):
+        return None
@@ -6,11 +6,16 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import RevocableRefreshToken
 from rest_framework.decorators import action
 from .filters import UserFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+import os
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+from .thumbnails import THUMBNAIL_DIR
 
 class BaseUserViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
@@ -24,7 +29,7 @@ class BaseUserViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         elif request.method in ['PUT', 'PATCH']:
             partial = request.method == 'PATCH'
-            serializer = self.get_serializer(request.user, data=request.data, partial=partial)
+            serializer = self.get_serializer(User.objects.get(pk=request.user.pk), data=request.data, partial=partial)
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data)
@@ -71,12 +76,17 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
+            token = RevocableRefreshToken(refresh_token)
             token.blacklist()
             return Response(status=status.HTTP_205_RESET_CONTENT)
         except Exception as e:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
+def profile_photo_thumbnail(request, path):
+    response = serve(request, path, document_root=os.path.join(settings.MEDIA_ROOT, THUMBNAIL_DIR))
+    patch_cache_control(response, public=True, max_age=settings.PROFILE_PHOTO_THUMBNAIL_MAX_AGE, immutable=True)
+    return response
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
     queryset = User.objects.select_related(
         'department', 'position', 'factory_position'
@@ -85,7 +95,9 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        return self.get_queryset().get(pk=self.request.user.pk)
     
 
 class FilterableDepartmentListView(APIView):
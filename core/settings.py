@@ -74,6 +74,7 @@ INSTALLED_APPS = [
     'userkpisystem',
     'reports',
     'equipment',
+    'notifications',
 ]
 
 SITE_ID = 1
@@ -92,7 +93,7 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
@@ -106,6 +107,7 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
     "UPDATE_LAST_LOGIN": True,
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.RevocableTokenRefreshSerializer",
 
     "ALGORITHM": "HS256",
     "SIGNING_KEY": SECRET_KEY,
@@ -163,6 +165,24 @@ DATABASES = {
     )
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='kpi-system'),
+    }
+}
+
+ORG_GRAPH_TTL = config('ORG_GRAPH_TTL', default=300, cast=int)
+ORG_VERSION_CHECK_INTERVAL = config('ORG_VERSION_CHECK_INTERVAL', default=1, cast=float)
+TASK_STATS_CACHE_TTL = config('TASK_STATS_CACHE_TTL', default=60, cast=int)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+REVOKED_TOKEN_PRUNE_BATCH_SIZE = config('REVOKED_TOKEN_PRUNE_BATCH_SIZE', default=5000, cast=int)
+PROFILE_PHOTO_THUMBNAIL_SIZES = config('PROFILE_PHOTO_THUMBNAIL_SIZES', default='32,64,128', cast=Csv(int))
+PROFILE_PHOTO_THUMBNAIL_FORMAT = config('PROFILE_PHOTO_THUMBNAIL_FORMAT', default='WEBP')
+PROFILE_PHOTO_THUMBNAIL_QUALITY = config('PROFILE_PHOTO_THUMBNAIL_QUALITY', default=80, cast=int)
+PROFILE_PHOTO_THUMBNAIL_MAX_AGE = config('PROFILE_PHOTO_THUMBNAIL_MAX_AGE', default=31536000, cast=int)
+TASK_SEARCH_CONFIG = config('TASK_SEARCH_CONFIG', default='simple')
+
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -201,6 +221,13 @@ EMAIL_USE_SSL = config('EMAIL_USE_SSL', cast=bool)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', cast=bool)
 EMAIL_BACKEND = config('EMAIL_BACKEND')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL')
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=6, cast=int)
+EMAIL_OUTBOX_RETRY_DELAY = config('EMAIL_OUTBOX_RETRY_DELAY', default=60, cast=int)
+EMAIL_OUTBOX_CLAIM_TIMEOUT = config('EMAIL_OUTBOX_CLAIM_TIMEOUT', default=600, cast=int)
+EMAIL_OUTBOX_POLL_INTERVAL = config('EMAIL_OUTBOX_POLL_INTERVAL', default=5, cast=float)
+NOTIFICATION_COALESCE_WINDOW = config('NOTIFICATION_COALESCE_WINDOW', default=120, cast=int)
+NOTIFICATION_DIGEST_WINDOW = config('NOTIFICATION_DIGEST_WINDOW', default=86400, cast=int)
 
 
 SITE_URL = 'https://metrics.azlub.com'
@@ -233,5 +260,6 @@ X_FRAME_OPTIONS = 'DENY'
 
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_AGE = 3600  
+LOGIN_CREATE_SESSION = config('LOGIN_CREATE_SESSION', default=False, cast=bool)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
@@ -1,7 +1,10 @@
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from accounts.thumbnails import THUMBNAIL_DIR
+from accounts.views import profile_photo_thumbnail
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls')),
@@ -14,5 +17,11 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
+    urlpatterns += [
+        re_path(
+            rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}{re.escape(THUMBNAIL_DIR)}/(?P<path>.+)$",
+            profile_photo_thumbnail, name='profile-photo-thumbnail'
+        ),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0] if settings.STATICFILES_DIRS else settings.STATIC_ROOT)
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.hierarchy import resolve_evaluation_configs
+from kpis.models import KPIEvaluation, EvaluationWorkItem
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Tamamlanmış tapşırıqlar üçün qiymətləndirici marşrutunu, dəyərləndirmə vəziyyətini və növbəsini (EvaluationWorkItem) yenidən qurur'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        task_ids = list(Task.objects.filter(completed_at__isnull=False).order_by('id').values_list('id', flat=True))
+
+        routed = 0
+        created = 0
+        for start in range(0, len(task_ids), batch_size):
+            tasks = list(Task.objects.filter(id__in=task_ids[start:start + batch_size]))
+            with transaction.atomic():
+                routed += self.freeze_routing(tasks)
+                created += len(EvaluationWorkItem.rebuild_for_tasks(tasks))
+                KPIEvaluation.sync_task_state([task.id for task in tasks])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(task_ids)} tapşırıq yoxlanıldı: {routed} marşrut donduruldu, {created} dəyərləndirmə elementi yaradıldı."
+        ))
+
+    def freeze_routing(self, tasks):
+        unrouted = [task for task in tasks if task.evaluation_routed_at is None]
+        if not unrouted:
+            return 0
+
+        configs = resolve_evaluation_configs({task.assignee_id for task in unrouted})
+        now = timezone.now()
+        for task in unrouted:
+            task.apply_evaluation_routing(configs[task.assignee_id], now)
+
+        Task.objects.bulk_update(unrouted, Task.ROUTING_FIELDS)
+        return len(unrouted)
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 from tasks.models import Task
+from accounts.hierarchy import resolve_evaluation_configs
 
 class KPIEvaluation(models.Model):
     class EvaluationType(models.TextChoices):
@@ -71,10 +73,12 @@ class KPIEvaluation(models.Model):
 
     class Meta:
         unique_together = ("task", "evaluatee", "evaluation_type")
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),
+        ]
 
     def save(self, *args, **kwargs):
-        evaluatee = self.evaluatee
-        eval_config = evaluatee.get_evaluation_config_task()
+        eval_config = self.task.get_evaluation_config(self.evaluatee)
         
         if eval_config['is_dual_evaluation']:
             if self.evaluation_type == self.EvaluationType.TOP_MANAGEMENT_EVALUATION and self.top_management_score is not None:
@@ -85,11 +89,186 @@ class KPIEvaluation(models.Model):
             if self.evaluation_type == self.EvaluationType.SUPERIOR_EVALUATION and self.superior_score is not None:
                 self.final_score = self.superior_score
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
-        if self.evaluation_type == self.EvaluationType.TOP_MANAGEMENT_EVALUATION and eval_config['is_dual_evaluation']:
-            KPIEvaluation.objects.filter(
-                task=self.task,
-                evaluatee=self.evaluatee,
-                evaluation_type=self.EvaluationType.SUPERIOR_EVALUATION
-            ).update(final_score=None)
\ No newline at end of file
+            if self.evaluation_type == self.EvaluationType.TOP_MANAGEMENT_EVALUATION and eval_config['is_dual_evaluation']:
+                KPIEvaluation.objects.filter(
+                    task=self.task,
+                    evaluatee=self.evaluatee,
+                    evaluation_type=self.EvaluationType.SUPERIOR_EVALUATION
+                ).update(final_score=None)
+
+            EvaluationWorkItem.sync(self.task_id, self.evaluatee_id)
+            KPIEvaluation.sync_task_state([self.task_id])
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            EvaluationWorkItem.sync(self.task_id, self.evaluatee_id)
+            KPIEvaluation.sync_task_state([self.task_id])
+        return result
+
+    @classmethod
+    def sync_task_state(cls, task_ids):
+        states = {
+            task_id: {'has_self_eval': False, 'has_superior_eval': False, 'has_tm_eval': False, 'final_score': None}
+            for task_id in set(task_ids)
+        }
+        if not states:
+            return
+
+        superior_scores = {}
+        rows = cls.objects.filter(task_id__in=states.keys()).values_list('task_id', 'evaluation_type', 'final_score')
+        for task_id, evaluation_type, final_score in rows:
+            state = states[task_id]
+            if evaluation_type == cls.EvaluationType.SELF_EVALUATION:
+                state['has_self_eval'] = True
+            elif evaluation_type == cls.EvaluationType.SUPERIOR_EVALUATION:
+                state['has_superior_eval'] = True
+                superior_scores[task_id] = final_score
+            elif evaluation_type == cls.EvaluationType.TOP_MANAGEMENT_EVALUATION:
+                state['has_tm_eval'] = True
+                state['final_score'] = final_score
+
+        for task_id, state in states.items():
+            if state['final_score'] is None:
+                state['final_score'] = superior_scores.get(task_id)
+
+        Task.objects.bulk_update(
+            [Task(pk=task_id, **state) for task_id, state in states.items()],
+            ['has_self_eval', 'has_superior_eval', 'has_tm_eval', 'final_score'],
+            batch_size=500
+        )
+
+
+class EvaluationWorkItem(models.Model):
+    class State(models.TextChoices):
+        BLOCKED = 'BLOCKED', 'Əvvəlki mərhələni gözləyir'
+        PENDING = 'PENDING', 'Dəyərləndirmə gözləyir'
+        DONE = 'DONE', 'Tamamlanıb'
+
+    PREREQUISITES = {
+        KPIEvaluation.EvaluationType.SELF_EVALUATION: None,
+        KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION: KPIEvaluation.EvaluationType.SELF_EVALUATION,
+        KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION: KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION,
+    }
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="evaluation_work_items")
+    evaluatee = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="evaluation_work_items"
+    )
+    evaluator = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name="evaluation_inbox"
+    )
+    evaluation_type = models.CharField(max_length=20, choices=KPIEvaluation.EvaluationType.choices)
+    state = models.CharField(max_length=10, choices=State.choices, default=State.BLOCKED)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("task", "evaluatee", "evaluation_type")
+        indexes = [
+            models.Index(fields=["evaluator", "state", "evaluation_type"]),
+            models.Index(fields=["evaluatee", "evaluation_type", "state"]),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id} - {self.evaluation_type} ({self.state})"
+
+    @classmethod
+    def state_for(cls, evaluation_type, done_types):
+        if evaluation_type in done_types:
+            return cls.State.DONE
+        prerequisite = cls.PREREQUISITES[evaluation_type]
+        if prerequisite is None or prerequisite in done_types:
+            return cls.State.PENDING
+        return cls.State.BLOCKED
+
+    @classmethod
+    def rebuild_for_tasks(cls, tasks):
+        tasks = list(tasks)
+        cls.objects.filter(task_id__in=[task.id for task in tasks]).delete()
+
+        done_tasks = [task for task in tasks if task.status == 'DONE']
+        if not done_tasks:
+            return []
+
+        configs = resolve_evaluation_configs({
+            task.assignee_id for task in done_tasks if task.evaluation_routed_at is None
+        })
+
+        done_types = {}
+        existing = KPIEvaluation.objects.filter(
+            task_id__in=[task.id for task in done_tasks]
+        ).values_list('task_id', 'evaluatee_id', 'evaluation_type')
+        for task_id, evaluatee_id, evaluation_type in existing:
+            done_types.setdefault((task_id, evaluatee_id), set()).add(evaluation_type)
+
+        items = []
+        for task in done_tasks:
+            if task.evaluation_routed_at is not None:
+                routing = (task.requires_self_evaluation, task.superior_evaluator_id, task.tm_evaluator_id)
+            elif task.assignee_id in configs:
+                config = configs[task.assignee_id]
+                routing = (config['requires_self'], config['superior_evaluator_id'], config['tm_evaluator_id'])
+            else:
+                continue
+
+            requires_self, superior_evaluator_id, tm_evaluator_id = routing
+            if not requires_self:
+                continue
+
+            evaluators = {
+                KPIEvaluation.EvaluationType.SELF_EVALUATION: task.assignee_id,
+                KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION: superior_evaluator_id,
+            }
+            if tm_evaluator_id:
+                evaluators[KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION] = tm_evaluator_id
+
+            task_done_types = done_types.get((task.id, task.assignee_id), set())
+            for evaluation_type, evaluator_id in evaluators.items():
+                items.append(cls(
+                    task_id=task.id,
+                    evaluatee_id=task.assignee_id,
+                    evaluator_id=evaluator_id,
+                    evaluation_type=evaluation_type,
+                    state=cls.state_for(evaluation_type, task_done_types),
+                ))
+
+        return cls.objects.bulk_create(items, batch_size=1000)
+
+    @classmethod
+    def sync(cls, task_id, evaluatee_id):
+        cls.sync_many([(task_id, evaluatee_id)])
+
+    @classmethod
+    def sync_many(cls, pairs):
+        pairs = set(pairs)
+        task_ids = {task_id for task_id, _ in pairs}
+        items = [
+            item for item in cls.objects.filter(task_id__in=task_ids)
+            if (item.task_id, item.evaluatee_id) in pairs
+        ]
+        if not items:
+            return
+
+        done_types = {}
+        existing = KPIEvaluation.objects.filter(
+            task_id__in=task_ids
+        ).values_list('task_id', 'evaluatee_id', 'evaluation_type')
+        for task_id, evaluatee_id, evaluation_type in existing:
+            done_types.setdefault((task_id, evaluatee_id), set()).add(evaluation_type)
+
+        now = timezone.now()
+        changed = []
+        for item in items:
+            state = cls.state_for(item.evaluation_type, done_types.get((item.task_id, item.evaluatee_id), set()))
+            if item.state != state:
+                item.state = state
+                item.updated_at = now
+                changed.append(item)
+
+        if changed:
+            cls.objects.bulk_update(changed, ['state', 'updated_at'])
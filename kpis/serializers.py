@@ -23,10 +23,10 @@ class KPIEvaluationSerializer(serializers.ModelSerializer):
             'evaluatee_id', 'evaluatee', 'score', 'self_score', 
             'superior_score', 'top_management_score', 'final_score', 'comment', 
             'evaluation_type', 'created_at', 'updated_at',
-            'updated_by', 'history', 'attachment'
+            'updated_by', 'attachment'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'final_score',
-                            'updated_by', 'history'
+                            'updated_by'
                             ]
 
     def get_task(self, obj):
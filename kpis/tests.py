@@ -1,3 +1,368 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.hierarchy import OrgGraph
+from accounts.models import Department, User
+from tasks.models import Task
+from .models import EvaluationWorkItem, KPIEvaluation
+
+
+def make_user(username, **fields):
+    return User.objects.create(username=username, email=f"{username}@example.com", **fields)
+
+
+SCORE_FIELDS = {
+    KPIEvaluation.EvaluationType.SELF_EVALUATION: 'self_score',
+    KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION: 'superior_score',
+    KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION: 'top_management_score',
+}
+
+
+class KPITestCase(TestCase):
+    def setUp(self):
+        self.ceo = make_user('ceo', role='ceo')
+        self.department = Department.objects.create(name='Satış', ceo=self.ceo)
+        self.manager = make_user('manager', role='manager', department=self.department)
+        self.department.manager = self.manager
+        self.department.save()
+        self.top_manager = make_user('top-manager', role='top_management')
+        self.department.top_management.add(self.top_manager)
+        self.employee = make_user('employee', role='employee', department=self.department)
+        self.client = APIClient()
+
+    def complete_task(self, **fields):
+        fields.setdefault('title', 'Hesabat')
+        fields.setdefault('assignee', self.employee)
+        fields.setdefault('created_by', self.manager)
+        return Task.objects.create(status='DONE', **fields)
+
+    def evaluate(self, task, evaluation_type, evaluator, score):
+        return KPIEvaluation.objects.create(
+            task=task, evaluator=evaluator, evaluatee=task.assignee,
+            evaluation_type=evaluation_type, **{SCORE_FIELDS[evaluation_type]: score}
+        )
+
+    def get_task_ids(self, user, url):
+        self.client.force_authenticate(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        return [task['id'] for task in results]
+
+
+class EvaluationWorkItemTests(KPITestCase):
+    def states(self, task):
+        return dict(EvaluationWorkItem.objects.filter(task=task).values_list('evaluation_type', 'state'))
+
+    def test_steps_unblock_in_order(self):
+        Type, State = KPIEvaluation.EvaluationType, EvaluationWorkItem.State
+        task = self.complete_task()
+
+        self.assertEqual(
+            dict(EvaluationWorkItem.objects.filter(task=task).values_list('evaluation_type', 'evaluator_id')),
+            {Type.SELF_EVALUATION: self.employee.pk, Type.SUPERIOR_EVALUATION: self.manager.pk,
+             Type.TOP_MANAGEMENT_EVALUATION: self.top_manager.pk}
+        )
+        self.assertEqual(self.states(task), {
+            Type.SELF_EVALUATION: State.PENDING, Type.SUPERIOR_EVALUATION: State.BLOCKED,
+            Type.TOP_MANAGEMENT_EVALUATION: State.BLOCKED,
+        })
+        self.assertEqual(self.get_task_ids(self.employee, '/api/kpis/kpi/need-self-evaluation/'), [task.pk])
+        self.assertEqual(self.get_task_ids(self.manager, '/api/kpis/kpi/pending-for-me/'), [])
+
+        self_evaluation = self.evaluate(task, Type.SELF_EVALUATION, self.employee, 8)
+        self.assertEqual(self.states(task)[Type.SUPERIOR_EVALUATION], State.PENDING)
+        self.assertEqual(self.get_task_ids(self.manager, '/api/kpis/kpi/pending-for-me/'), [task.pk])
+        self.assertEqual(self.get_task_ids(self.top_manager, '/api/kpis/kpi/pending-for-me/'), [])
+
+        self.evaluate(task, Type.SUPERIOR_EVALUATION, self.manager, 70)
+        self.assertEqual(self.states(task)[Type.SUPERIOR_EVALUATION], State.DONE)
+        self.assertEqual(self.states(task)[Type.TOP_MANAGEMENT_EVALUATION], State.PENDING)
+        self.assertEqual(self.get_task_ids(self.manager, '/api/kpis/kpi/pending-for-me/'), [])
+        self.assertEqual(self.get_task_ids(self.top_manager, '/api/kpis/kpi/pending-for-me/'), [task.pk])
+
+        self.evaluate(task, Type.TOP_MANAGEMENT_EVALUATION, self.top_manager, 90)
+        self.assertEqual(set(self.states(task).values()), {State.DONE})
+
+        self_evaluation.delete()
+        self.assertEqual(self.states(task)[Type.SELF_EVALUATION], State.PENDING)
+
+    def test_reopened_task_drops_its_work_items(self):
+        task = self.complete_task()
+        self.assertTrue(EvaluationWorkItem.objects.filter(task=task).exists())
+
+        task.status = 'IN_PROGRESS'
+        task.save()
+        self.assertFalse(EvaluationWorkItem.objects.filter(task=task).exists())
+
+    def test_rebuild_command_backfills_items(self):
+        task = self.complete_task()
+        self.evaluate(task, KPIEvaluation.EvaluationType.SELF_EVALUATION, self.employee, 8)
+        expected = self.states(task)
+        EvaluationWorkItem.objects.all().delete()
+
+        call_command('rebuild_evaluation_state', stdout=io.StringIO())
+
+        self.assertEqual(self.states(task), expected)
+
+
+class FrozenRoutingTests(KPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = self.complete_task()
+        self.evaluate(self.task, KPIEvaluation.EvaluationType.SELF_EVALUATION, self.employee, 8)
+
+        self.new_manager = make_user('new-manager', role='manager', department=self.department)
+        self.department.manager = self.new_manager
+        self.department.save()
+
+    def post_superior_score(self, evaluator):
+        self.client.force_authenticate(evaluator)
+        return self.client.post(
+            '/api/kpis/kpi/', {'task_id': self.task.pk, 'evaluatee_id': self.employee.pk, 'score': 70}, format='json'
+        )
+
+    def test_routing_survives_a_reorg(self):
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.superior_evaluator_id, self.manager.pk)
+        self.assertEqual(self.task.get_evaluation_config()['superior_evaluator_id'], self.manager.pk)
+        self.assertEqual(self.employee.get_evaluation_config_task()['superior_evaluator_id'], self.new_manager.pk)
+
+        self.assertEqual(self.post_superior_score(self.new_manager).status_code, 403)
+        self.assertEqual(self.post_superior_score(self.manager).status_code, 201)
+        self.assertEqual(
+            KPIEvaluation.objects.get(evaluation_type=KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION).evaluator,
+            self.manager
+        )
+
+    def test_routed_evaluator_missing_from_the_snapshot_keeps_its_id(self):
+        with mock.patch.object(OrgGraph, 'get', return_value=None):
+            config = self.task.get_evaluation_config()
+        self.assertEqual(config['superior_evaluator_id'], self.manager.pk)
+        self.assertEqual(config['superior_evaluator'], self.manager)
+
+    def test_reassigning_a_completed_task_reroutes_it(self):
+        finance = Department.objects.create(name='Maliyyə')
+        finance_manager = make_user('finance-manager', role='manager', department=finance)
+        finance.manager = finance_manager
+        finance.save()
+        colleague = make_user('colleague', role='employee', department=finance)
+
+        self.task.assignee = colleague
+        self.task.save()
+
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.superior_evaluator_id, finance_manager.pk)
+        self.assertIsNone(self.task.tm_evaluator_id)
+
+
+class EvaluationStateTests(KPITestCase):
+    def state(self, task):
+        return Task.objects.filter(pk=task.pk).values(
+            'has_self_eval', 'has_superior_eval', 'has_tm_eval', 'final_score'
+        ).get()
+
+    def test_task_columns_follow_evaluation_writes(self):
+        Type = KPIEvaluation.EvaluationType
+        task = self.complete_task()
+        self.assertEqual(self.state(task), {
+            'has_self_eval': False, 'has_superior_eval': False, 'has_tm_eval': False, 'final_score': None
+        })
+        self.assertEqual(self.get_task_ids(self.manager, '/api/kpis/kpi/subordinates-need-evaluation/'), [task.pk])
+
+        self.evaluate(task, Type.SELF_EVALUATION, self.employee, 8)
+        superior = self.evaluate(task, Type.SUPERIOR_EVALUATION, self.manager, 70)
+        self.assertEqual(self.state(task), {
+            'has_self_eval': True, 'has_superior_eval': True, 'has_tm_eval': False, 'final_score': None
+        })
+        self.assertEqual(self.get_task_ids(self.manager, '/api/kpis/kpi/subordinates-need-evaluation/'), [])
+        self.assertEqual(self.get_task_ids(make_user('admin', role='admin'), '/api/kpis/kpi/completed-evaluations/'), [task.pk])
+
+        tm_evaluation = self.evaluate(task, Type.TOP_MANAGEMENT_EVALUATION, self.top_manager, 90)
+        self.assertEqual(self.state(task), {
+            'has_self_eval': True, 'has_superior_eval': True, 'has_tm_eval': True, 'final_score': 90
+        })
+
+        tm_evaluation.delete()
+        superior.delete()
+        self.assertEqual(self.state(task), {
+            'has_self_eval': True, 'has_superior_eval': False, 'has_tm_eval': False, 'final_score': None
+        })
+
+    def test_single_evaluation_uses_the_superior_score(self):
+        self.department.top_management.clear()
+        task = self.complete_task()
+        self.evaluate(task, KPIEvaluation.EvaluationType.SELF_EVALUATION, self.employee, 8)
+        self.evaluate(task, KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION, self.manager, 70)
+        self.assertEqual(self.state(task)['final_score'], 70)
+
+    def test_rebuild_command_backfills_the_columns(self):
+        task = self.complete_task()
+        self.evaluate(task, KPIEvaluation.EvaluationType.SELF_EVALUATION, self.employee, 8)
+        expected = self.state(task)
+        Task.objects.filter(pk=task.pk).update(has_self_eval=False)
+
+        call_command('rebuild_evaluation_state', stdout=io.StringIO())
+
+        self.assertEqual(self.state(task), expected)
+
+
+class BulkEvaluationTests(KPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = [self.complete_task(title=f"Hesabat {i}") for i in range(3)]
+        for task in self.tasks[:2]:
+            self.evaluate(task, KPIEvaluation.EvaluationType.SELF_EVALUATION, self.employee, 8)
+        self.client.force_authenticate(self.manager)
+
+    def post(self, entries):
+        return self.client.post('/api/kpis/kpi/bulk/', {'evaluations': entries}, format='json')
+
+    def entry(self, task, score=70):
+        return {'task_id': task.pk, 'evaluatee_id': self.employee.pk, 'score': score}
+
+    def test_batch_is_written_with_work_items_and_task_state(self):
+        response = self.post([self.entry(task) for task in self.tasks[:2]])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 2)
+
+        superior = KPIEvaluation.objects.filter(evaluation_type=KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION)
+        self.assertEqual({evaluation.task_id for evaluation in superior}, {task.pk for task in self.tasks[:2]})
+        self.assertEqual({evaluation.evaluator_id for evaluation in superior}, {self.manager.pk})
+        self.assertEqual({evaluation.final_score for evaluation in superior}, {None})
+        self.assertEqual(
+            set(Task.objects.filter(pk__in=[task.pk for task in self.tasks[:2]]).values_list('has_superior_eval', flat=True)),
+            {True}
+        )
+        self.assertEqual(
+            set(EvaluationWorkItem.objects.filter(
+                task__in=self.tasks[:2], evaluation_type=KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION
+            ).values_list('state', flat=True)),
+            {EvaluationWorkItem.State.PENDING}
+        )
+        self.assertEqual(self.get_task_ids(self.top_manager, '/api/kpis/kpi/pending-for-me/'), [
+            task.pk for task in sorted(self.tasks[:2], key=lambda task: task.pk, reverse=True)
+        ])
+
+    def test_any_invalid_entry_rejects_the_whole_batch(self):
+        response = self.post([
+            self.entry(self.tasks[0]),
+            self.entry(self.tasks[1], score=0),
+            self.entry(self.tasks[1], score=-5),
+            self.entry(self.tasks[2]),
+            self.entry(self.tasks[0]),
+            {'task_id': 0, 'evaluatee_id': self.employee.pk, 'score': 70},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            {error['index']: error['error'] for error in response.data['errors']},
+            {
+                1: 'Skor tələb olunur.',
+                2: 'Düzgün bir rəqəm daxil edin.',
+                3: 'Əvvəlcə işçinin öz dəyərləndirməsi tamamlanmalıdır.',
+                4: "Bu tapşırıq üçün artıq SUPERIOR qiymətləndirməsi edilib.",
+                5: 'Belirtilen görev bulunamadı.',
+            }
+        )
+        self.assertFalse(KPIEvaluation.objects.exclude(evaluation_type=KPIEvaluation.EvaluationType.SELF_EVALUATION).exists())
+
+    def test_routing_and_step_order_are_enforced(self):
+        self.client.force_authenticate(self.top_manager)
+        response = self.post([self.entry(self.tasks[0])])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['error'], 'Top Management qiymətləndirməsi üçün SUPERIOR dəyərləndirməsi tamamlanmalıdır.')
+
+        self.client.force_authenticate(make_user('outsider', role='manager'))
+        response = self.post([self.entry(self.tasks[0])])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['error'], 'Bu işçini qiymətləndirməyə icazəniz yoxdur.')
+
+
+class ScoreRevisionTests(KPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = self.complete_task()
+        self.evaluate(self.task, KPIEvaluation.EvaluationType.SELF_EVALUATION, self.employee, 8)
+        self.evaluation = self.evaluate(self.task, KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION, self.manager, 70)
+        self.client.force_authenticate(self.manager)
+
+    def patch(self, data):
+        response = self.client.patch(f'/api/kpis/kpi/{self.evaluation.pk}/', data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_score_edits_are_appended_as_revisions(self):
+        self.patch({'score': 75})
+        self.patch({'comment': 'Yaxşı iş'})
+        self.patch({'score': 80})
+
+        response = self.client.get(f'/api/kpis/kpi/{self.evaluation.pk}/history/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(revision['previous_score'], revision['new_score'], revision['updated_by_id']) for revision in response.data['results']],
+            [(75, 80, self.manager.pk), (70, 75, self.manager.pk)]
+        )
+
+        self.evaluation.refresh_from_db()
+        self.assertEqual(self.evaluation.history, [])
+        self.assertEqual(self.evaluation.previous_score, 75)
+
+    def test_legacy_history_is_moved_once(self):
+        KPIEvaluation.objects.filter(pk=self.evaluation.pk).update(history=[
+            {'timestamp': '2025-01-10T09:00:00+00:00', 'updated_by_id': self.manager.pk,
+             'updated_by_name': 'Rəhbər', 'previous_score': 50, 'new_score': 60},
+            {'timestamp': 'yanlış', 'updated_by_id': 999999, 'updated_by_name': 'Silinmiş', 'previous_score': 60, 'new_score': 70},
+        ])
+
+        call_command('migrate_score_history', stdout=io.StringIO())
+        call_command('migrate_score_history', stdout=io.StringIO())
+
+        self.assertEqual(
+            sorted(self.evaluation.revisions.values_list('previous_score', 'new_score', 'actor_id', 'actor_name')),
+            [(50, 60, self.manager.pk, 'Rəhbər'), (60, 70, None, 'Silinmiş')]
+        )
+        self.evaluation.refresh_from_db()
+        self.assertEqual(self.evaluation.history, [])
+
+
+class KPITaskCursorTests(TestCase):
+    def setUp(self):
+        self.ceo = make_user('ceo', role='ceo')
+        self.employee = make_user('employee', role='employee')
+        self.client = APIClient()
+        self.client.force_authenticate(self.ceo)
+
+        now = timezone.now()
+        completed = [now - timedelta(days=3), now - timedelta(days=1), now - timedelta(days=1), None, now - timedelta(days=2), None]
+        for i, completed_at in enumerate(completed):
+            task = Task.objects.create(title=f"Tapşırıq {i}", assignee=self.employee, created_by=self.ceo, status='DONE')
+            Task.objects.filter(pk=task.pk).update(completed_at=completed_at, created_at=now - timedelta(days=i))
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(task['id'] for task in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_cursor_pages_follow_the_completed_at_ordering(self):
+        tasks = list(Task.objects.all())
+        expected = [task.pk for task in sorted(tasks, key=lambda task: task.pk, reverse=True) if task.completed_at is None]
+        expected += [
+            task.pk for task in sorted(
+                (task for task in tasks if task.completed_at is not None),
+                key=lambda task: (task.completed_at, task.pk), reverse=True
+            )
+        ]
 
-# Create your tests here.
+        self.assertEqual(self.walk('/api/kpis/kpi/dashboard-tasks/?cursor=&page_size=2'), expected)
+        self.assertEqual(self.walk('/api/kpis/kpi/dashboard-tasks/?cursor=&page_size=1'), expected)
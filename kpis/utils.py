@@ -1,14 +1,15 @@
 import logging
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from .models import KPIEvaluation
+from notifications.models import NotificationEvent
+from notifications.utils import record_notification_events
 
 logger = logging.getLogger(__name__)
 
-def send_kpi_evaluation_request_email(kpi_evaluation):
+def kpi_evaluation_request_recipient(kpi_evaluation):
     evaluatee = kpi_evaluation.evaluatee
-    task = kpi_evaluation.task
     
     recipient = None
     email_type = ""
@@ -30,11 +31,23 @@ def send_kpi_evaluation_request_email(kpi_evaluation):
         logger.warning(
             f"ID {evaluatee.id} olan istifadəçinin növbəti rəhbəri tapılmadı (Type: {kpi_evaluation.evaluation_type}). KPI e-poçtu göndərilmədi."
         )
-        return
+        return None, email_type
+
+    return recipient, email_type
+
+
+def build_kpi_evaluation_request_email(kpi_evaluation, recipient=None, email_type=None):
+    evaluatee = kpi_evaluation.evaluatee
+    task = kpi_evaluation.task
+
+    if recipient is None:
+        recipient, email_type = kpi_evaluation_request_recipient(kpi_evaluation)
+        if recipient is None:
+            return None
 
     if not recipient.email:
         logger.warning(f"Rəhbərin (ID: {recipient.id}) e-poçt ünvanı yoxdur. E-poçt göndərilmədi.")
-        return
+        return None
 
     site_url = getattr(settings, "FRONTEND_URL", "https://metrics.azlub.com/kpi_system") 
     evaluation_url = f"{site_url}/"
@@ -79,18 +92,48 @@ def send_kpi_evaluation_request_email(kpi_evaluation):
               context['superior_score'] = superior_eval.superior_score
               context['superior_comment'] = superior_eval.comment
 
-    try:
-        html_message = render_to_string(template_name, context)
-        plain_message = f"Salam, {recipient.username}. Zəhmət olmasa '{evaluatee.get_full_name()}' adlı işçinin '{task.title}' tapşırığı üçün KPI dəyərləndirməsini tamamlayın."
-
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[recipient.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        logger.info(f"KPI dəyərləndirmə e-poçtu uğurla {recipient.email} ünvanına göndərildi (Type: {email_type}).")
-    except Exception as e:
-        logger.error(f"KPI e-poçtu göndərilərkən xəta baş verdi (Alıcı: {recipient.email}): {str(e)}", exc_info=True)
\ No newline at end of file
+    html_message = render_to_string(template_name, context)
+    plain_message = f"Salam, {recipient.username}. Zəhmət olmasa '{evaluatee.get_full_name()}' adlı işçinin '{task.title}' tapşırığı üçün KPI dəyərləndirməsini tamamlayın."
+
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=plain_message,
+        from_email=settings.EMAIL_HOST_USER,
+        to=[recipient.email],
+    )
+    message.attach_alternative(html_message, "text/html")
+    return message
+
+
+def render_kpi_evaluation_request_event(event):
+    kpi_evaluation = KPIEvaluation.objects.select_related(
+        'task', 'evaluatee__department'
+    ).filter(pk=event.object_id).first()
+    if kpi_evaluation is None:
+        return None
+    email_type = "superior" if kpi_evaluation.evaluation_type == KPIEvaluation.EvaluationType.SELF_EVALUATION else "top_management"
+    return build_kpi_evaluation_request_email(kpi_evaluation, event.recipient, email_type)
+
+
+def queue_kpi_evaluation_request_email(kpi_evaluation):
+    return queue_kpi_evaluation_request_emails([kpi_evaluation])
+
+
+def queue_kpi_evaluation_request_emails(kpi_evaluations):
+    events = []
+    for kpi_evaluation in kpi_evaluations:
+        try:
+            recipient, _ = kpi_evaluation_request_recipient(kpi_evaluation)
+        except Exception as e:
+            logger.error(f"KPI bildirişi hazırlanarkən xəta baş verdi (Evaluation ID: {kpi_evaluation.id}): {str(e)}", exc_info=True)
+            continue
+        if recipient:
+            events.append(NotificationEvent(
+                recipient=recipient,
+                event_type=NotificationEvent.EventType.KPI_EVALUATION_REQUEST,
+                task=kpi_evaluation.task,
+                object_id=kpi_evaluation.id,
+                summary=f"{kpi_evaluation.evaluatee.get_full_name()} - {kpi_evaluation.task.title}"[:500],
+            ))
+
+    return len(record_notification_events(events))
@@ -2,25 +2,55 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied, ValidationError
-from django.db.models import Q, Exists, OuterRef
-from .models import KPIEvaluation
+from django.db import transaction
+from django.db.models import Q
+from .models import KPIEvaluation, EvaluationWorkItem
 from .serializers import KPIEvaluationSerializer
-from .utils import send_kpi_evaluation_request_email
-from accounts.models import User
+from .utils import queue_kpi_evaluation_request_email, queue_kpi_evaluation_request_emails
+from accounts.models import User, OrgClosure, UserVisibility
+from accounts.hierarchy import resolve_evaluation_configs
 from tasks.models import Task
 from tasks.serializers import TaskSerializer
-from datetime import datetime
 import logging
 
-from reports.utils import create_log_entry
+from reports.utils import create_log_entry, create_log_entries, build_log_entry, create_score_revision
 from reports.models import ActivityLog
+from reports.pagination import KeysetPagination, StandardResultsSetPagination
+from reports.exports import ExportMixin
+from reports.serializers import ScoreRevisionSerializer
 
 logger = logging.getLogger(__name__)
 
-class KPIEvaluationViewSet(viewsets.ModelViewSet):
+class KPIEvaluationViewSet(ExportMixin, viewsets.ModelViewSet):
     queryset = KPIEvaluation.objects.all()
     serializer_class = KPIEvaluationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    task_ordering = ('-completed_at', '-id')
+    export_name = 'kpi-evaluations'
+    export_fields = (
+        ('id', 'id'),
+        ('task_id', 'task_id'),
+        ('task_title', 'task__title'),
+        ('evaluation_type', 'evaluation_type'),
+        ('evaluator_id', 'evaluator_id'),
+        ('evaluatee_id', 'evaluatee_id'),
+        ('evaluatee_first_name', 'evaluatee__first_name'),
+        ('evaluatee_last_name', 'evaluatee__last_name'),
+        ('self_score', 'self_score'),
+        ('superior_score', 'superior_score'),
+        ('top_management_score', 'top_management_score'),
+        ('final_score', 'final_score'),
+        ('comment', 'comment'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    )
+
+    @property
+    def cursor_ordering(self):
+        if self.action == 'list':
+            return KeysetPagination.ordering
+        return self.task_ordering
 
     def get_queryset(self):
         user = self.request.user
@@ -33,27 +63,27 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
         if user.is_staff or user.role in ['admin', 'ceo']: 
             return self.queryset.select_related('task', 'evaluator', 'evaluatee')
 
-        subordinate_ids = user.get_subordinates().values_list('id', flat=True)
-        q_objects = Q(evaluatee=user) | Q(evaluator=user) | Q(evaluatee_id__in=subordinate_ids)
+        visible_user_ids = UserVisibility.objects.filter(viewer=user).values('visible_user_id')
+        q_objects = Q(evaluator=user) | Q(evaluatee_id__in=visible_user_ids)
 
-        return self.queryset.filter(q_objects).distinct().select_related('task', 'evaluator', 'evaluatee')
+        return self.queryset.filter(q_objects).select_related('task', 'evaluator', 'evaluatee')
 
-    def can_evaluate_user(self, evaluator, evaluatee, evaluation_type):
+    def can_evaluate_user(self, evaluator, evaluatee, evaluation_type, task):
         if evaluator == evaluatee:
             return True 
             
         if evaluator.role == 'admin':
             return True
         
-        eval_config = evaluatee.get_evaluation_config_task()
+        eval_config = task.get_evaluation_config(evaluatee)
         
         if evaluation_type == KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION:
-            return eval_config['superior_evaluator'] and eval_config['superior_evaluator'].id == evaluator.id
+            return eval_config['superior_evaluator_id'] == evaluator.id
         
         elif evaluation_type == KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION:
             if not eval_config['is_dual_evaluation']:
                 return False
-            return eval_config['tm_evaluator'] and eval_config['tm_evaluator'].id == evaluator.id
+            return eval_config['tm_evaluator_id'] == evaluator.id
             
         return False
 
@@ -64,12 +94,9 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
         if viewer == evaluatee or viewer.role in ['admin', 'ceo']: 
             return True
 
-        all_superiors = evaluatee.get_all_superiors()
-        if viewer in all_superiors:
-            return True
-
-        return False
+        return viewer.is_superior_of(evaluatee)
 
+    @transaction.atomic
     def perform_create(self, serializer):
         evaluator = self.request.user
 
@@ -79,7 +106,7 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
         evaluatee = serializer.validated_data["evaluatee"]
         task = serializer.validated_data["task"]
         
-        eval_config = evaluatee.get_evaluation_config_task()
+        eval_config = task.get_evaluation_config(evaluatee)
         
         if evaluator == evaluatee:
             if not eval_config['requires_self']:
@@ -101,7 +128,7 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
             
             try:
                 logger.info(f"Növbəti qiymətləndiriciyə KPI sorğusu göndərilir: {instance.evaluatee.get_full_name()}")
-                send_kpi_evaluation_request_email(instance)
+                queue_kpi_evaluation_request_email(instance)
             except Exception as e:
                 logger.error(f"KPI e-poçtu göndərilərkən xəta: {e}", exc_info=True)
         
@@ -109,17 +136,17 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
             if evaluator.role == 'admin':
                 evaluation_type = serializer.validated_data.get('evaluation_type')
             else:
-                if eval_config['superior_evaluator'] and eval_config['superior_evaluator'].id == evaluator.id:
+                if eval_config['superior_evaluator_id'] == evaluator.id:
                     evaluation_type = KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION
                     logger.info(f"Təyin edilmiş evaluation_type: SUPERIOR_EVALUATION")
-                elif eval_config['is_dual_evaluation'] and eval_config['tm_evaluator'] and eval_config['tm_evaluator'].id == evaluator.id:
+                elif eval_config['is_dual_evaluation'] and eval_config['tm_evaluator_id'] == evaluator.id:
                     evaluation_type = KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION
                     logger.info(f"Təyin edilmiş evaluation_type: TOP_MANAGEMENT_EVALUATION")
                 else:
                     logger.error(f"Evaluator bu işçini qiymətləndirə bilməz!")
                     raise PermissionDenied("Bu işçini qiymətləndirməyə icazəniz yoxdur.")
 
-            if not self.can_evaluate_user(evaluator, evaluatee, evaluation_type):
+            if not self.can_evaluate_user(evaluator, evaluatee, evaluation_type, task):
                 raise PermissionDenied("Bu istifadəçini bu tip qiymətləndirmə ilə qiymətləndirməyə icazəniz yoxdur.")
             
             if not KPIEvaluation.objects.filter(
@@ -150,7 +177,7 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
             if instance.evaluation_type == KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION and eval_config['is_dual_evaluation']:
                 try:
                     logger.info(f"Top Management-ə KPI sorğusu göndərilir: {instance.evaluatee.get_full_name()}")
-                    send_kpi_evaluation_request_email(instance) 
+                    queue_kpi_evaluation_request_email(instance) 
                 except Exception as e:
                     logger.error(f"TM e-poçtu göndərilərkən xəta: {e}", exc_info=True)
 
@@ -168,6 +195,166 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
                 }
             )
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create_evaluations(self, request):
+        evaluator = request.user
+
+        if evaluator.factory_role == "top_management":
+            raise PermissionDenied("Zavod direktorları ofis KPI dəyərləndirməsi yarada bilməz.")
+
+        entries = request.data.get('evaluations') if isinstance(request.data, dict) else request.data
+        if not isinstance(entries, list) or not entries:
+            raise ValidationError({'evaluations': 'Dəyərləndirmə siyahısı tələb olunur.'})
+
+        def to_int(value):
+            try:
+                return int(value)
+            except (ValueError, TypeError):
+                return None
+
+        task_ids = set()
+        evaluatee_ids = set()
+        for entry in entries:
+            if isinstance(entry, dict):
+                task_ids.add(to_int(entry.get('task_id')))
+                evaluatee_ids.add(to_int(entry.get('evaluatee_id')))
+
+        tasks = Task.objects.in_bulk(task_ids - {None})
+        evaluatees = User.objects.in_bulk(evaluatee_ids - {None})
+
+        existing = set(KPIEvaluation.objects.filter(
+            task_id__in=tasks.keys()
+        ).values_list('task_id', 'evaluatee_id', 'evaluation_type'))
+
+        is_admin = evaluator.role == 'admin'
+        errors = []
+        evaluations = []
+        seen = set()
+        dual_keys = set()
+
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                errors.append({'index': index, 'error': 'Yanlış format.'})
+                continue
+
+            task = tasks.get(to_int(entry.get('task_id')))
+            evaluatee = evaluatees.get(to_int(entry.get('evaluatee_id')))
+            if task is None:
+                errors.append({'index': index, 'error': 'Belirtilen görev bulunamadı.'})
+                continue
+            if evaluatee is None:
+                errors.append({'index': index, 'error': 'Belirtilen kullanıcı bulunamadı.'})
+                continue
+            if evaluatee.pk == evaluator.pk:
+                errors.append({'index': index, 'error': 'Öz dəyərləndirmə toplu şəkildə edilə bilməz.'})
+                continue
+
+            score = to_int(entry.get('score'))
+            if score is None or score < 0:
+                errors.append({'index': index, 'error': 'Düzgün bir rəqəm daxil edin.'})
+                continue
+            if score == 0:
+                errors.append({'index': index, 'error': 'Skor tələb olunur.'})
+                continue
+
+            eval_config = task.get_evaluation_config(evaluatee)
+
+            if is_admin:
+                evaluation_type = entry.get('evaluation_type')
+                if evaluation_type not in [
+                    KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION,
+                    KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION
+                ]:
+                    errors.append({'index': index, 'error': 'Düzgün evaluation_type daxil edin.'})
+                    continue
+            elif eval_config['superior_evaluator_id'] == evaluator.id:
+                evaluation_type = KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION
+            elif eval_config['is_dual_evaluation'] and eval_config['tm_evaluator_id'] == evaluator.id:
+                evaluation_type = KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION
+            else:
+                errors.append({'index': index, 'error': 'Bu işçini qiymətləndirməyə icazəniz yoxdur.'})
+                continue
+
+            key = (task.id, evaluatee.id, evaluation_type)
+            if key in existing or key in seen:
+                errors.append({'index': index, 'error': f"Bu tapşırıq üçün artıq {evaluation_type} qiymətləndirməsi edilib."})
+                continue
+
+            if not is_admin:
+                if (task.id, evaluatee.id, KPIEvaluation.EvaluationType.SELF_EVALUATION) not in existing:
+                    errors.append({'index': index, 'error': 'Əvvəlcə işçinin öz dəyərləndirməsi tamamlanmalıdır.'})
+                    continue
+                if (
+                    evaluation_type == KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION and
+                    (task.id, evaluatee.id, KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION) not in existing
+                ):
+                    errors.append({'index': index, 'error': 'Top Management qiymətləndirməsi üçün SUPERIOR dəyərləndirməsi tamamlanmalıdır.'})
+                    continue
+
+            seen.add(key)
+
+            evaluation = KPIEvaluation(
+                task=task,
+                evaluator=evaluator,
+                evaluatee=evaluatee,
+                evaluation_type=evaluation_type,
+                comment=(entry.get('comment') or '').strip() or None,
+            )
+            if evaluation_type == KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION:
+                evaluation.superior_score = score
+                evaluation.final_score = None if eval_config['is_dual_evaluation'] else score
+            else:
+                evaluation.top_management_score = score
+                evaluation.final_score = score if eval_config['is_dual_evaluation'] else None
+            evaluations.append(evaluation)
+            if eval_config['is_dual_evaluation']:
+                dual_keys.add((task.id, evaluatee.id))
+
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            KPIEvaluation.objects.bulk_create(evaluations)
+
+            dual_tm_q = Q()
+            for evaluation in evaluations:
+                key = (evaluation.task_id, evaluation.evaluatee_id)
+                if evaluation.evaluation_type == KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION and key in dual_keys:
+                    dual_tm_q |= Q(task_id=evaluation.task_id, evaluatee_id=evaluation.evaluatee_id)
+            if dual_tm_q:
+                KPIEvaluation.objects.filter(
+                    dual_tm_q,
+                    evaluation_type=KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION
+                ).update(final_score=None)
+
+            EvaluationWorkItem.sync_many((e.task_id, e.evaluatee_id) for e in evaluations)
+            KPIEvaluation.sync_task_state(e.task_id for e in evaluations)
+
+            create_log_entries([
+                build_log_entry(
+                    actor=evaluator,
+                    action_type=ActivityLog.ActionTypes.KPI_TASK_EVALUATED,
+                    target_user=evaluation.evaluatee,
+                    target_task=evaluation.task,
+                    details={
+                        'task_title': evaluation.task.title,
+                        'score': evaluation.superior_score or evaluation.top_management_score,
+                        'evaluation_type': evaluation.get_evaluation_type_display()
+                    }
+                )
+                for evaluation in evaluations
+            ])
+
+            notify = [
+                evaluation for evaluation in evaluations
+                if evaluation.evaluation_type == KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION and
+                (evaluation.task_id, evaluation.evaluatee_id) in dual_keys
+            ]
+            queue_kpi_evaluation_request_emails(notify)
+
+        serializer = KPIEvaluationSerializer(evaluations, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action(detail=False, methods=['get'])
     def my_evaluations(self, request):
         user = request.user
@@ -203,13 +390,9 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
         if user.role not in ['admin', 'ceo', 'top_management'] and user.factory_role != "top_management":
              tasks_to_show_q &= ~Q(assignee__role='top_management')
 
-        queryset = Task.objects.filter(
+        queryset = TaskSerializer.setup_eager_loading(Task.objects.filter(
             tasks_to_show_q, status='DONE'
-        ).select_related(
-            'assignee', 'created_by'
-        ).prefetch_related(
-            'evaluations'
-        ).distinct().order_by('-completed_at', '-created_at')
+        )).order_by(*self.task_ordering)
         
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -226,86 +409,43 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
 
         if user.factory_role == "top_management":
             return Response([])
-        
-        all_active_users = User.objects.filter(is_active=True).exclude(pk=user.pk)
-        
-        users_to_evaluate_map = {}
-        
-        for sub in all_active_users:
-            if sub.role in ['admin', 'ceo']:
-                continue
-            
-            eval_config = sub.get_evaluation_config_task()
-            
-            if eval_config['superior_evaluator'] and eval_config['superior_evaluator'].id == user.id:
-                users_to_evaluate_map.setdefault(sub.id, []).append(KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION)
-            
-            if eval_config['tm_evaluator'] and eval_config['tm_evaluator'].id == user.id:
-                users_to_evaluate_map.setdefault(sub.id, []).append(KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION)
+
+        items = EvaluationWorkItem.objects.filter(
+            evaluatee__is_active=True,
+            evaluation_type__in=[
+                KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION,
+                KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION,
+            ]
+        ).exclude(evaluatee=user)
 
         if user.role == 'admin':
-            all_ids = all_active_users.exclude(role__in=['admin', 'ceo']).values_list('id', flat=True)
-            for uid in all_ids:
-                users_to_evaluate_map.setdefault(uid, []).extend([
-                    KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION, 
-                    KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION
-                ])
+            items = items.filter(
+                Q(state=EvaluationWorkItem.State.PENDING) |
+                Q(state=EvaluationWorkItem.State.BLOCKED, evaluation_type=KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION)
+            )
         elif user.role == 'ceo':
-            tm_ids = User.objects.filter(role='top_management', is_active=True).values_list('id', flat=True)
-            for uid in tm_ids:
-                users_to_evaluate_map.setdefault(uid, []).append(KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION)
+            items = items.filter(
+                Q(evaluator=user) |
+                Q(evaluatee__role='top_management', evaluation_type=KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION),
+                state=EvaluationWorkItem.State.PENDING
+            )
+        else:
+            items = items.filter(evaluator=user, state=EvaluationWorkItem.State.PENDING)
 
-        evaluable_ids = users_to_evaluate_map.keys()
+        tasks = Task.objects.filter(
+            id__in=items.values('task_id')
+        ).order_by(*self.task_ordering)
 
-        if not evaluable_ids:
-            return Response([])
-        
-        pending_tasks = Task.objects.filter(status='DONE', assignee_id__in=evaluable_ids)
-        
-        final_pending_tasks = []
-        for task in pending_tasks:
-            evaluatee_id = task.assignee_id
-            eval_types_to_do = users_to_evaluate_map.get(evaluatee_id, [])
-            
-            has_self_eval = KPIEvaluation.objects.filter(
-                task=task,
-                evaluatee_id=evaluatee_id,
-                evaluation_type=KPIEvaluation.EvaluationType.SELF_EVALUATION
-            ).exists()
-            
-            if not has_self_eval and evaluatee_id != user.id and user.role != 'admin': 
-                 continue
-
-            is_pending = False
-            for eval_type in eval_types_to_do:
-                
-                if eval_type == KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION:
-                    if not KPIEvaluation.objects.filter(
-                        task=task,
-                        evaluator=user,
-                        evaluation_type=KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION
-                    ).exists():
-                        is_pending = True
-                        break
-                
-                elif eval_type == KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION:
-                    superior_exists = KPIEvaluation.objects.filter(
-                        task=task,
-                        evaluation_type=KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION
-                    ).exists()
-                    
-                    if superior_exists and not KPIEvaluation.objects.filter(
-                        task=task,
-                        evaluator=user,
-                        evaluation_type=KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION
-                    ).exists():
-                        is_pending = True 
-                        break
-                    
-            if is_pending:
-                final_pending_tasks.append(task)
-                
-        serializer = TaskSerializer(final_pending_tasks, many=True, context={'request': request})
+        return self.task_list_response(tasks)
+
+    def task_list_response(self, queryset):
+        queryset = TaskSerializer.setup_eager_loading(queryset)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = TaskSerializer(page, many=True, context={'request': self.request})
+            return self.get_paginated_response(serializer.data)
+
+        serializer = TaskSerializer(queryset, many=True, context={'request': self.request})
         return Response(serializer.data)
      
     @action(detail=False, methods=['get'])
@@ -315,12 +455,18 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
             return Response({'error': 'task_id parametri tələb olunur'}, 
                             status=status.HTTP_400_BAD_REQUEST)
         
-        evaluations = self.get_queryset().filter(task_id=task_id)
-        
-        filtered_evaluations = []
-        for evaluation in evaluations:
-            if self.can_view_evaluation_results(self.request.user, evaluation.evaluatee):
-                filtered_evaluations.append(evaluation)
+        viewer = self.request.user
+        evaluations = list(self.get_queryset().filter(task_id=task_id))
+
+        if viewer.factory_role == "top_management" or viewer.role in ['admin', 'ceo']:
+            filtered_evaluations = evaluations
+        else:
+            supervised_ids = set(OrgClosure.objects.filter(
+                ancestor=viewer,
+                descendant_id__in={evaluation.evaluatee_id for evaluation in evaluations}
+            ).values_list('descendant_id', flat=True))
+            supervised_ids.add(viewer.id)
+            filtered_evaluations = [e for e in evaluations if e.evaluatee_id in supervised_ids]
         
         return Response(KPIEvaluationSerializer(filtered_evaluations, many=True).data)
 
@@ -361,7 +507,8 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
             evaluation_type=KPIEvaluation.EvaluationType.TOP_MANAGEMENT_EVALUATION
         ).first()
         
-        eval_config = evaluatee.get_evaluation_config_task()
+        task = Task.objects.filter(pk=task_id).first()
+        eval_config = task.get_evaluation_config(evaluatee) if task else evaluatee.get_evaluation_config_task()
         
         final_score = None
         if eval_config['is_dual_evaluation']:
@@ -440,7 +587,7 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
                 raise PermissionDenied("Rəhbər dəyərləndirməsi edildikdən sonra öz dəyərləndirmənizi redaktə edə bilməzsiniz (yalnız administrator/CEO dəyişə bilər).")
         
         if is_superior_eval:
-            eval_config = instance.evaluatee.get_evaluation_config_task()
+            eval_config = instance.task.get_evaluation_config(instance.evaluatee)
             if eval_config['is_dual_evaluation']:
                 tm_eval_exists = KPIEvaluation.objects.filter(
                     task=instance.task,
@@ -486,22 +633,24 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
                     instance.attachment.delete(save=False)
                 instance.attachment = None
 
-        if old_score is not None and old_score != new_score:
-            history_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "updated_by_id": user.id,
-                "updated_by_name": user.get_full_name() or user.username,
-                "previous_score": old_score,
-                "new_score": new_score
-            }
-            if not isinstance(instance.history, list):
-                instance.history = []
-            instance.history.append(history_entry)
+        score_changed = old_score is not None and old_score != new_score
+        if score_changed:
             instance.previous_score = old_score
 
         instance.updated_by = user
-        instance.save()
+        with transaction.atomic():
+            instance.save()
+            if score_changed:
+                create_score_revision(user, old_score, new_score, kpi_evaluation=instance)
         return Response(self.get_serializer(instance).data)
+
+    @action(detail=True, methods=['get'], url_path='history')
+    def score_history(self, request, pk=None):
+        evaluation = self.get_object()
+        paginator = StandardResultsSetPagination()
+        page = paginator.paginate_queryset(evaluation.revisions.all(), request, view=self)
+        serializer = ScoreRevisionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
         
     @action(detail=False, methods=['get'], url_path='need-self-evaluation')
     def need_self_evaluation(self, request):
@@ -513,22 +662,9 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
         if user.role in ['ceo', 'admin']:
             return Response([])
         
-        self_eval_exists = KPIEvaluation.objects.filter(
-            task=OuterRef('pk'),
-            evaluatee=user,
-            evaluation_type=KPIEvaluation.EvaluationType.SELF_EVALUATION
-        )
-        
-        tasks = Task.objects.annotate(
-            has_self_eval=Exists(self_eval_exists)
-        ).filter(
-            assignee=user,
-            status='DONE',
-            has_self_eval=False
-        ).select_related('assignee', 'created_by').order_by('-completed_at')
-        
-        serializer = TaskSerializer(tasks, many=True, context={'request': request})
-        return Response(serializer.data)
+        return self.task_list_response(self.own_work_item_tasks(
+            user, KPIEvaluation.EvaluationType.SELF_EVALUATION
+        ))
 
     @action(detail=False, methods=['get'], url_path='waiting-superior-evaluation')
     def waiting_superior_evaluation(self, request):
@@ -537,32 +673,23 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
         if user.factory_role == "top_management":
             return Response([])
         
-        self_eval_exists = KPIEvaluation.objects.filter(
-            task=OuterRef('pk'),
+        if user.role in ['ceo', 'admin']:
+            return Response([])
+
+        return self.task_list_response(self.own_work_item_tasks(
+            user, KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION
+        ))
+
+    def own_work_item_tasks(self, user, evaluation_type):
+        items = EvaluationWorkItem.objects.filter(
             evaluatee=user,
-            evaluation_type=KPIEvaluation.EvaluationType.SELF_EVALUATION
+            evaluation_type=evaluation_type,
+            state=EvaluationWorkItem.State.PENDING
         )
-        
-        superior_eval_exists = KPIEvaluation.objects.filter(
-            task=OuterRef('pk'),
-            evaluatee=user,
-            evaluation_type=KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION
-        )
-        
-        tasks = Task.objects.annotate(
-            has_self_eval=Exists(self_eval_exists),
-            has_superior_eval=Exists(superior_eval_exists)
-        ).filter(
-            Q(assignee=user) &
-            Q(status='DONE') &
-            Q(has_self_eval=True) &
-            Q(has_superior_eval=False)
-        ).exclude(
-            assignee__role__in=['ceo', 'admin']
-        ).select_related('assignee', 'created_by').order_by('-completed_at')
-        
-        serializer = TaskSerializer(tasks, many=True, context={'request': request})
-        return Response(serializer.data)
+        return Task.objects.filter(
+            assignee=user,
+            id__in=items.values('task_id')
+        ).order_by(*self.task_ordering)
 
     @action(detail=False, methods=['get'], url_path='i-evaluated')
     def i_evaluated(self, request):
@@ -580,12 +707,9 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
             status='DONE'
         ).exclude(
             Q(assignee=user) | Q(assignee__role__in=['ceo', 'admin'])
-        ).select_related('assignee', 'created_by').prefetch_related(
-            'evaluations'
-        ).order_by('-completed_at')
+        ).order_by(*self.task_ordering)
         
-        serializer = TaskSerializer(tasks, many=True, context={'request': request})
-        return Response(serializer.data)
+        return self.task_list_response(tasks)
 
     @action(detail=False, methods=['get'], url_path='subordinates-need-evaluation')
     def subordinates_need_evaluation(self, request):
@@ -601,32 +725,15 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
 
         visible_user_ids = subordinate_ids + [user.id]
         
-        tasks_q = Q(assignee_id__in=visible_user_ids) & Q(status='DONE')
-
-        self_eval_exists = KPIEvaluation.objects.filter(
-            task=OuterRef('pk'),
-            evaluation_type=KPIEvaluation.EvaluationType.SELF_EVALUATION
-        )
-        
-        superior_eval_exists = KPIEvaluation.objects.filter(
-            task=OuterRef('pk'),
-            evaluation_type=KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION
-        )
-        
-        tasks = Task.objects.annotate(
-            has_self_eval=Exists(self_eval_exists),
-            has_superior_eval=Exists(superior_eval_exists)
-        ).filter(
-            tasks_q
+        tasks = Task.objects.filter(
+            assignee_id__in=visible_user_ids,
+            status='DONE'
         ).exclude(
             Q(has_self_eval=True, has_superior_eval=True) | 
             Q(assignee__role__in=['ceo', 'admin'])
-        ).select_related('assignee', 'created_by').prefetch_related(
-            'evaluations'
-        ).order_by('-completed_at')
+        ).order_by(*self.task_ordering)
         
-        serializer = TaskSerializer(tasks, many=True, context={'request': request})
-        return Response(serializer.data)
+        return self.task_list_response(tasks)
 
     @action(detail=False, methods=['get'], url_path='completed-evaluations')
     def completed_evaluations(self, request):
@@ -647,20 +754,7 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
             evaluation_type=KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION
         ).values_list('task_id', flat=True)
 
-        self_eval_exists = KPIEvaluation.objects.filter(
-            task=OuterRef('pk'),
-            evaluation_type=KPIEvaluation.EvaluationType.SELF_EVALUATION
-        )
-        
-        superior_eval_exists = KPIEvaluation.objects.filter(
-            task=OuterRef('pk'),
-            evaluation_type=KPIEvaluation.EvaluationType.SUPERIOR_EVALUATION
-        )
-        
-        tasks = Task.objects.annotate(
-            has_self_eval=Exists(self_eval_exists),
-            has_superior_eval=Exists(superior_eval_exists)
-        ).filter(
+        tasks = Task.objects.filter(
             Q(assignee_id__in=visible_user_ids) &
             Q(status='DONE') &
             Q(has_self_eval=True) & 
@@ -671,9 +765,6 @@ class KPIEvaluationViewSet(viewsets.ModelViewSet):
             assignee=user
         ).exclude(
             assignee__role__in=['ceo', 'admin']
-        ).select_related('assignee', 'created_by').prefetch_related(
-            'evaluations'
-        ).order_by('-completed_at')
+        ).order_by(*self.task_ordering)
         
-        serializer = TaskSerializer(tasks, many=True, context={'request': request})
-        return Response(serializer.data)
\ No newline at end of file
+        return self.task_list_response(tasks)
\ No newline at end of file
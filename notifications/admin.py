@@ -0,0 +1,20 @@
+from django.contrib import admin
+from .models import NotificationEvent, OutboundEmail
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'to')
+    readonly_fields = ('created_at', 'sent_at', 'attempts', 'last_error')
+    list_per_page = 25
+
+
+@admin.register(NotificationEvent)
+class NotificationEventAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'recipient', 'event_type', 'summary', 'processed_at')
+    list_filter = ('event_type', 'processed_at')
+    search_fields = ('summary', 'recipient__username')
+    readonly_fields = ('created_at', 'processed_at', 'email')
+    list_per_page = 25
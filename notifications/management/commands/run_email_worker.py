@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notifications.utils import drain_outbox, flush_notification_events
+
+
+class Command(BaseCommand):
+    help = 'Bildiriş hadisələrini (NotificationEvent) e-poçtlara birləşdirir və növbədəki (OutboundEmail) e-poçtları tək SMTP bağlantısı ilə göndərir'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Növbəni bir dəfə boşaldıb dayanır')
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=settings.EMAIL_OUTBOX_POLL_INTERVAL)
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        try:
+            while True:
+                queued = flush_notification_events()
+                if queued:
+                    self.stdout.write(f"{queued} bildiriş e-poçtu növbəyə əlavə edildi.")
+                sent, failed = drain_outbox(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"{sent} e-poçt göndərildi, {failed} uğursuz oldu.")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Cəmi: {total_sent} e-poçt göndərildi, {total_failed} uğursuz oldu."
+        ))
@@ -0,0 +1,151 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboundEmail(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Göndərilməyi gözləyir')
+        SENDING = 'SENDING', _('Göndərilir')
+        SENT = 'SENT', _('Göndərildi')
+        FAILED = 'FAILED', _('Uğursuz oldu')
+
+    subject = models.CharField(max_length=998, verbose_name=_("Mövzu"))
+    body = models.TextField(blank=True, verbose_name=_("Mətn"))
+    html_body = models.TextField(blank=True, verbose_name=_("HTML mətn"))
+    from_email = models.CharField(max_length=255, blank=True, verbose_name=_("Göndərən"))
+    to = models.JSONField(default=list, verbose_name=_("Alıcılar"))
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, verbose_name=_("Status"))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Cəhd sayı"))
+    last_error = models.TextField(blank=True, verbose_name=_("Son xəta"))
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name=_("Növbəti cəhd"))
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Yaradılma tarixi"))
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Göndərilmə tarixi"))
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        verbose_name = _("Göndəriləcək E-poçt")
+        verbose_name_plural = _("Göndəriləcək E-poçtlar")
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+    @classmethod
+    def from_message(cls, message):
+        html_body = next(
+            (content for content, mimetype in getattr(message, 'alternatives', []) if mimetype == 'text/html'),
+            ''
+        )
+        return cls(
+            subject=message.subject,
+            body=message.body,
+            html_body=html_body,
+            from_email=message.from_email or '',
+            to=list(message.to),
+        )
+
+    @classmethod
+    def enqueue(cls, messages):
+        return cls.objects.bulk_create([cls.from_message(message) for message in messages])
+
+    def to_message(self, connection=None):
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email or None,
+            to=self.to,
+            connection=connection,
+        )
+        if self.html_body:
+            message.attach_alternative(self.html_body, "text/html")
+        return message
+
+    STATE_FIELDS = ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at']
+
+    @classmethod
+    def claim(cls, batch_size, now):
+        with transaction.atomic():
+            emails = list(
+                cls.objects.select_for_update(skip_locked=True).filter(
+                    status__in=[cls.Status.PENDING, cls.Status.SENDING],
+                    next_attempt_at__lte=now
+                ).order_by('next_attempt_at', 'id')[:batch_size]
+            )
+            cls.objects.filter(pk__in=[email.pk for email in emails]).update(
+                status=cls.Status.SENDING,
+                next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+            )
+        return emails
+
+    def mark_sent(self, now):
+        self.status = self.Status.SENT
+        self.attempts += 1
+        self.sent_at = now
+        self.last_error = ''
+
+    def mark_failed(self, error, now):
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            self.status = self.Status.FAILED
+        else:
+            self.status = self.Status.PENDING
+            delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (self.attempts - 1)
+            self.next_attempt_at = now + timedelta(seconds=delay)
+
+
+class NotificationEvent(models.Model):
+    class EventType(models.TextChoices):
+        KPI_EVALUATION_REQUEST = 'KPI_EVALUATION_REQUEST', _('KPI dəyərləndirmə tələbi')
+        TASK_ASSIGNED = 'TASK_ASSIGNED', _('Yeni tapşırıq')
+        TASK_APPROVAL_REQUEST = 'TASK_APPROVAL_REQUEST', _('Təsdiq gözləyən tapşırıq')
+
+    RENDERERS = {
+        EventType.KPI_EVALUATION_REQUEST: 'kpis.utils.render_kpi_evaluation_request_event',
+        EventType.TASK_ASSIGNED: 'tasks.utils.render_task_notification_event',
+        EventType.TASK_APPROVAL_REQUEST: 'tasks.utils.render_task_notification_event',
+    }
+
+    DIGEST_LABELS = {
+        EventType.KPI_EVALUATION_REQUEST: '{count} tapşırıq KPI dəyərləndirmənizi gözləyir',
+        EventType.TASK_ASSIGNED: '{count} yeni tapşırıq sizə təyin edildi',
+        EventType.TASK_APPROVAL_REQUEST: '{count} tapşırıq təsdiqinizi gözləyir',
+    }
+
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notification_events', verbose_name=_("Alıcı")
+    )
+    event_type = models.CharField(max_length=30, choices=EventType.choices, verbose_name=_("Bildiriş növü"))
+    task = models.ForeignKey(
+        'tasks.Task', on_delete=models.CASCADE, null=True, blank=True, related_name='notification_events'
+    )
+    object_id = models.PositiveBigIntegerField(null=True, blank=True)
+    summary = models.CharField(max_length=500, blank=True, verbose_name=_("Qısa məzmun"))
+    created_at = models.DateTimeField(default=timezone.now, verbose_name=_("Yaradılma tarixi"))
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name=_("İşlənmə tarixi"))
+    email = models.ForeignKey(
+        OutboundEmail, on_delete=models.SET_NULL, null=True, blank=True, related_name='events'
+    )
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        verbose_name = _("Bildiriş Hadisəsi")
+        verbose_name_plural = _("Bildiriş Hadisələri")
+        indexes = [
+            models.Index(
+                fields=['recipient', 'created_at'],
+                condition=models.Q(processed_at__isnull=True),
+                name='notification_event_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_event_type_display()} -> {self.recipient_id}: {self.summary}"
@@ -0,0 +1,144 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from tasks.models import Task
+from .models import NotificationEvent, OutboundEmail
+from .utils import drain_outbox, flush_notification_events, queue_emails, record_notification_events
+
+
+def make_user(username, **fields):
+    return User.objects.create(username=username, email=f"{username}@example.com", **fields)
+
+
+class FlakyBackend(EmailBackend):
+    def send_messages(self, messages):
+        for message in messages:
+            if 'bounce@example.com' in message.to:
+                raise ConnectionError('550 mailbox unavailable')
+            if 'crash@example.com' in message.to:
+                raise SystemExit
+        return super().send_messages(messages)
+
+
+def make_message(to):
+    return EmailMultiAlternatives(subject=f"Salam {to}", body='Mətn', from_email='noreply@example.com', to=[to])
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_DELAY=60, EMAIL_OUTBOX_CLAIM_TIMEOUT=600)
+class OutboxTests(TestCase):
+    def test_queued_emails_are_sent_only_by_the_worker(self):
+        queue_emails([make_message('a@example.com'), make_message('b@example.com')])
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(drain_outbox(), (2, 0))
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['a@example.com', 'b@example.com'])
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', flat=True)), {OutboundEmail.Status.SENT})
+        self.assertEqual(drain_outbox(), (0, 0))
+
+    def test_rolled_back_transaction_queues_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                queue_emails([make_message('a@example.com')])
+                raise RuntimeError
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.FlakyBackend')
+    def test_failed_email_is_retried_with_backoff_then_given_up(self):
+        queue_emails([make_message('bounce@example.com'), make_message('a@example.com')])
+
+        before = timezone.now()
+        self.assertEqual(drain_outbox(), (1, 1))
+        bounced = OutboundEmail.objects.get(to=['bounce@example.com'])
+        self.assertEqual(bounced.status, OutboundEmail.Status.PENDING)
+        self.assertEqual(bounced.attempts, 1)
+        self.assertGreaterEqual(bounced.next_attempt_at, before + timedelta(seconds=60))
+        self.assertEqual(drain_outbox(), (0, 0))
+
+        OutboundEmail.objects.filter(pk=bounced.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_outbox(), (0, 1))
+        bounced.refresh_from_db()
+        self.assertEqual(bounced.status, OutboundEmail.Status.FAILED)
+        self.assertIn('550', bounced.last_error)
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.FlakyBackend')
+    def test_worker_crash_does_not_resend_delivered_emails(self):
+        queue_emails([make_message('a@example.com'), make_message('crash@example.com'), make_message('b@example.com')])
+
+        with self.assertRaises(SystemExit):
+            drain_outbox()
+
+        self.assertEqual([message.to for message in mail.outbox], [['a@example.com']])
+        self.assertEqual(
+            {email.to[0]: email.status for email in OutboundEmail.objects.all()},
+            {
+                'a@example.com': OutboundEmail.Status.SENT,
+                'crash@example.com': OutboundEmail.Status.SENDING,
+                'b@example.com': OutboundEmail.Status.SENDING,
+            }
+        )
+        self.assertEqual(drain_outbox(), (0, 0))
+
+        OutboundEmail.objects.filter(status=OutboundEmail.Status.SENDING).exclude(
+            to=['crash@example.com']
+        ).update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_outbox(), (1, 0))
+        self.assertEqual([message.to for message in mail.outbox], [['a@example.com'], ['b@example.com']])
+
+
+@override_settings(NOTIFICATION_COALESCE_WINDOW=120, NOTIFICATION_DIGEST_WINDOW=86400)
+class NotificationCoalescingTests(TestCase):
+    def setUp(self):
+        self.manager = make_user('manager', role='manager')
+        self.employee = make_user('employee', role='employee')
+        self.now = timezone.now()
+
+    def record(self, recipient, count, event_type=NotificationEvent.EventType.KPI_EVALUATION_REQUEST, task=None):
+        record_notification_events([
+            NotificationEvent(recipient=recipient, event_type=event_type, task=task, summary=f"Tapşırıq {i}", created_at=self.now)
+            for i in range(count)
+        ])
+
+    def test_events_are_coalesced_into_one_digest_per_recipient(self):
+        self.record(self.manager, 12)
+
+        self.assertEqual(flush_notification_events(self.now + timedelta(seconds=60)), 0)
+        self.assertEqual(flush_notification_events(self.now + timedelta(seconds=121)), 1)
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to, [self.manager.email])
+        self.assertEqual(email.subject, "12 tapşırıq KPI dəyərləndirmənizi gözləyir")
+        self.assertFalse(NotificationEvent.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(NotificationEvent.objects.filter(email=email).count(), 12)
+
+    def test_digest_delivery_waits_for_the_digest_window(self):
+        self.manager.notification_delivery = 'digest'
+        self.manager.save()
+        self.record(self.manager, 3)
+
+        self.assertEqual(flush_notification_events(self.now + timedelta(hours=1)), 0)
+        self.assertEqual(flush_notification_events(self.now + timedelta(days=1, seconds=1)), 1)
+
+    def test_single_event_uses_its_own_template(self):
+        task = Task.objects.create(title='Hesabat', assignee=self.employee, created_by=self.manager)
+        self.record(self.employee, 1, NotificationEvent.EventType.TASK_ASSIGNED, task)
+
+        flush_notification_events(self.now + timedelta(seconds=121))
+
+        self.assertEqual(OutboundEmail.objects.get().subject, "Yeni Tapşırıq Təyin Edildi: Hesabat")
+
+    def test_recipient_without_email_is_skipped(self):
+        self.manager.email = ''
+        self.manager.save()
+        self.record(self.manager, 2)
+
+        self.assertEqual(flush_notification_events(self.now + timedelta(seconds=121)), 0)
+        self.assertFalse(OutboundEmail.objects.exists())
+        self.assertFalse(NotificationEvent.objects.filter(processed_at__isnull=True).exists())
@@ -0,0 +1,161 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Min
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import NotificationEvent, OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+def queue_emails(messages):
+    messages = [message for message in messages if message is not None]
+    if not messages:
+        return []
+    emails = OutboundEmail.enqueue(messages)
+    logger.info(f"{len(emails)} e-poçt göndərilmə növbəsinə əlavə edildi.")
+    return emails
+
+
+def record_notification_events(events):
+    events = [event for event in events if event is not None]
+    if not events:
+        return []
+    return NotificationEvent.objects.bulk_create(events)
+
+
+def build_digest_email(recipient, events):
+    groups = {}
+    for event in events:
+        groups.setdefault(event.event_type, []).append(event)
+
+    sections = [
+        {
+            'title': NotificationEvent.DIGEST_LABELS[event_type].format(count=len(items)),
+            'items': [item.summary for item in items],
+        }
+        for event_type, items in groups.items()
+    ]
+    subject = sections[0]['title'] if len(sections) == 1 else f"{len(events)} yeni bildirişiniz var"
+
+    context = {
+        'recipient_name': recipient.get_full_name() or recipient.username,
+        'sections': sections,
+        'site_url': getattr(settings, "FRONTEND_URL", "https://metrics.azlub.com/kpi_system"),
+    }
+    html_message = render_to_string('emails/notification_digest.html', context)
+    plain_message = f"Salam, {recipient.username}. " + " ".join(f"{section['title']}." for section in sections)
+
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=plain_message,
+        from_email=settings.EMAIL_HOST_USER,
+        to=[recipient.email],
+    )
+    message.attach_alternative(html_message, "text/html")
+    return message
+
+
+def build_notification_email(recipient, events):
+    if not recipient.email:
+        logger.warning(f"ID {recipient.id} olan alıcının e-poçt ünvanı yoxdur. {len(events)} bildiriş göndərilmədi.")
+        return None
+    if len(events) == 1:
+        event = events[0]
+        return import_string(NotificationEvent.RENDERERS[event.event_type])(event)
+    return build_digest_email(recipient, events)
+
+
+def due_notification_recipients(now):
+    windows = {
+        'immediate': timedelta(seconds=settings.NOTIFICATION_COALESCE_WINDOW),
+        'digest': timedelta(seconds=settings.NOTIFICATION_DIGEST_WINDOW),
+    }
+    pending = NotificationEvent.objects.filter(processed_at__isnull=True).values(
+        'recipient_id', 'recipient__notification_delivery'
+    ).annotate(oldest=Min('created_at'))
+    return [
+        row['recipient_id'] for row in pending
+        if row['oldest'] <= now - windows.get(row['recipient__notification_delivery'], windows['immediate'])
+    ]
+
+
+def flush_notification_events(now=None):
+    now = now or timezone.now()
+    recipient_ids = due_notification_recipients(now)
+    if not recipient_ids:
+        return 0
+
+    with transaction.atomic():
+        events = NotificationEvent.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+            processed_at__isnull=True,
+            recipient_id__in=recipient_ids
+        ).select_related('recipient').order_by('recipient_id', 'created_at', 'id')
+
+        grouped = {}
+        for event in events:
+            grouped.setdefault(event.recipient_id, []).append(event)
+
+        outgoing = []
+        for recipient_events in grouped.values():
+            try:
+                message = build_notification_email(recipient_events[0].recipient, recipient_events)
+            except Exception as e:
+                logger.error(f"Bildiriş e-poçtu hazırlanarkən xəta baş verdi (Alıcı ID: {recipient_events[0].recipient_id}): {str(e)}", exc_info=True)
+                message = None
+            outgoing.append((recipient_events, message))
+
+        emails = iter(queue_emails([message for _, message in outgoing]))
+        processed = []
+        for recipient_events, message in outgoing:
+            email = next(emails) if message is not None else None
+            for event in recipient_events:
+                event.processed_at = now
+                event.email = email
+                processed.append(event)
+
+        NotificationEvent.objects.bulk_update(processed, ['processed_at', 'email'])
+
+    return sum(1 for _, message in outgoing if message is not None)
+
+
+def drain_outbox(batch_size=None):
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+
+    emails = OutboundEmail.claim(batch_size, timezone.now())
+    if not emails:
+        return 0, 0
+
+    sent = failed = processed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for email in emails:
+            try:
+                connection.send_messages([email.to_message(connection)])
+            except Exception as e:
+                logger.error(f"E-poçt göndərilərkən xəta baş verdi (ID: {email.id}, Alıcı: {', '.join(email.to)}): {str(e)}", exc_info=True)
+                email.mark_failed(e, timezone.now())
+                failed += 1
+            else:
+                email.mark_sent(timezone.now())
+                sent += 1
+            email.save(update_fields=OutboundEmail.STATE_FIELDS)
+            processed += 1
+            if email.status != OutboundEmail.Status.SENT:
+                connection.close()
+                connection.open()
+    except Exception as e:
+        logger.error(f"E-poçt serverinə qoşulmaq mümkün olmadı: {str(e)}", exc_info=True)
+        now = timezone.now()
+        for email in emails[processed:]:
+            email.mark_failed(e, now)
+            failed += 1
+        OutboundEmail.objects.bulk_update(emails[processed:], OutboundEmail.STATE_FIELDS)
+    finally:
+        connection.close()
+
+    return sent, failed
@@ -1,15 +1,17 @@
 from rest_framework import serializers
 from accounts.models import User
+from accounts.serializers import ProfilePhotoThumbnailsField
 
 class SubordinateSerializer(serializers.ModelSerializer):
     role = serializers.CharField(source='get_role_display', read_only=True)
     department = serializers.CharField(source='department.name', read_only=True)
     full_name = serializers.SerializerMethodField()
     profile_photo = serializers.SerializerMethodField()
+    profile_photo_thumbnails = ProfilePhotoThumbnailsField()
 
     class Meta:
         model = User
-        fields = ['id', 'slug', 'profile_photo', 'full_name', 'role', 'department', 'email']
+        fields = ['id', 'slug', 'profile_photo', 'profile_photo_thumbnails', 'full_name', 'role', 'department', 'email']
     
     def get_full_name(self, obj):
         return obj.get_full_name() or obj.username
@@ -87,7 +87,7 @@ class PerformanceSummaryView(APIView):
                 can_view = (
                     request.user == target_user or 
                     request.user.role == 'admin' or 
-                    request.user in target_user.get_all_superiors()
+                    request.user.is_superior_of(target_user)
                 )
                 if not can_view:
                     return Response({"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN)
@@ -97,10 +97,7 @@ class PerformanceSummaryView(APIView):
         today = timezone.now().date()
 
         completed_count = done_tasks.count()
-        overdue_count = all_tasks.filter(
-            due_date__lt=today, 
-            status__in=['PENDING', 'TODO', 'IN_PROGRESS']
-        ).count()
+        overdue_count = all_tasks.filter(Task.overdue_filter(today)).count()
         
         three_months_ago = timezone.now() - timedelta(days=90)
         
@@ -150,7 +147,7 @@ class KpiMonthlySummaryView(APIView):
             can_view = (
                 request.user == target_user or 
                 request.user.role == 'admin' or 
-                request.user in target_user.get_all_superiors()
+                request.user.is_superior_of(target_user)
             )
             if not can_view:
                 return Response({"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN)
@@ -219,7 +216,7 @@ class UserKpiScoreView(APIView):
             can_view = (
                 request.user == target_user or 
                 request.user.role == 'admin' or 
-                request.user in target_user.get_all_superiors()
+                request.user.is_superior_of(target_user)
             )
             if not can_view:
                 return Response({"detail": "Permission denied."}, status=status.HTTP_403_FORBIDDEN)
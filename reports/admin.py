@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ActivityLog
+from .models import ActivityLog, ScoreRevision
 
 @admin.register(ActivityLog)
 class ActivityLogAdmin(admin.ModelAdmin):
@@ -13,4 +13,19 @@ class ActivityLogAdmin(admin.ModelAdmin):
         return False
 
     def has_change_permission(self, request, obj=None):
-        return False
\ No newline at end of file
+        return False
+
+
+@admin.register(ScoreRevision)
+class ScoreRevisionAdmin(admin.ModelAdmin):
+    list_display = ('timestamp', 'actor_name', 'kpi_evaluation', 'user_evaluation', 'previous_score', 'new_score')
+    list_filter = ('timestamp',)
+    search_fields = ('actor_name', 'actor__username')
+    readonly_fields = ('timestamp', 'actor', 'actor_name', 'kpi_evaluation', 'user_evaluation', 'previous_score', 'new_score')
+    list_per_page = 25
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,72 @@
+import csv
+import json
+from datetime import date, datetime
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def csv_value(value):
+    value = json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else export_value(value)
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def csv_rows(headers, rows):
+    writer = csv.writer(Echo())
+    yield '\ufeff' + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([csv_value(value) for value in row])
+
+
+def ndjson_rows(headers, rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(headers, (export_value(value) for value in row))), ensure_ascii=False
+        ) + '\n'
+
+
+class ExportMixin:
+    export_name = 'export'
+    export_fields = ()
+    export_chunk_size = 2000
+
+    def get_export_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        return queryset.prefetch_related(None).values_list(*[path for _, path in self.export_fields])
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            raise ValidationError({'file_format': f"Dəstəklənən formatlar: {', '.join(EXPORT_FORMATS)}."})
+
+        headers = [header for header, _ in self.export_fields]
+        rows = self.get_export_queryset().iterator(chunk_size=self.export_chunk_size)
+        stream = csv_rows(headers, rows) if file_format == 'csv' else ndjson_rows(headers, rows)
+
+        response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[file_format])
+        filename = f"{self.export_name}-{timezone.localdate().isoformat()}.{file_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
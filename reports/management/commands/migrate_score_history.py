@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from kpis.models import KPIEvaluation
+from reports.models import ScoreRevision
+from userkpisystem.models import UserEvaluation
+
+
+class Command(BaseCommand):
+    help = 'Köhnə JSON "history" tarixçələrini ScoreRevision cədvəlinə partiyalarla köçürür'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for model, target in [(KPIEvaluation, 'kpi_evaluation'), (UserEvaluation, 'user_evaluation')]:
+            evaluations, revisions = self.migrate(model, target, batch_size)
+            self.stdout.write(self.style.SUCCESS(
+                f"{model.__name__}: {evaluations} dəyərləndirmədən {revisions} dəyişiklik köçürüldü."
+            ))
+
+    def migrate(self, model, target, batch_size):
+        evaluations = 0
+        revisions = 0
+        last_id = 0
+
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_id)
+                .exclude(history=[])
+                .order_by('pk')
+                .only('pk', 'history')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].pk
+
+            actor_ids = {
+                entry.get('updated_by_id')
+                for evaluation in batch if isinstance(evaluation.history, list)
+                for entry in evaluation.history if isinstance(entry, dict)
+            }
+            existing_actor_ids = set(User.objects.filter(pk__in=actor_ids - {None}).values_list('pk', flat=True))
+
+            rows = []
+            for evaluation in batch:
+                for entry in evaluation.history if isinstance(evaluation.history, list) else []:
+                    if not isinstance(entry, dict):
+                        continue
+                    rows.append(ScoreRevision(
+                        previous_score=entry.get('previous_score'),
+                        new_score=entry.get('new_score'),
+                        actor_id=entry.get('updated_by_id') if entry.get('updated_by_id') in existing_actor_ids else None,
+                        actor_name=entry.get('updated_by_name') or '',
+                        timestamp=self.parse_timestamp(entry.get('timestamp')),
+                        **{target: evaluation}
+                    ))
+
+            with transaction.atomic():
+                ScoreRevision.objects.bulk_create(rows, batch_size=batch_size)
+                model.objects.filter(pk__in=[evaluation.pk for evaluation in batch]).update(history=[])
+
+            evaluations += len(batch)
+            revisions += len(rows)
+
+        return evaluations, revisions
+
+    def parse_timestamp(self, value):
+        try:
+            timestamp = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return timezone.now()
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+        return timestamp
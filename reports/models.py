@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 class ActivityLog(models.Model):
@@ -50,6 +51,58 @@ class ActivityLog(models.Model):
         ordering = ['-timestamp']
         verbose_name = _("Fəaliyyət Tarixçəsi")
         verbose_name_plural = _("Fəaliyyət Tarixçələri")
+        indexes = [
+            models.Index(fields=['-timestamp', '-id']),
+        ]
 
     def __str__(self):
-        return f"{self.actor} - {self.get_action_type_display()} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"{self.actor} - {self.get_action_type_display()} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+class ScoreRevision(models.Model):
+    kpi_evaluation = models.ForeignKey(
+        'kpis.KPIEvaluation',
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='revisions',
+        verbose_name=_("Tapşırıq dəyərləndirməsi")
+    )
+    user_evaluation = models.ForeignKey(
+        'userkpisystem.UserEvaluation',
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='revisions',
+        verbose_name=_("Aylıq dəyərləndirmə")
+    )
+    previous_score = models.PositiveIntegerField(null=True, blank=True, verbose_name=_("Əvvəlki skor"))
+    new_score = models.PositiveIntegerField(null=True, blank=True, verbose_name=_("Yeni skor"))
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='score_revisions',
+        verbose_name=_("Dəyişikliyi edən")
+    )
+    actor_name = models.CharField(max_length=255, blank=True, verbose_name=_("Dəyişikliyi edənin adı"))
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name=_("Tarix"))
+
+    class Meta:
+        ordering = ['-timestamp', '-id']
+        verbose_name = _("Skor Dəyişikliyi")
+        verbose_name_plural = _("Skor Dəyişiklikləri")
+        indexes = [
+            models.Index(fields=['kpi_evaluation', '-timestamp']),
+            models.Index(fields=['user_evaluation', '-timestamp']),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(kpi_evaluation__isnull=False, user_evaluation__isnull=True) |
+                    models.Q(kpi_evaluation__isnull=True, user_evaluation__isnull=False)
+                ),
+                name='score_revision_single_target'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.actor_name} - {self.previous_score} -> {self.new_score} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
@@ -1,6 +1,129 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 15 
     page_size_query_param = 'page_size'
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    page_size = 15
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    total_query_param = 'include_total'
+    total_limit = 1000
+    fallback_class = None
+    invalid_cursor_message = 'Yanlış kursor.'
+    ordering_query_params = ()
+    ordering_conflict_message = 'Kursor ilə səhifələmə bu parametrlə birlikdə istifadə edilə bilməz.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fallback = None
+
+        if self.cursor_query_param not in request.query_params:
+            if self.fallback_class is None:
+                return None
+            self.fallback = self.fallback_class()
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        conflicts = [param for param in self.ordering_query_params if request.query_params.get(param)]
+        if conflicts:
+            raise ValidationError({param: self.ordering_conflict_message for param in conflicts})
+
+        ordering = getattr(view, 'cursor_ordering', self.ordering)
+        self.key_fields = [field.lstrip('-') for field in ordering]
+        self.descending = ordering[0].startswith('-')
+        queryset = queryset.order_by(*self.order_by_fields())
+
+        self.count = None
+        if request.query_params.get(self.total_query_param) in ('1', 'true'):
+            self.count = queryset.order_by()[:self.total_limit + 1].count()
+
+        position = self.decode_cursor(request.query_params[self.cursor_query_param])
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        page_size = self.get_page_size(request)
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        results = results[:page_size]
+        self.last_position = [getattr(results[-1], field) for field in self.key_fields] if results else None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def order_by_fields(self):
+        first_field, second_field = self.key_fields
+        if self.descending:
+            return F(first_field).desc(nulls_first=True), F(second_field).desc()
+        return F(first_field).asc(nulls_last=True), F(second_field).asc()
+
+    def after(self, position):
+        lookup = 'lt' if self.descending else 'gt'
+        (first_field, second_field), (first_value, second_value) = self.key_fields, position
+        if first_value is None:
+            condition = Q(**{f'{first_field}__isnull': True, f'{second_field}__{lookup}': second_value})
+            return condition | Q(**{f'{first_field}__isnull': False}) if self.descending else condition
+
+        condition = (
+            Q(**{f'{first_field}__{lookup}': first_value}) |
+            Q(**{first_field: first_value, f'{second_field}__{lookup}': second_value})
+        )
+        return condition if self.descending else condition | Q(**{f'{first_field}__isnull': True})
+
+    def encode_cursor(self, position):
+        first_value, second_value = position
+        payload = json.dumps([first_value.isoformat() if first_value is not None else None, second_value])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            raw_value, second_value = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            first_value = parse_datetime(raw_value) if raw_value is not None else None
+            second_value = int(second_value)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if raw_value is not None and first_value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return first_value, second_value
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.total_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_position))
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response['count'] = min(self.count, self.total_limit)
+            response['count_exact'] = self.count <= self.total_limit
+        return Response(response)
+
+
+class ActivityLogPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
+    fallback_class = StandardResultsSetPagination
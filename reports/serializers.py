@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import ActivityLog
+from .models import ActivityLog, ScoreRevision
 from accounts.serializers import UserSerializer
 from accounts.models import User
 
@@ -64,4 +64,13 @@ class ActivityLogSerializer(serializers.ModelSerializer):
 class UserFilterSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['id', 'first_name', 'last_name']
\ No newline at end of file
+        fields = ['id', 'first_name', 'last_name']
+
+
+class ScoreRevisionSerializer(serializers.ModelSerializer):
+    updated_by_id = serializers.IntegerField(source='actor_id', read_only=True)
+    updated_by_name = serializers.CharField(source='actor_name', read_only=True)
+
+    class Meta:
+        model = ScoreRevision
+        fields = ['id', 'timestamp', 'updated_by_id', 'updated_by_name', 'previous_score', 'new_score']
@@ -1,3 +1,99 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import Department, User
+from tasks.models import Task
+from .exports import csv_value
+
+
+def make_user(username, **fields):
+    return User.objects.create(username=username, email=f"{username}@example.com", **fields)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.department = Department.objects.create(name='Satış')
+        self.manager = make_user('manager', role='manager', department=self.department)
+        self.department.manager = self.manager
+        self.department.save()
+        self.employee = make_user('employee', role='employee', department=self.department)
+        self.outsider = make_user('outsider', role='employee')
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+        for assignee, status in [(self.employee, 'DONE'), (self.employee, 'IN_PROGRESS'), (self.outsider, 'IN_PROGRESS')]:
+            Task.objects.create(title='Hesabat', assignee=assignee, created_by=self.manager, status=status)
+
+    def get_stats(self):
+        response = self.client.get('/api/reports/dashboard-stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counters_cover_visible_users_and_refresh_on_task_changes(self):
+        stats = self.get_stats()
+        self.assertEqual((stats['completed'], stats['inProgress']), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.get(assignee=self.employee, status='IN_PROGRESS')
+            task.status = 'DONE'
+            task.save()
+        stats = self.get_stats()
+        self.assertEqual((stats['completed'], stats['inProgress']), (2, 0))
+
+    def test_completed_counts_only_the_current_month(self):
+        Task.objects.filter(status='DONE').update(completed_at=timezone.now().replace(day=1) - timedelta(days=1))
+        self.assertEqual(self.get_stats()['completed'], 0)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Satış')
+        self.manager = make_user('manager', role='manager', department=self.department)
+        self.department.manager = self.manager
+        self.department.save()
+        self.employee = make_user('employee', role='employee', department=self.department, first_name='=HYPERLINK("x")')
+        outsider = make_user('outsider', role='employee')
+        self.task = Task.objects.create(title='=1+2', assignee=self.employee, created_by=self.manager, status='TODO')
+        Task.objects.create(title='Gizli', assignee=outsider, created_by=outsider)
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def export(self, query=''):
+        response = self.client.get(f'/api/tasks/tasks/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_export_is_scoped_and_neutralises_formulas(self):
+        content = self.export()
+        self.assertTrue(content.startswith('\ufeff'))
+
+        rows = list(csv.DictReader(io.StringIO(content.lstrip('\ufeff'))))
+        self.assertEqual([row['id'] for row in rows], [str(self.task.pk)])
+        self.assertEqual(rows[0]['title'], "'=1+2")
+        self.assertEqual(rows[0]['assignee_first_name'], "'=HYPERLINK(\"x\")")
+
+    def test_ndjson_export_keeps_raw_values_and_applies_filters(self):
+        lines = self.export('?file_format=ndjson').splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual((row['id'], row['title'], row['is_overdue']), (self.task.pk, '=1+2', False))
+
+        self.assertEqual(self.export('?file_format=ndjson&status=DONE'), '')
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get('/api/tasks/tasks/export/?file_format=xlsx')
+        self.assertEqual(response.status_code, 400)
 
-# Create your tests here.
+    def test_csv_value(self):
+        for value in ['=SUM(A1)', '+1', '-1', '@x', '\tx', '\rx']:
+            self.assertEqual(csv_value(value), f"'{value}")
+        self.assertEqual(csv_value('Hesabat'), 'Hesabat')
+        self.assertEqual(csv_value(-1), -1)
@@ -1,10 +1,26 @@
-from .models import ActivityLog
+from .models import ActivityLog, ScoreRevision
 
-def create_log_entry(actor, action_type, target_user=None, target_task=None, details=None):
-    ActivityLog.objects.create(
+def build_log_entry(actor, action_type, target_user=None, target_task=None, details=None):
+    return ActivityLog(
         actor=actor,
         action_type=action_type,
         target_user=target_user,
         target_task=target_task,
         details=details or {}
+    )
+
+def create_log_entry(actor, action_type, target_user=None, target_task=None, details=None):
+    build_log_entry(actor, action_type, target_user, target_task, details).save()
+
+def create_log_entries(entries):
+    return ActivityLog.objects.bulk_create(entries, batch_size=500)
+
+def create_score_revision(actor, previous_score, new_score, kpi_evaluation=None, user_evaluation=None):
+    return ScoreRevision.objects.create(
+        kpi_evaluation=kpi_evaluation,
+        user_evaluation=user_evaluation,
+        previous_score=previous_score,
+        new_score=new_score,
+        actor=actor,
+        actor_name=actor.get_full_name() or actor.username
     )
\ No newline at end of file
@@ -1,20 +1,34 @@
 from rest_framework import viewsets, permissions, generics
-from django.db.models import Q
+from django.db.models import Q, Count
 from .models import ActivityLog
 from .serializers import ActivityLogSerializer, UserFilterSerializer 
 from tasks.models import Task
+from tasks.utils import cached_task_stats
 from rest_framework.response import Response
 from django.utils import timezone
 from rest_framework.views import APIView
-from accounts.models import User
+from accounts.models import User, UserVisibility
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import ActivityLogFilter
-from .pagination import StandardResultsSetPagination 
+from .pagination import ActivityLogPagination
+from .exports import ExportMixin
 
-class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
+class ActivityLogViewSet(ExportMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = ActivityLogSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = StandardResultsSetPagination 
+    pagination_class = ActivityLogPagination
+    export_name = 'activity-logs'
+    export_fields = (
+        ('id', 'id'),
+        ('timestamp', 'timestamp'),
+        ('action_type', 'action_type'),
+        ('actor_id', 'actor_id'),
+        ('actor_first_name', 'actor__first_name'),
+        ('actor_last_name', 'actor__last_name'),
+        ('target_user_id', 'target_user_id'),
+        ('target_task_id', 'target_task_id'),
+        ('details', 'details'),
+    )
 
     filter_backends = [DjangoFilterBackend]
     filterset_class = ActivityLogFilter
@@ -42,17 +56,13 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
             
             query = Q(actor_id__in=office_user_ids) | Q(target_user_id__in=office_user_ids)
             
-            queryset = ActivityLog.objects.filter(query).distinct().select_related('actor', 'target_user', 'target_task')
-            logger.info(f"[Reports ActivityLog] Factory top management logs count: {queryset.count()}")
-            return queryset
+            return ActivityLog.objects.filter(query).select_related('actor', 'target_user', 'target_task')
 
-        subordinate_ids = user.get_subordinates().values_list('id', flat=True)
-        
-        visible_user_ids = list(subordinate_ids) + [user.id]
+        visible_user_ids = UserVisibility.objects.filter(viewer=user).values('visible_user_id')
 
         query = Q(actor_id__in=visible_user_ids) | Q(target_user_id__in=visible_user_ids)
         
-        return ActivityLog.objects.filter(query).distinct().select_related('actor', 'target_user', 'target_task')
+        return ActivityLog.objects.filter(query).select_related('actor', 'target_user', 'target_task')
     
 class DashboardStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -66,64 +76,36 @@ class DashboardStatsView(APIView):
         logger = logging.getLogger(__name__)
         logger.info(f"[Reports DashboardStats] User: {user.get_full_name()}, factory_role: {user.factory_role}, role: {user.role}")
         
+        stats = cached_task_stats('dashboard', user, lambda: self.get_stats(user, start_of_month))
+        return Response(stats)
+
+    def get_stats(self, user, start_of_month):
+        task_counts = {
+            'completed': Count('id', filter=Q(status='DONE', completed_at__gte=start_of_month)),
+            'inProgress': Count('id', filter=Q(status='IN_PROGRESS')),
+        }
+
         if user.factory_role == "top_management":
-            logger.info("[Reports DashboardStats] Factory top management - showing office stats")
-            
-            office_user_ids = User.objects.filter(
+            office_users = User.objects.filter(
                 factory_role__isnull=True,
                 role__isnull=False,
                 is_active=True
             ).exclude(
                 role__in=['admin', 'ceo']
-            ).values_list('id', flat=True)
-            
-            completed_tasks_count = Task.objects.filter(
-                assignee_id__in=office_user_ids,
-                status='DONE', 
-                completed_at__gte=start_of_month
-            ).count()
-
-            in_progress_tasks_count = Task.objects.filter(
-                assignee_id__in=office_user_ids,
-                status='IN_PROGRESS'
-            ).count()
-
-            active_users_count = len(office_user_ids)
-            
-            logger.info(f"[Reports DashboardStats] Factory TM stats - completed: {completed_tasks_count}, in_progress: {in_progress_tasks_count}, users: {active_users_count}")
+            )
+            stats = Task.objects.filter(assignee_id__in=office_users.values('id')).aggregate(**task_counts)
+            stats['users'] = office_users.count()
         
         elif user.role == 'admin':
-            completed_tasks_count = Task.objects.filter(
-                status='DONE', 
-                completed_at__gte=start_of_month
-            ).count()
-
-            in_progress_tasks_count = Task.objects.filter(status='IN_PROGRESS').count()
-            active_users_count = User.objects.filter(is_active=True).count()
+            stats = Task.objects.aggregate(**task_counts)
+            stats['users'] = User.objects.filter(is_active=True).count()
         
         else:
-            subordinate_ids = user.get_subordinates().values_list('id', flat=True)
-            visible_user_ids = list(subordinate_ids) + [user.id]
-            
-            completed_tasks_count = Task.objects.filter(
-                assignee_id__in=visible_user_ids,
-                status='DONE', 
-                completed_at__gte=start_of_month
-            ).count()
+            visible_user_ids = UserVisibility.objects.filter(viewer=user).values('visible_user_id')
+            stats = Task.objects.filter(assignee_id__in=visible_user_ids).aggregate(**task_counts)
+            stats['users'] = User.objects.filter(id__in=visible_user_ids, is_active=True).count()
 
-            in_progress_tasks_count = Task.objects.filter(
-                assignee_id__in=visible_user_ids,
-                status='IN_PROGRESS'
-            ).count()
-            
-            active_users_count = User.objects.filter(id__in=visible_user_ids, is_active=True).count()
-
-        stats = {
-            'completed': completed_tasks_count,
-            'inProgress': in_progress_tasks_count,
-            'users': active_users_count,
-        }
-        return Response(stats)
+        return stats
 
 
 class UserListView(generics.ListAPIView):
@@ -153,7 +135,6 @@ class UserListView(generics.ListAPIView):
             logger.info(f"[Reports UserList] Factory TM users count: {queryset.count()}")
             return queryset
         
-        subordinate_ids = user.get_subordinates().values_list('id', flat=True)
-        visible_user_ids = list(subordinate_ids) + [user.id]
+        visible_user_ids = UserVisibility.objects.filter(viewer=user).values('visible_user_id')
 
         return User.objects.filter(id__in=visible_user_ids, is_active=True).order_by('first_name')
\ No newline at end of file
@@ -1,7 +1,8 @@
 from django_filters import rest_framework as filters
-from django.db.models import Q, F
+from django.db.models import Q
 from django.utils import timezone
 from .models import Task
+from .search import search_tasks
 
 STATUS_CHOICES = Task.STATUS_CHOICES 
 
@@ -15,6 +16,7 @@ class TaskFilter(filters.FilterSet):
     search = filters.CharFilter(method='filter_by_search', label="Search in title and description")
     exclude_assignee = filters.NumberFilter(method='filter_exclude_assignee', label="Exclude assignee by ID")
     overdue = filters.BooleanFilter(method='filter_overdue', label='Gecikmiş tapşırıqlar')
+    q = filters.CharFilter(method='filter_full_text', label='Tam mətn axtarışı')
 
 
     class Meta:
@@ -27,8 +29,14 @@ class TaskFilter(filters.FilterSet):
             'start_date_after',
             'due_date_before',
             'search',
+            'q',
             'exclude_assignee',
-            'overdue'
+            'overdue',
+            'has_self_eval',
+            'has_superior_eval',
+            'has_tm_eval',
+            'is_overdue',
+            'completed_late',
         ]
     
     def filter_by_search(self, queryset, name, value):
@@ -36,6 +44,9 @@ class TaskFilter(filters.FilterSet):
             Q(title__icontains=value) | Q(description__icontains=value)
         )
     
+    def filter_full_text(self, queryset, name, value):
+        return search_tasks(queryset, value)
+
     def filter_exclude_assignee(self, queryset, name, value):
         try:
             return queryset.exclude(assignee__id=int(value))
@@ -47,8 +58,7 @@ class TaskFilter(filters.FilterSet):
             today = timezone.now().date()
             start_of_month = today.replace(day=1)
             
-            overdue_not_completed = Q(due_date__lt=today, status__in=['PENDING', 'TODO', 'IN_PROGRESS'])
-            late_completed_this_month = Q(completed_at__gte=start_of_month, completed_at__date__gt=F('due_date'))
+            late_completed_this_month = Q(completed_late=True, completed_at__gte=start_of_month)
             
-            return queryset.filter(overdue_not_completed | late_completed_this_month).distinct()
+            return queryset.filter(Task.overdue_filter(today) | late_completed_this_month)
         return queryset
\ No newline at end of file
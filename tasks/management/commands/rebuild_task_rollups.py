@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tasks.models import TaskMonthlyRollup
+
+
+class Command(BaseCommand):
+    help = 'Aylıq tapşırıq statistikası (TaskMonthlyRollup) cədvəlini tapşırıqlardan yenidən qurur'
+
+    def handle(self, *args, **options):
+        rows = TaskMonthlyRollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"TaskMonthlyRollup yeniləndi: {rows} sətir."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from tasks.models import Task
+from tasks.search import full_text_enabled, update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Tapşırıqların tam mətn axtarış vektorlarını (search_vector) yenidən hesablayır'
+
+    def handle(self, *args, **options):
+        if not full_text_enabled():
+            self.stdout.write(self.style.WARNING("Tam mətn axtarışı yalnız PostgreSQL-də dəstəklənir."))
+            return
+
+        updated = update_search_vectors(Task.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"{updated} tapşırığın axtarış vektoru yeniləndi."))
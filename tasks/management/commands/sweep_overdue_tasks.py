@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Gecikmiş (is_overdue) və gec tamamlanmış (completed_late) tapşırıq bayraqlarını yeniləyir'
+
+    def handle(self, *args, **options):
+        overdue, cleared, late, on_time = Task.refresh_deadline_flags()
+        self.stdout.write(self.style.SUCCESS(
+            f"Gecikmiş: {overdue} əlavə, {cleared} silindi. Gec tamamlanmış: {late} əlavə, {on_time} silindi."
+        ))
@@ -1,8 +1,14 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.core.cache import cache
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from accounts.hierarchy import get_org_graph, resolve_evaluation_configs
+from .utils import DEADLINE_FLAGS_CACHE_KEY, bump_task_version
+from .search import SearchVectorIndex, update_search_vectors
 
 class Task(models.Model):
     STATUS_CHOICES = [
@@ -37,15 +43,267 @@ class Task(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True, verbose_name="Tamamlanma tarixi")
-    
+
+    superior_evaluator = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="routed_superior_tasks"
+    )
+    tm_evaluator = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="routed_tm_tasks"
+    )
+    requires_self_evaluation = models.BooleanField(default=False)
+    is_dual_evaluation = models.BooleanField(default=False)
+    evaluation_routed_at = models.DateTimeField(null=True, blank=True)
+
+    has_self_eval = models.BooleanField(default=False)
+    has_superior_eval = models.BooleanField(default=False)
+    has_tm_eval = models.BooleanField(default=False)
+    final_score = models.PositiveIntegerField(null=True, blank=True)
+
+    is_overdue = models.BooleanField(default=False)
+    completed_late = models.BooleanField(default=False)
+
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["assignee", "status", "has_self_eval"]),
+            models.Index(fields=["assignee", "status", "has_superior_eval"]),
+            models.Index(fields=["status", "has_self_eval", "has_superior_eval"]),
+            models.Index(fields=["-created_at", "-id"]),
+            SearchVectorIndex(fields=["search_vector"], name="task_search_vector_idx"),
+            models.Index(fields=["assignee", "due_date"], condition=Q(is_overdue=True), name="task_overdue_idx"),
+            models.Index(
+                fields=["assignee", "completed_at"], condition=Q(completed_late=True), name="task_completed_late_idx"
+            ),
+            models.Index(
+                fields=["due_date"],
+                condition=Q(is_overdue=False, status__in=["PENDING", "TODO", "IN_PROGRESS"]),
+                name="task_overdue_candidate_idx"
+            ),
+        ]
+
+    OPEN_STATUSES = ["PENDING", "TODO", "IN_PROGRESS"]
+
+    ROUTING_FIELDS = [
+        'superior_evaluator', 'tm_evaluator', 'requires_self_evaluation',
+        'is_dual_evaluation', 'evaluation_routed_at'
+    ]
+
+    def freeze_evaluation_routing(self):
+        self.apply_evaluation_routing(self.assignee.get_evaluation_config_task())
+
+    def apply_evaluation_routing(self, eval_config, routed_at=None):
+        self.superior_evaluator_id = eval_config['superior_evaluator_id']
+        self.tm_evaluator_id = eval_config['tm_evaluator_id']
+        self.requires_self_evaluation = eval_config['requires_self']
+        self.is_dual_evaluation = eval_config['is_dual_evaluation']
+        self.evaluation_routed_at = routed_at or timezone.now()
+
+    def apply_deadline_flags(self, today=None):
+        today = today or timezone.localdate()
+        self.is_overdue = bool(
+            self.status in self.OPEN_STATUSES and self.due_date and self.due_date < today
+        )
+        self.completed_late = bool(
+            self.completed_at and self.due_date and timezone.localtime(self.completed_at).date() > self.due_date
+        )
+
+    @classmethod
+    def overdue_filter(cls, today=None):
+        cls.ensure_deadline_flags(today)
+        return Q(is_overdue=True)
+
+    @classmethod
+    def ensure_deadline_flags(cls, today=None):
+        today = today or timezone.localdate()
+        if cache.get(DEADLINE_FLAGS_CACHE_KEY) != today.isoformat():
+            cls.refresh_deadline_flags(today)
+
+    @classmethod
+    def refresh_deadline_flags(cls, today=None):
+        today = today or timezone.localdate()
+        with transaction.atomic():
+            overdue = cls.objects.filter(
+                is_overdue=False, status__in=cls.OPEN_STATUSES, due_date__lt=today
+            ).update(is_overdue=True)
+            cleared = cls.objects.filter(is_overdue=True).exclude(
+                status__in=cls.OPEN_STATUSES, due_date__lt=today
+            ).update(is_overdue=False)
+            late = cls.objects.filter(
+                completed_late=False, completed_at__date__gt=F('due_date')
+            ).update(completed_late=True)
+            on_time = cls.objects.filter(completed_late=True).exclude(
+                completed_at__date__gt=F('due_date')
+            ).update(completed_late=False)
+        transaction.on_commit(lambda: cache.set(DEADLINE_FLAGS_CACHE_KEY, today.isoformat(), None))
+        if overdue or cleared or late or on_time:
+            transaction.on_commit(bump_task_version)
+        return overdue, cleared, late, on_time
+
+    @classmethod
+    def create_many(cls, tasks):
+        done_tasks = [task for task in tasks if task.status == 'DONE']
+        if done_tasks:
+            now = timezone.now()
+            configs = resolve_evaluation_configs({task.assignee_id for task in done_tasks})
+            for task in done_tasks:
+                task.completed_at = task.completed_at or now
+                task.apply_evaluation_routing(configs[task.assignee_id], now)
+
+        today = timezone.localdate()
+        for task in tasks:
+            task.apply_deadline_flags(today)
+
+        with transaction.atomic():
+            created = cls.objects.bulk_create(tasks)
+            deltas = {}
+            for task in created:
+                task._loaded_workflow = (task.status, task.assignee_id)
+                task._loaded_rollup = task.rollup_key()
+                deltas[task._loaded_rollup] = deltas.get(task._loaded_rollup, 0) + 1
+            TaskMonthlyRollup.apply_deltas(deltas)
+            update_search_vectors(cls.objects.filter(pk__in=[task.pk for task in created]))
+
+        if done_tasks:
+            from kpis.models import EvaluationWorkItem
+            EvaluationWorkItem.rebuild_for_tasks(done_tasks)
+
+        transaction.on_commit(bump_task_version)
+        return created
+
+    def get_evaluation_config(self, evaluatee=None):
+        if evaluatee is not None and evaluatee.pk != self.assignee_id:
+            return evaluatee.get_evaluation_config_task()
+
+        if self.evaluation_routed_at is None:
+            return (evaluatee or self.assignee).get_evaluation_config_task()
+
+        return get_org_graph().routed_evaluation_config(
+            self.requires_self_evaluation,
+            self.superior_evaluator_id,
+            self.tm_evaluator_id,
+            self.is_dual_evaluation
+        )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_workflow = (instance.__dict__.get('status'), instance.__dict__.get('assignee_id'))
+        instance._loaded_rollup = instance.rollup_key()
+        instance._loaded_search_text = (instance.__dict__.get('title'), instance.__dict__.get('description'))
+        return instance
+
+    def rollup_key(self):
+        values = (
+            self.__dict__.get('assignee_id'), self.__dict__.get('created_at'),
+            self.__dict__.get('status'), self.__dict__.get('priority')
+        )
+        if None in values:
+            return None
+        assignee_id, created_at, task_status, priority = values
+        return (assignee_id, TaskMonthlyRollup.month_for(created_at), task_status, priority)
+
     def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_workflow', None)
+
         if self.status == 'DONE' and not self.completed_at:
             self.completed_at = timezone.now()
-        super().save(*args, **kwargs)
+            self.freeze_evaluation_routing()
+        elif self.completed_at and loaded is not None and loaded[1] != self.assignee_id:
+            self.freeze_evaluation_routing()
+
+        self.apply_deadline_flags()
+
+        was_done = loaded is not None and loaded[0] == 'DONE'
+        is_done = self.status == 'DONE'
+        workflow_changed = (was_done or is_done) and (
+            loaded is None or loaded != (self.status, self.assignee_id)
+        )
+
+        previous_rollup = None if self._state.adding else getattr(self, '_loaded_rollup', None)
+        search_text_changed = getattr(self, '_loaded_search_text', None) != (self.title, self.description)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            current_rollup = self.rollup_key()
+            if previous_rollup != current_rollup:
+                TaskMonthlyRollup.apply_deltas({previous_rollup: -1, current_rollup: 1})
+            if search_text_changed:
+                update_search_vectors(Task.objects.filter(pk=self.pk))
+
+        self._loaded_workflow = (self.status, self.assignee_id)
+        self._loaded_rollup = current_rollup
+        self._loaded_search_text = (self.title, self.description)
+
+        if workflow_changed:
+            from kpis.models import EvaluationWorkItem
+            EvaluationWorkItem.rebuild_for_tasks([self])
+
+        transaction.on_commit(bump_task_version)
 
     def __str__(self):
         return f"{self.title} -> {self.assignee.username}"
     
+class TaskMonthlyRollup(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="task_rollups"
+    )
+    month = models.DateField()
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    priority = models.CharField(max_length=20, choices=Task.PRIORITY_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "month", "status", "priority")
+        indexes = [
+            models.Index(fields=["status", "month"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m} {self.status}/{self.priority}: {self.count}"
+
+    @staticmethod
+    def month_for(value):
+        return timezone.localtime(value).date().replace(day=1)
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        deltas = {key: delta for key, delta in deltas.items() if key is not None and delta}
+        if not deltas:
+            return
+
+        cls.objects.bulk_create(
+            [
+                cls(user_id=user_id, month=month, status=task_status, priority=priority)
+                for (user_id, month, task_status, priority), delta in deltas.items() if delta > 0
+            ],
+            ignore_conflicts=True
+        )
+        for (user_id, month, task_status, priority), delta in deltas.items():
+            cls.objects.filter(
+                user_id=user_id, month=month, status=task_status, priority=priority
+            ).update(count=models.F('count') + delta)
+
+    @classmethod
+    def rebuild(cls):
+        counts = {}
+        rows = Task.objects.values_list('assignee_id', 'created_at', 'status', 'priority').iterator(chunk_size=5000)
+        for assignee_id, created_at, task_status, priority in rows:
+            key = (assignee_id, cls.month_for(created_at), task_status, priority)
+            counts[key] = counts.get(key, 0) + 1
+
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                [
+                    cls(user_id=user_id, month=month, status=task_status, priority=priority, count=count)
+                    for (user_id, month, task_status, priority), count in counts.items()
+                ],
+                batch_size=1000
+            )
+        return len(counts)
+
+
 class CalendarNote(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
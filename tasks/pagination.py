@@ -1,7 +1,15 @@
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.settings import api_settings
+from reports.pagination import KeysetPagination
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 10
     
     page_size_query_param = 'page_size'
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+
+
+class TaskPagination(KeysetPagination):
+    page_size = 10
+    ordering_query_params = (api_settings.ORDERING_PARAM, 'q')
+    fallback_class = CustomPageNumberPagination
@@ -0,0 +1,35 @@
+from accounts.hierarchy import get_org_graph
+
+ALL_TASKS = 'all'
+NO_TASKS = 'none'
+
+
+def task_edit_scope(user):
+    if user.role == "admin":
+        return ALL_TASKS
+
+    if user.factory_role == "top_management":
+        return NO_TASKS
+
+    return get_org_graph().subordinate_ids(user)
+
+
+def can_modify_task(user, task, scope=None):
+    if scope is None:
+        scope = task_edit_scope(user)
+
+    if scope == ALL_TASKS:
+        return True
+
+    if scope == NO_TASKS:
+        return False
+
+    if task.created_by_id == user.pk or task.assignee_id == user.pk:
+        return True
+
+    return task.assignee_id in scope
+
+
+def editable_task_ids(user, tasks):
+    scope = task_edit_scope(user)
+    return {task.pk for task in tasks if can_modify_task(user, task, scope)}
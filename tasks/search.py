@@ -0,0 +1,91 @@
+import re
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, Index, IntegerField, Q, Value, When
+from django.utils.html import escape
+
+SEARCH_TERM_RE = re.compile(r'\w+')
+HEADLINE_START = '\x02'
+HEADLINE_STOP = '\x03'
+
+
+class SearchVectorIndex(GinIndex):
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Index.create_sql(self, model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+
+def full_text_enabled():
+    return connection.vendor == 'postgresql'
+
+
+def task_search_vector():
+    return (
+        SearchVector('title', weight='A', config=settings.TASK_SEARCH_CONFIG) +
+        SearchVector('description', weight='B', config=settings.TASK_SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    if not full_text_enabled():
+        return 0
+    return queryset.update(search_vector=task_search_vector())
+
+
+def search_terms(text):
+    return SEARCH_TERM_RE.findall(text or '')
+
+
+def search_tasks(queryset, text):
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+
+    if full_text_enabled():
+        query = SearchQuery(
+            ' & '.join(terms[:-1] + [f'{terms[-1]}:*']),
+            search_type='raw',
+            config=settings.TASK_SEARCH_CONFIG
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query),
+            search_headline=SearchHeadline(
+                'description', query, config=settings.TASK_SEARCH_CONFIG,
+                start_sel=HEADLINE_START, stop_sel=HEADLINE_STOP, max_fragments=2
+            ),
+        ).order_by('-search_rank', '-created_at', '-id')
+
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    return queryset.annotate(
+        search_rank=Case(
+            When(title__icontains=terms[0], then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField()
+        ),
+    ).order_by('-search_rank', '-created_at', '-id')
+
+
+def headline_html(headline):
+    if not headline:
+        return headline
+    return escape(headline).replace(HEADLINE_START, '<mark>').replace(HEADLINE_STOP, '</mark>')
+
+
+def highlight(text, terms):
+    if not text or not terms:
+        return None
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    parts = []
+    position = 0
+    for match in pattern.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        parts.append(f'<mark>{escape(match.group(0))}</mark>')
+        position = match.end()
+    if not position:
+        return None
+    parts.append(escape(text[position:]))
+    return ''.join(parts)
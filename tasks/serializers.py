@@ -1,8 +1,13 @@
 from rest_framework import serializers
 from .models import Task, CalendarNote
 from accounts.models import User
+from accounts.hierarchy import resolve_evaluation_configs
+from django.db.models import Prefetch
+from kpis.models import KPIEvaluation
 from kpis.serializers import KPIEvaluationSerializer
-from accounts.serializers import UserSerializer
+from accounts.serializers import UserSerializer, ProfilePhotoThumbnailsField
+from .permissions import can_modify_task, task_edit_scope
+from .search import headline_html, highlight, search_terms
 
 class TaskSerializer(serializers.ModelSerializer):
     assignee_details = serializers.StringRelatedField(source='assignee', read_only=True)
@@ -18,6 +23,8 @@ class TaskSerializer(serializers.ModelSerializer):
 
     evaluations_list = serializers.SerializerMethodField()
     evaluation_status = serializers.SerializerMethodField()
+    can_edit = serializers.SerializerMethodField()
+    search_headline = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
@@ -42,30 +49,130 @@ class TaskSerializer(serializers.ModelSerializer):
             'assignee_obj',
             'created_by_obj', 
             'evaluations_list', 'evaluation_status',
-            
+            'has_self_eval',
+            'has_superior_eval',
+            'has_tm_eval',
+            'final_score',
+            'is_overdue',
+            'completed_late',
+            'can_edit',
+            'search_headline',
         ]
         read_only_fields = [
             'created_by',
             'created_by_details',
             'approved',
             'created_at',
+            'has_self_eval',
+            'has_superior_eval',
+            'has_tm_eval',
+            'final_score',
+            'is_overdue',
+            'completed_late',
         ]
 
+    EXPANDABLE_FIELDS = ('assignee_obj', 'created_by_obj', 'evaluations_list', 'evaluations')
+    EVALUATION_FIELDS = ('evaluations_list', 'evaluations')
+
+    def __init__(self, *args, compact=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expand = None
+
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+
+        params = request.query_params
+        if not compact and 'fields' not in params and 'expand' not in params:
+            return
+
+        self.expand = self.field_names(params, 'expand', self.EXPANDABLE_FIELDS)
+        requested = self.field_names(params, 'fields', self.fields.keys())
+
+        for name in list(self.fields):
+            if name in self.expand:
+                continue
+            if requested and name not in requested:
+                self.fields.pop(name)
+            elif name in self.EVALUATION_FIELDS and name not in requested:
+                self.fields.pop(name)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        return super().many_init(*args, compact=True, **kwargs)
+
+    @staticmethod
+    def field_names(params, param, allowed):
+        names = {name.strip() for name in params.get(param, '').split(',') if name.strip()}
+        unknown = names - set(allowed)
+        if unknown:
+            raise serializers.ValidationError({param: f"Naməlum sahələr: {', '.join(sorted(unknown))}."})
+        return names
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        user_relations = [
+            'position', 'factory_position', 'department',
+            'managed_department', 'led_department', 'ceo_department',
+        ]
+        return queryset.select_related(
+            *[f'assignee__{name}' for name in user_relations],
+            *[f'created_by__{name}' for name in user_relations],
+        ).prefetch_related(
+            'assignee__top_managed_departments',
+            'created_by__top_managed_departments',
+            Prefetch(
+                'evaluations',
+                queryset=KPIEvaluation.objects.select_related('task', 'evaluator__position', 'evaluatee__position')
+            ),
+        )
+
+    def get_user_representation(self, user, field_name):
+        if not user:
+            return None
+        if self.expand is None or field_name in self.expand:
+            return UserSerializer(user, context=self.context).data
+        return TaskAssigneeSerializer(user, context=self.context).data
+
     def get_assignee_obj(self, obj):
-        if obj.assignee:
-            return UserSerializer(obj.assignee, context=self.context).data
-        return None
+        return self.get_user_representation(obj.assignee, 'assignee_obj')
 
     def get_created_by_obj(self, obj):
-        if obj.created_by:
-            return UserSerializer(obj.created_by, context=self.context).data
-        return None
+        return self.get_user_representation(obj.created_by, 'created_by_obj')
     
     def get_evaluations_list(self, obj):
-        from kpis.serializers import KPIEvaluationSerializer
-        evaluations = obj.evaluations.all().select_related('evaluator', 'evaluatee')
-        return KPIEvaluationSerializer(evaluations, many=True).data
+        return KPIEvaluationSerializer(obj.evaluations.all(), many=True).data
     
+    def get_can_edit(self, obj):
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return False
+        if 'task_edit_scope' not in self.context:
+            self.context['task_edit_scope'] = task_edit_scope(request.user)
+        return can_modify_task(request.user, obj, self.context['task_edit_scope'])
+
+    def get_search_headline(self, obj):
+        if hasattr(obj, 'search_headline'):
+            return headline_html(obj.search_headline)
+        if not hasattr(obj, 'search_rank'):
+            return None
+        request = self.context.get('request')
+        terms = search_terms(request.query_params.get('q')) if request else []
+        return highlight(obj.description, terms) or highlight(obj.title, terms)
+
+    def get_evaluation_config(self, obj):
+        if obj.evaluation_routed_at is not None:
+            return obj.get_evaluation_config()
+
+        configs = self.context.setdefault('evaluation_configs', {})
+        if obj.assignee_id not in configs:
+            tasks = [obj]
+            if isinstance(self.parent, serializers.ListSerializer) and self.parent.instance is not None:
+                tasks = self.parent.instance
+            assignee_ids = {task.assignee_id for task in tasks if task.evaluation_routed_at is None} | {obj.assignee_id}
+            configs.update(resolve_evaluation_configs(assignee_ids - configs.keys()))
+        return configs[obj.assignee_id]
+
     def get_evaluation_status(self, obj):
         evaluations = obj.evaluations.all()
         
@@ -75,8 +182,8 @@ class TaskSerializer(serializers.ModelSerializer):
         
         final_score = None
         
-        if obj.assignee:
-            eval_config = obj.assignee.get_evaluation_config_task()
+        if obj.assignee_id:
+            eval_config = self.get_evaluation_config(obj)
             
             if eval_config.get('is_dual_evaluation'):
                 top_eval = next(
@@ -103,9 +210,10 @@ class TaskSerializer(serializers.ModelSerializer):
     
 class TaskAssigneeSerializer(serializers.ModelSerializer):
     position_name = serializers.CharField(source='position.name', read_only=True, default=None)
+    profile_photo_thumbnails = ProfilePhotoThumbnailsField()
     class Meta:
         model = User
-        fields = ['id', 'first_name', 'last_name', 'position_name', 'profile_photo']
+        fields = ['id', 'first_name', 'last_name', 'position_name', 'profile_photo', 'profile_photo_thumbnails']
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -0,0 +1,11 @@
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Task, TaskMonthlyRollup
+from .utils import bump_task_version
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    TaskMonthlyRollup.apply_deltas({getattr(instance, '_loaded_rollup', None) or instance.rollup_key(): -1})
+    transaction.on_commit(bump_task_version)
@@ -1,3 +1,327 @@
+import io
+import unittest
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import Department, User
+from kpis.models import EvaluationWorkItem
+from reports.models import ActivityLog
+from .models import Task, TaskMonthlyRollup
+from .permissions import can_modify_task, editable_task_ids
+from .search import HEADLINE_START, HEADLINE_STOP, headline_html
+from .serializers import TaskAssigneeSerializer
+
+
+def make_user(username, **fields):
+    return User.objects.create(username=username, email=f"{username}@example.com", **fields)
+
+
+class TaskTestCase(TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Satış')
+        self.manager = make_user('manager', role='manager', department=self.department)
+        self.department.manager = self.manager
+        self.department.save()
+        self.employee = make_user('employee', role='employee', department=self.department)
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def create_task(self, **fields):
+        fields.setdefault('title', 'Hesabat')
+        fields.setdefault('assignee', self.employee)
+        fields.setdefault('created_by', self.manager)
+        return Task.objects.create(**fields)
+
+
+class TaskFieldSelectionTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = self.create_task()
+        self.compact_user_fields = set(TaskAssigneeSerializer.Meta.fields)
+
+    def get_results(self, query=''):
+        response = self.client.get(f'/api/tasks/tasks/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_list_uses_compact_users_and_skips_evaluations_by_default(self):
+        [task] = self.get_results()
+        self.assertEqual(set(task['assignee_obj']), self.compact_user_fields)
+        self.assertEqual(set(task['created_by_obj']), self.compact_user_fields)
+        self.assertNotIn('evaluations_list', task)
+        self.assertIn('evaluation_status', task)
+
+    def test_detail_keeps_the_full_representation(self):
+        response = self.client.get(f'/api/tasks/tasks/{self.task.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('all_departments', response.data['assignee_obj'])
+        self.assertEqual(response.data['evaluations_list'], [])
+
+    def test_expand_restores_full_users(self):
+        [task] = self.get_results('?expand=assignee_obj')
+        self.assertIn('all_departments', task['assignee_obj'])
+        self.assertEqual(set(task['created_by_obj']), self.compact_user_fields)
+
+    def test_requested_fields_are_honoured_without_expand(self):
+        [task] = self.get_results('?fields=id,evaluations_list')
+        self.assertEqual(task, {'id': self.task.pk, 'evaluations_list': []})
+
+    def test_unknown_field_names_are_rejected(self):
+        response = self.client.get('/api/tasks/tasks/?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+
+        response = self.client.get('/api/tasks/tasks/?expand=title')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.data)
+
+
+class TaskRollupTests(TaskTestCase):
+    def rollup_counts(self):
+        return {
+            (row.user_id, row.month, row.status, row.priority): row.count
+            for row in TaskMonthlyRollup.objects.filter(count__gt=0)
+        }
+
+    def assertRollupsMatchTasks(self):
+        counts = self.rollup_counts()
+        TaskMonthlyRollup.rebuild()
+        self.assertEqual(counts, self.rollup_counts())
+
+    def test_rollups_follow_task_changes(self):
+        task = self.create_task()
+        self.create_task(priority='HIGH')
+        self.assertRollupsMatchTasks()
+
+        task.status = 'DONE'
+        task.save()
+        self.assertRollupsMatchTasks()
+
+        task.assignee = self.manager
+        task.save()
+        self.assertRollupsMatchTasks()
+
+        Task.create_many([Task(title='Toplu', assignee=self.employee, created_by=self.manager)])
+        task.delete()
+        self.assertRollupsMatchTasks()
+
+    def test_monthly_stats_keep_the_180_day_cutoff(self):
+        self.manager.role = 'admin'
+        self.manager.save()
+        cutoff = timezone.now() - timedelta(days=180)
+        created = [
+            cutoff - timedelta(days=40), cutoff - timedelta(hours=1), cutoff + timedelta(hours=1),
+            cutoff + timedelta(days=45), timezone.now() - timedelta(days=1),
+        ]
+        for created_at in created:
+            task = self.create_task(status='DONE')
+            Task.objects.filter(pk=task.pk).update(created_at=created_at)
+        self.create_task(status='TODO')
+        TaskMonthlyRollup.rebuild()
+
+        expected = Counter(
+            TaskMonthlyRollup.month_for(created_at).strftime('%Y-%m') for created_at in created if created_at >= cutoff
+        )
+        response = self.client.get('/api/tasks/stats/monthly/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({item['month']: item['count'] for item in response.data}, dict(expected))
+        self.assertEqual([item['month'] for item in response.data], sorted(expected))
+
+
+class OverdueFlagTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.today = timezone.localdate()
+
+    def overdue_ids(self, today):
+        return set(Task.objects.filter(Task.overdue_filter(today)).values_list('pk', flat=True))
+
+    def test_save_keeps_the_flags_current(self):
+        task = self.create_task(due_date=self.today - timedelta(days=1))
+        self.assertTrue(task.is_overdue)
+        self.assertEqual(self.overdue_ids(self.today), {task.pk})
+
+        task.status = 'DONE'
+        task.save()
+        task = Task.objects.get(pk=task.pk)
+        self.assertFalse(task.is_overdue)
+        self.assertTrue(task.completed_late)
+        self.assertEqual(self.overdue_ids(self.today), set())
+
+    def test_flags_are_refreshed_when_the_day_changes(self):
+        task = self.create_task(due_date=self.today)
+        done = self.create_task(due_date=self.today, status='DONE')
+        self.assertEqual(self.overdue_ids(self.today), set())
+        self.assertFalse(Task.objects.get(pk=task.pk).is_overdue)
+
+        tomorrow = self.today + timedelta(days=1)
+        self.assertEqual(self.overdue_ids(tomorrow), {task.pk})
+        self.assertTrue(Task.objects.get(pk=task.pk).is_overdue)
+        self.assertFalse(Task.objects.get(pk=done.pk).is_overdue)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.overdue_ids(tomorrow)
+        with mock.patch.object(Task, 'refresh_deadline_flags') as refresh:
+            self.assertEqual(self.overdue_ids(tomorrow), {task.pk})
+        refresh.assert_not_called()
+
+    def test_sweep_command_updates_stale_flags(self):
+        task = self.create_task(due_date=self.today - timedelta(days=2))
+        Task.objects.filter(pk=task.pk).update(is_overdue=False)
+
+        call_command('sweep_overdue_tasks', stdout=io.StringIO())
+
+        self.assertTrue(Task.objects.get(pk=task.pk).is_overdue)
+
+
+class MultiAssigneeCreateTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.colleague = make_user('colleague', role='employee', department=self.department)
+        self.outsider = make_user('outsider', role='employee')
+
+    def post(self, assignee, **fields):
+        return self.client.post('/api/tasks/tasks/', {'title': 'Hesabat', 'assignee': assignee, **fields}, format='json')
+
+    def test_list_creates_one_task_per_allowed_assignee(self):
+        response = self.post([self.employee.pk, self.colleague.pk, self.employee.pk, self.outsider.pk, 'x'])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([task['assignee_obj']['id'] for task in response.data], [self.employee.pk, self.colleague.pk])
+        tasks = Task.objects.order_by('pk')
+        self.assertEqual([task.assignee_id for task in tasks], [self.employee.pk, self.colleague.pk])
+        self.assertEqual(
+            set(ActivityLog.objects.filter(action_type=ActivityLog.ActionTypes.TASK_CREATED).values_list('target_task_id', flat=True)),
+            {task.pk for task in tasks}
+        )
+        self.assertEqual(TaskMonthlyRollup.objects.filter(count=1).count(), 2)
+
+    def test_single_id_returns_one_object(self):
+        response = self.post(self.employee.pk)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['assignee_obj']['id'], self.employee.pk)
+
+    def test_no_allowed_assignee_is_rejected(self):
+        response = self.post([self.outsider.pk])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Task.objects.exists())
+
+    def test_done_tasks_get_routing_and_work_items(self):
+        response = self.post([self.employee.pk, self.colleague.pk], status='DONE')
+        self.assertEqual(response.status_code, 201)
+
+        for task in Task.objects.all():
+            self.assertIsNotNone(task.completed_at)
+            self.assertEqual(task.superior_evaluator_id, self.manager.pk)
+        self.assertEqual(
+            set(EvaluationWorkItem.objects.values_list('evaluatee_id', 'evaluation_type')),
+            {(self.employee.pk, 'SELF'), (self.employee.pk, 'SUPERIOR'), (self.colleague.pk, 'SELF'), (self.colleague.pk, 'SUPERIOR')}
+        )
+
+
+class TaskEditPermissionTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_department = Department.objects.create(name='Maliyyə')
+        self.other_manager = make_user('other-manager', role='manager', department=self.other_department)
+        self.other_department.manager = self.other_manager
+        self.other_department.save()
+        self.admin = make_user('admin', role='admin')
+        self.factory_director = make_user('factory-director', factory_role='top_management')
+        self.task = self.create_task(created_by=self.admin)
+
+    def test_edit_rights_follow_the_org_graph(self):
+        self.assertTrue(can_modify_task(self.admin, self.task))
+        self.assertTrue(can_modify_task(self.manager, self.task))
+        self.assertTrue(can_modify_task(self.employee, self.task))
+        self.assertFalse(can_modify_task(self.other_manager, self.task))
+        self.assertFalse(can_modify_task(self.factory_director, self.task))
+
+        own_task = self.create_task(assignee=self.other_manager, created_by=self.other_manager)
+        self.assertEqual(editable_task_ids(self.other_manager, [self.task, own_task]), {own_task.pk})
+        self.assertEqual(editable_task_ids(self.manager, [self.task, own_task]), {self.task.pk})
+
+    def test_update_endpoint_and_can_edit_field(self):
+        self.client.force_authenticate(self.factory_director)
+        response = self.client.patch(f'/api/tasks/tasks/{self.task.pk}/', {'title': 'Yeni'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(self.manager)
+        response = self.client.patch(f'/api/tasks/tasks/{self.task.pk}/', {'title': 'Yeni'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Task.objects.get(pk=self.task.pk).title, 'Yeni')
+
+        response = self.client.get('/api/tasks/tasks/?fields=id,can_edit')
+        self.assertEqual(response.data['results'], [{'id': self.task.pk, 'can_edit': True}])
+
+
+class HomeStatsTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        yesterday = timezone.localdate() - timedelta(days=1)
+        for status, due_date in [('PENDING', None), ('IN_PROGRESS', None), ('IN_PROGRESS', yesterday), ('CANCELLED', None)]:
+            self.create_task(status=status, due_date=due_date)
+        self.create_task(status='PENDING', assignee=self.manager)
+
+    def get_stats(self):
+        response = self.client.get('/api/tasks/home-stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counters_are_cached_until_a_task_changes(self):
+        expected = {'pending': 1, 'in_progress': 2, 'cancelled': 1, 'overdue': 1}
+        self.assertEqual(self.get_stats(), expected)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_stats(), expected)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_task(status='PENDING')
+        self.assertEqual(self.get_stats(), {**expected, 'pending': 2})
+
+
+class TaskSearchTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.in_description = self.create_task(title='Aylıq plan', description='Satış <b>hesabatı</b> hazırlanmalıdır')
+        self.in_title = self.create_task(title='Satış hesabatı', description='Rüblük')
+        self.unrelated = self.create_task(title='Anbar sayımı', description='Satış')
+
+    def search(self, query, extra=''):
+        response = self.client.get(f'/api/tasks/tasks/?q={query}{extra}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_all_terms_must_match_and_title_matches_rank_first(self):
+        results = self.search('satış hesab')
+        self.assertEqual([task['id'] for task in results], [self.in_title.pk, self.in_description.pk])
+
+    def test_highlights_escape_the_task_text(self):
+        headlines = {task['id']: task['search_headline'] for task in self.search('hesab', '&fields=id,search_headline')}
+        self.assertEqual(headlines[self.in_title.pk], 'Satış <mark>hesab</mark>atı')
+        self.assertEqual(headlines[self.in_description.pk], 'Satış &lt;b&gt;<mark>hesab</mark>atı&lt;/b&gt; hazırlanmalıdır')
+
+        self.assertEqual(
+            headline_html(f"<img src=x> {HEADLINE_START}hesab{HEADLINE_STOP}"),
+            '&lt;img src=x&gt; <mark>hesab</mark>'
+        )
+
+    def test_cursor_pages_reject_a_conflicting_search_order(self):
+        response = self.client.get('/api/tasks/tasks/?cursor=&q=satış')
+        self.assertEqual(response.status_code, 400)
 
-# Create your tests here.
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'PostgreSQL tam mətn axtarışı tələb olunur')
+    def test_search_vector_follows_edits(self):
+        self.unrelated.title = 'Anbar hesabatı'
+        self.unrelated.save()
+        self.assertIn(self.unrelated.pk, [task['id'] for task in self.search('hesab')])
@@ -1,23 +1,59 @@
 import logging
+import time
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.core.signing import Signer
+from django.utils import timezone
+from accounts.hierarchy import ORG_VERSION_CACHE_KEY
+from notifications.models import NotificationEvent
+from notifications.utils import record_notification_events
 
 logger = logging.getLogger(__name__)
 
-def send_task_notification_email(task, notification_type):
-    
-    recipient = None
-    subject = ""
-    context = {}
-    template_name = ""
+TASK_VERSION_CACHE_KEY = 'tasks:version'
+DEADLINE_FLAGS_CACHE_KEY = 'tasks:deadline_flags_date'
+
+def bump_task_version():
+    cache.set(TASK_VERSION_CACHE_KEY, time.time_ns(), None)
+
+def cached_task_stats(scope, user, compute):
+    versions = cache.get_many([TASK_VERSION_CACHE_KEY, ORG_VERSION_CACHE_KEY])
+    key = (
+        f"tasks:stats:{scope}:{user.pk}:{timezone.now().date().isoformat()}:"
+        f"{versions.get(TASK_VERSION_CACHE_KEY)}:{versions.get(ORG_VERSION_CACHE_KEY)}"
+    )
+
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute()
+        cache.set(key, stats, settings.TASK_STATS_CACHE_TTL)
+    return stats
+
+TASK_NOTIFICATION_EVENTS = {
+    'new_assignment': NotificationEvent.EventType.TASK_ASSIGNED,
+    'approval_request': NotificationEvent.EventType.TASK_APPROVAL_REQUEST,
+}
+
+def task_notification_recipient(task, notification_type):
+    if notification_type == 'new_assignment':
+        return task.assignee
+
+    if notification_type == 'approval_request':
+        superior = task.created_by.get_superior()
+        if not superior:
+            logger.warning(f"ID {task.created_by.id} olan istifadəçinin təsdiq edəcək rəhbəri tapılmadı.")
+        return superior
+
+    logger.error(f"Naməlum bildiriş növü: {notification_type}")
+    return None
 
+def build_task_notification_email(task, notification_type, recipient):
     site_url = getattr(settings, "SITE_URL", "https://metrics.azlub.com/")
 
     if notification_type == 'new_assignment':
-        recipient = task.assignee
         subject = f"Yeni Tapşırıq Təyin Edildi: {task.title}"
         template_name = 'emails/new_task_assignment.html'
         context = {
@@ -26,13 +62,7 @@ def send_task_notification_email(task, notification_type):
             'site_url': site_url,
         }
 
-    elif notification_type == 'approval_request':
-        superior = task.created_by.get_superior()
-        if not superior:
-            logger.warning(f"ID {task.created_by.id} olan istifadəçinin təsdiq edəcək rəhbəri tapılmadı.")
-            return
-
-        recipient = superior
+    else:
         subject = f"Təsdiq Gözləyən Tapşırıq: {task.title}"
         template_name = 'emails/task_approval_request.html'
 
@@ -45,34 +75,42 @@ def send_task_notification_email(task, notification_type):
 
         context = {
             'task': task,
-            'superior_name': superior.get_full_name() or superior.username,
+            'superior_name': recipient.get_full_name() or recipient.username,
             'creator_name': task.created_by.get_full_name() or task.created_by.username,
             'approve_url': approve_url,
             'reject_url': reject_url,
         }
 
-    else:
-        logger.error(f"Naməlum bildiriş növü: {notification_type}")
-        return
+    html_message = render_to_string(template_name, context)
+    
+    plain_message = f"Salam, {recipient.username}. '{task.title}' adlı tapşırıqla bağlı yeni bir bildirişiniz var. Zəhmət olmasa sistemə daxil olun."
+
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=plain_message,
+        from_email=settings.EMAIL_HOST_USER,
+        to=[recipient.email],
+    )
+    message.attach_alternative(html_message, "text/html")
+    return message
 
-    if not recipient or not recipient.email:
-        logger.warning(f"ID {recipient.id} olan alıcının e-poçt ünvanı yoxdur. E-poçt göndərilmədi.")
+def render_task_notification_event(event):
+    if event.task is None:
+        return None
+    notification_type = next(
+        name for name, event_type in TASK_NOTIFICATION_EVENTS.items() if event_type == event.event_type
+    )
+    return build_task_notification_email(event.task, notification_type, event.recipient)
+
+def queue_task_notification_email(task, notification_type):
+    recipient = task_notification_recipient(task, notification_type)
+    if not recipient:
         return
 
-    try:
-        html_message = render_to_string(template_name, context)
-        
-        plain_message = f"Salam, {recipient.username}. '{task.title}' adlı tapşırıqla bağlı yeni bir bildirişiniz var. Zəhmət olmasa sistemə daxil olun."
-
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=[recipient.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        logger.info(f"'{notification_type}' tipli e-poçt uğurla {recipient.email} ünvanına göndərildi.")
-
-    except Exception as e:
-        logger.error(f"E-poçt göndərilərkən xəta baş verdi (Alıcı: {recipient.email}): {str(e)}", exc_info=True)
\ No newline at end of file
+    record_notification_events([NotificationEvent(
+        recipient=recipient,
+        event_type=TASK_NOTIFICATION_EVENTS[notification_type],
+        task=task,
+        summary=task.title[:500],
+    )])
+    logger.info(f"'{notification_type}' tipli bildiriş ID {recipient.id} olan alıcı üçün qeydə alındı.")
@@ -1,22 +1,25 @@
-from django.db.models import Q, Count
-from django.db.models.functions import TruncMonth
+from django.db.models import Q, Count, Sum
 from django.core.signing import Signer, BadSignature
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 from rest_framework import viewsets, permissions, views, status, generics
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter
 from rest_framework.views import APIView
-from .models import Task, CalendarNote
+from .models import Task, TaskMonthlyRollup, CalendarNote
 from .serializers import TaskSerializer, TaskUserSerializer, CalendarNoteSerializer
 from .filters import TaskFilter
-from .pagination import CustomPageNumberPagination
+from .pagination import TaskPagination
+from .permissions import can_modify_task
+from .utils import cached_task_stats
 
-from reports.utils import create_log_entry
+from reports.utils import create_log_entry, create_log_entries, build_log_entry
 from reports.models import ActivityLog
-from accounts.models import User
+from reports.exports import ExportMixin
+from accounts.models import User, UserVisibility
 from django.db import transaction
 
 
@@ -27,49 +30,52 @@ def get_visible_tasks(user):
     if user.factory_role == "top_management":
         return Task.objects.filter(assignee__factory_role__isnull=True)
 
-    subordinate_ids = user.get_subordinates().values_list('id', flat=True)
-    query = Q(assignee=user) | Q(assignee_id__in=list(subordinate_ids))
+    return Task.objects.filter(
+        assignee_id__in=UserVisibility.objects.filter(viewer=user).values('visible_user_id')
+    )
 
-    if user.role == "ceo":
-        top_management_subordinates = user.get_kpi_subordinates().filter(
-            role='top_management'
-        ).values_list('id', flat=True)
-        
-        if top_management_subordinates:
-             query |= Q(assignee_id__in=list(top_management_subordinates))
-             
-        query |= Q(assignee=user)
-    
-    return Task.objects.filter(query).distinct()
-
-def can_modify_task(user, task):
+def get_visible_rollups(user):
     if user.role == "admin":
-        return True
-    
+        return TaskMonthlyRollup.objects.all()
+
     if user.factory_role == "top_management":
-        return False
-    
-    if task.created_by == user:
-        return True
-    
-    if task.assignee == user:
-        return True
-    
-    subordinates = user.get_subordinates()
-    if task.assignee in subordinates:
-        return True
-    
-    return False
+        return TaskMonthlyRollup.objects.filter(user__factory_role__isnull=True)
+
+    return TaskMonthlyRollup.objects.filter(
+        user_id__in=UserVisibility.objects.filter(viewer=user).values('visible_user_id')
+    )
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ExportMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = TaskFilter 
-    pagination_class = CustomPageNumberPagination
+    ordering_fields = [
+        'created_at', 'completed_at', 'due_date', 'priority', 'status',
+        'has_self_eval', 'has_superior_eval', 'has_tm_eval', 'final_score',
+    ]
+    pagination_class = TaskPagination
+    export_name = 'tasks'
+    export_fields = (
+        ('id', 'id'),
+        ('title', 'title'),
+        ('status', 'status'),
+        ('priority', 'priority'),
+        ('assignee_id', 'assignee_id'),
+        ('assignee_first_name', 'assignee__first_name'),
+        ('assignee_last_name', 'assignee__last_name'),
+        ('created_by_id', 'created_by_id'),
+        ('start_date', 'start_date'),
+        ('due_date', 'due_date'),
+        ('created_at', 'created_at'),
+        ('completed_at', 'completed_at'),
+        ('is_overdue', 'is_overdue'),
+        ('completed_late', 'completed_late'),
+        ('final_score', 'final_score'),
+    )
 
     def get_queryset(self):
-        return get_visible_tasks(self.request.user).order_by('-created_at')
+        return TaskSerializer.setup_eager_loading(get_visible_tasks(self.request.user)).order_by('-created_at')
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -78,60 +84,77 @@ class TaskViewSet(viewsets.ModelViewSet):
         
         creator = self.request.user
         assignees_data = request.data.get('assignee')
+        many = isinstance(assignees_data, list)
 
-        if not isinstance(assignees_data, list):
+        if not many:
             assignees_data = [assignees_data]
 
-        created_tasks = []
-
-        with transaction.atomic():
-            for assignee_id in assignees_data:
-                try:
-                    assignee_user = User.objects.get(pk=assignee_id)
-                    
-                    if creator != assignee_user and creator.role != 'admin':
-                        subordinates = creator.get_subordinates()
-                        if assignee_user not in subordinates:
-                            continue 
-
-                    task = Task.objects.create(
-                        title=serializer.validated_data['title'],
-                        description=serializer.validated_data.get('description', ''),
-                        status=serializer.validated_data.get('status', 'TODO'),
-                        priority=serializer.validated_data.get('priority', 'MEDIUM'),
-                        start_date=serializer.validated_data.get('start_date'),
-                        due_date=serializer.validated_data.get('due_date'),
-                        created_by=creator,
-                        assignee=assignee_user,
-                        approved=True
-                    )
-                    created_tasks.append(task)
-
-                    create_log_entry(
-                        actor=creator,
-                        action_type=ActivityLog.ActionTypes.TASK_CREATED,
-                        target_user=assignee_user,
-                        target_task=task,
-                        details={'task_title': task.title}
-                    )
-
-                except User.DoesNotExist:
-                    continue
+        assignee_ids = []
+        for assignee_id in assignees_data:
+            try:
+                assignee_id = int(assignee_id)
+            except (ValueError, TypeError):
+                continue
+            if assignee_id not in assignee_ids:
+                assignee_ids.append(assignee_id)
+
+        assignees = User.objects.filter(pk__in=assignee_ids)
+        if creator.role != 'admin':
+            assignees = assignees.filter(
+                Q(pk=creator.pk) | Q(pk__in=creator.get_subordinates().values('pk'))
+            )
+        assignees = assignees.in_bulk()
+
+        tasks = [
+            Task(
+                title=serializer.validated_data['title'],
+                description=serializer.validated_data.get('description', ''),
+                status=serializer.validated_data.get('status', 'TODO'),
+                priority=serializer.validated_data.get('priority', 'MEDIUM'),
+                start_date=serializer.validated_data.get('start_date'),
+                due_date=serializer.validated_data.get('due_date'),
+                created_by=creator,
+                assignee=assignees[assignee_id],
+                approved=True
+            )
+            for assignee_id in assignee_ids if assignee_id in assignees
+        ]
 
-        if not created_tasks:
+        if not tasks:
             return Response({"detail": "İcraçı tapılmadı."}, status=status.HTTP_400_BAD_REQUEST)
 
-        output_serializer = self.get_serializer(created_tasks[0])
+        with transaction.atomic():
+            created_tasks = Task.create_many(tasks)
+            create_log_entries([
+                build_log_entry(
+                    actor=creator,
+                    action_type=ActivityLog.ActionTypes.TASK_CREATED,
+                    target_user=task.assignee,
+                    target_task=task,
+                    details={'task_title': task.title}
+                )
+                for task in created_tasks
+            ])
+
+        created_ids = [task.pk for task in created_tasks]
+        created_tasks = TaskSerializer.setup_eager_loading(
+            Task.objects.filter(pk__in=created_ids)
+        ).in_bulk()
+        created_tasks = [created_tasks[pk] for pk in created_ids]
+
+        if many:
+            output_serializer = self.get_serializer(created_tasks, many=True)
+        else:
+            output_serializer = self.get_serializer(created_tasks[0])
         return Response(output_serializer.data, status=status.HTTP_201_CREATED)
 
     def perform_update(self, serializer):
-        task = self.get_object()
+        task = serializer.instance
         
         if not can_modify_task(self.request.user, task):
             raise PermissionDenied("Bu tapşırığı redaktə etmək səlahiyyətiniz yoxdur.")
         
-        original_task = self.get_object()
-        original_status = original_task.status
+        original_status = task.status
         
         updated_task = serializer.save()
         
@@ -160,40 +183,45 @@ class HomeStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        base_queryset = get_visible_tasks(request.user)
+        data = cached_task_stats('home', request.user, lambda: self.get_stats(request.user))
+        return Response(data, status=status.HTTP_200_OK)
+
+    def get_stats(self, user):
+        base_queryset = get_visible_tasks(user)
         today = timezone.now().date()
         
         stats_queryset = base_queryset
-        if request.user.role not in ['admin', 'employee', 'ceo']:
-             stats_queryset = base_queryset.exclude(assignee=request.user)
-
-        data = {
-            "pending": stats_queryset.filter(status='PENDING').count(),
-            "in_progress": stats_queryset.filter(status='IN_PROGRESS').count(),
-            "cancelled": stats_queryset.filter(status='CANCELLED').count(),
-            "overdue": stats_queryset.filter(
-                due_date__lt=today, 
-                status__in=['PENDING', 'TODO', 'IN_PROGRESS']
-            ).count(),
-        }
-        return Response(data, status=status.HTTP_200_OK)
+        if user.role not in ['admin', 'employee', 'ceo']:
+             stats_queryset = base_queryset.exclude(assignee=user)
+
+        return stats_queryset.aggregate(
+            pending=Count('id', filter=Q(status='PENDING')),
+            in_progress=Count('id', filter=Q(status='IN_PROGRESS')),
+            cancelled=Count('id', filter=Q(status='CANCELLED')),
+            overdue=Count('id', filter=Task.overdue_filter(today)),
+        )
 
 
 class MonthlyTaskStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        base_queryset = get_visible_tasks(request.user)
         six_months_ago = timezone.now() - timedelta(days=180)
+        first_month = TaskMonthlyRollup.month_for(six_months_ago)
+        next_month = (first_month + timedelta(days=32)).replace(day=1)
 
-        completed_tasks_stats = base_queryset.filter(
+        first_month_count = get_visible_tasks(request.user).filter(
             status='DONE',
-            created_at__gte=six_months_ago
-        ).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(count=Count('id')).order_by('month')
-        
-        stats = [
+            created_at__gte=six_months_ago,
+            created_at__lt=timezone.make_aware(datetime.combine(next_month, time.min))
+        ).count()
+        completed_tasks_stats = get_visible_rollups(request.user).filter(
+            status='DONE',
+            month__gte=next_month
+        ).values('month').annotate(count=Sum('count')).filter(count__gt=0).order_by('month')
+
+        stats = [{"month": first_month.strftime('%Y-%m'), "count": first_month_count}] if first_month_count else []
+        stats += [
             {"month": item['month'].strftime('%Y-%m'), "count": item['count']} 
             for item in completed_tasks_stats
         ]
@@ -204,8 +232,9 @@ class PriorityTaskStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        base_queryset = get_visible_tasks(request.user)
-        priority_stats = base_queryset.values('priority').annotate(count=Count('id')).order_by('priority')
+        priority_stats = get_visible_rollups(request.user).values('priority').annotate(
+            count=Sum('count')
+        ).filter(count__gt=0).order_by('priority')
         priority_map = dict(Task.PRIORITY_CHOICES)
         
         labels = [str(priority_map.get(p['priority'], p['priority'])) for p in priority_stats]
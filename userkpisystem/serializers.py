@@ -1,9 +1,12 @@
 from rest_framework import serializers
 from .models import UserEvaluation
 from accounts.models import User
+from accounts.serializers import ProfilePhotoThumbnailsField
 from django.utils import timezone
 import datetime
 from rest_framework.exceptions import PermissionDenied
+from django.db import transaction
+from reports.utils import create_score_revision
 
 class UserEvaluationSerializer(serializers.ModelSerializer):
     evaluatee_id = serializers.IntegerField(write_only=True)
@@ -21,11 +24,11 @@ class UserEvaluationSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'evaluator', 'evaluatee', 'evaluatee_id', 'evaluation_type', 'score',
             'comment', 'evaluation_date', 'previous_score', 'updated_by',
-            'history', 'created_at', 'updated_at'
+            'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'evaluator', 'previous_score', 'updated_by', 
-            'history', 'created_at', 'updated_at'
+            'created_at', 'updated_at'
         ]
 
     def get_user_details(self, user_obj):
@@ -146,24 +149,17 @@ class UserEvaluationSerializer(serializers.ModelSerializer):
             if not (is_admin or is_evaluator):
                 raise PermissionDenied("Bu dəyərləndirməni redaktə etməyə icazəniz yoxdur.")
 
-        if new_score is not None and old_score != new_score:
-            history_entry = {
-                "timestamp": timezone.now().isoformat(),
-                "updated_by_id": user.id,
-                "updated_by_name": user.get_full_name() or user.username,
-                "previous_score": old_score,
-                "new_score": new_score
-            }
-            if not isinstance(instance.history, list):
-                instance.history = []
-            instance.history.append(history_entry)
-            
+        score_changed = new_score is not None and old_score != new_score
+        if score_changed:
             instance.previous_score = old_score
             instance.updated_by = user
 
         instance.comment = validated_data.get('comment', instance.comment)
         instance.score = new_score if new_score is not None else old_score
-        instance.save()
+        with transaction.atomic():
+            instance.save()
+            if score_changed:
+                create_score_revision(user, old_score, new_score, user_evaluation=instance)
         
         return instance
 
@@ -175,11 +171,12 @@ class UserForEvaluationSerializer(serializers.ModelSerializer):
     can_evaluate_top_management = serializers.SerializerMethodField()
     position_name = serializers.CharField(source='position.name', read_only=True, default=None)
     evaluation_config = serializers.SerializerMethodField()
+    profile_photo_thumbnails = ProfilePhotoThumbnailsField()
 
     class Meta:
         model = User
         fields = [
-            'id', 'first_name', 'last_name', 'profile_photo',
+            'id', 'first_name', 'last_name', 'profile_photo', 'profile_photo_thumbnails',
             'department_name', 'role_display', 'position_name',
             'selected_month_evaluations', 'can_evaluate_superior', 'can_evaluate_top_management',
             'evaluation_config'
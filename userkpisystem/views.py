@@ -16,12 +16,29 @@ from accounts.models import User
 
 from reports.utils import create_log_entry
 from reports.models import ActivityLog
+from reports.pagination import StandardResultsSetPagination
+from reports.exports import ExportMixin
+from reports.serializers import ScoreRevisionSerializer
 
 
-class UserEvaluationViewSet(viewsets.ModelViewSet):
+class UserEvaluationViewSet(ExportMixin, viewsets.ModelViewSet):
     queryset = UserEvaluation.objects.select_related('evaluator', 'evaluatee', 'updated_by').all()
     serializer_class = UserEvaluationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_name = 'user-evaluations'
+    export_fields = (
+        ('id', 'id'),
+        ('evaluation_date', 'evaluation_date'),
+        ('evaluation_type', 'evaluation_type'),
+        ('evaluator_id', 'evaluator_id'),
+        ('evaluatee_id', 'evaluatee_id'),
+        ('evaluatee_first_name', 'evaluatee__first_name'),
+        ('evaluatee_last_name', 'evaluatee__last_name'),
+        ('score', 'score'),
+        ('comment', 'comment'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    )
 
     def get_queryset(self):
         user = self.request.user
@@ -103,6 +120,14 @@ class UserEvaluationViewSet(viewsets.ModelViewSet):
         
         return super().destroy(request, *args, **kwargs)
 
+    @action(detail=True, methods=['get'], url_path='history')
+    def score_history(self, request, pk=None):
+        evaluation = self.get_object()
+        paginator = StandardResultsSetPagination()
+        page = paginator.paginate_queryset(evaluation.revisions.all(), request, view=self)
+        serializer = ScoreRevisionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=['get'], url_path='evaluable-users')
     def evaluable_users(self, request):
         evaluator = request.user